@@ -0,0 +1,127 @@
+"""
+This file contains an optional memoization cache for calculator operations.
+Results are kept per (operation, operands) key in a bounded LRU cache, so repeated
+calculations, such as an expensive `exponent`, are answered without re-running
+the operation. Zero-divisor errors are cached too and raised again on a hit.
+The cache counts hits, misses and evictions, and can be warmed from a History.
+
+Keys include the numeric mode the result was computed in: Fraction(6),
+Decimal(6) and 6.0 are equal and hash alike, so without it a result cached in
+one mode would be returned in another.
+"""
+import decimal
+import math
+from collections import OrderedDict
+from app.logging import logger
+
+def _zero_sign(operand):
+    if isinstance(operand, float):
+        return math.copysign(1.0, operand)
+    if isinstance(operand, decimal.Decimal):
+        return operand.is_signed()
+    return None
+
+class OperationCache:
+    """
+    A bounded LRU cache of operation results.
+
+    Attributes:
+        maxsize (int): Maximum number of cached results.
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that ran the operation.
+        evictions (int): Results dropped to stay within `maxsize`.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        if maxsize < 1:
+            raise ValueError("Cache size must be at least 1.")
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def _key(name: str, operands: tuple, mode: str) -> tuple:
+        # 0.0 and -0.0 compare equal but can give different results, so zero
+        # operands also contribute their sign to the key. Only floats and Decimals
+        # have a signed zero; ints and Fractions may be too large for copysign.
+        if 0.0 in operands:
+            return (mode, name, operands, tuple(_zero_sign(operand) for operand in operands))
+        return (mode, name, operands)
+
+    def _store(self, key: tuple, value):
+        self._entries[key] = value
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def evaluate(self, operation, operands: tuple, apply=None, mode: str = "float"):
+        """
+        Returns the result of `operation(*operands)`, from the cache if possible.
+
+        Args:
+            operation (Operation): A registered operation.
+            operands (tuple): The operands to apply it to.
+            apply (callable): Computes a missing result as `apply(operation, operands)`;
+                defaults to calling the operation directly.
+            mode (str): Name of the numeric mode `apply` computes in; results
+                are only shared between lookups in the same mode.
+
+        Raises:
+            ValueError: If the operation raises ValueError, now or on the cached call.
+        """
+        key = self._key(operation.name, operands, mode)
+        entries = self._entries
+        if key in entries:
+            entries.move_to_end(key)
+            self.hits += 1
+            value = entries[key]
+        else:
+            self.misses += 1
+            try:
+                value = operation(*operands) if apply is None else apply(operation, operands)
+            except ValueError as error:
+                value = error
+            self._store(key, value)
+        if isinstance(value, ValueError):
+            raise ValueError(*value.args)
+        return value
+
+    def warm(self, history) -> int:
+        """
+        Fills the cache from the structured calculations in a History.
+
+        The history stores results as floats, so they are cached as float-mode
+        results. The most recent calculations are kept when the history is
+        larger than the cache. Warming does not count as hits or misses.
+
+        Returns:
+            int: The number of results added to the cache.
+        """
+        records = history.records
+        start = max(len(records) - self.maxsize, 0)
+        codes = records.column("codes")[start:].tolist()
+        num1 = records.column("num1")[start:].tolist()
+        num2 = records.column("num2")[start:].tolist()
+        result = records.column("result")[start:].tolist()
+        added = 0
+        for code, operand1, operand2, value in zip(codes, num1, num2, result):
+            if code >= 0:
+                self._store(self._key(records.names[code], (operand1, operand2), "float"),
+                            value)
+                added += 1
+        logger.info("Warmed operation cache with %d results", added)
+        return added
+
+    def clear(self):
+        """Removes all cached results; the counters are kept."""
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        """Returns the cache's size and counters."""
+        return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
@@ -3,116 +3,740 @@ A simple calculator REPL that can perform addition, subtraction, multiplication,
 and division. The calculator includes a history feature allowing users to view
 past calculations, clear history, undo the last calculation, and automatically
 save/load calculation history to/from "default.csv".
+
+Operations are looked up in `app.registry`, so operations registered by other
+modules are available without changes here. `run_batch` is a non-interactive
+alternative to the REPL that streams "<operation> <num1> <num2>" lines from a
+file object and writes results in chunks.
 """
-from app.logging import logger
-# Import the necessary math operations from the operations module
-from app.operations import addition, subtraction, multiplication, division,modulus,exponent
+from itertools import islice
+from app.logging import logger, disable_console_logging
+# Importing the operations module registers the built-in operations
+from app.operations import evaluate_batch
+from app.registry import get_operation, operation_names
 
 # Import History class from the history module
 from app.history import History
+from app.history.autosave import Autosave
+from app.history.threadsafe import ThreadSafeHistory
+from app.cache import OperationCache
+from app.expression import compile_expression
+from app.numeric import (FloatBackend, NumericBackend, create_backend, format_number,
+                         parse_mode)
+from app.metrics import metrics, dump_metrics, start_profiling, stop_profiling
+import math
 import os
-from dotenv import load_dotenv
+from datetime import datetime
+
+# Snapshot file used by the "snapshot" and "restore" commands when CALC_SNAPSHOT is unset
+DEFAULT_SNAPSHOT_FILE = "session.snapshot"
+
+def _parse_whole(text: str, parse):
+    # Whole numbers are read exactly, so operands beyond 2 ** 53 are not rounded
+    try:
+        return int(text)
+    except ValueError:
+        return parse(text)
+
+def parse_operation(text: str, parse=float):
+    """
+    Splits an input line into an operation and its numeric operands.
+
+    Operands of an operation registered with `integer_operands` that are
+    written as whole numbers are parsed as exact ints in every numeric mode.
+
+    Args:
+        text (str): A line such as "add 2 3".
+        parse (callable): Converts each operand, e.g. a NumericBackend's parse.
+
+    Returns:
+        tuple: (name, operation, operands) where `operation` is the registered
+        Operation, or None if the name is unknown.
+
+    Raises:
+        ValueError: If the line is empty, an operand is not a number, or the
+        number of operands does not match the operation's arity.
+    """
+    name, *args = text.lower().split() or [""]
+    operation = get_operation(name)
+    if not name or (operation is not None and len(args) != operation.arity):
+        raise ValueError("wrong number of operands")
+    if operation is not None and operation.integer_operands:
+        return name, operation, tuple(_parse_whole(arg, parse) for arg in args)
+    return name, operation, tuple(parse(arg) for arg in args)
+
+class Session:
+    """
+    The state of one calculator session.
+
+    Attributes:
+        history (History): The session's calculation history.
+        cache (OperationCache): Optional result cache, or None when disabled.
+        numeric (NumericBackend): How operands are parsed and evaluated.
+        profiler (cProfile.Profile): The session's profiler when CALC_PROFILE is set.
+        autosave (Autosave): Writes the history in the background, or None.
+    """
+
+    def __init__(self, history: History = None, cache: OperationCache = None,
+                 numeric: NumericBackend = None):
+        self.history = History() if history is None else history
+        self.cache = cache
+        self.numeric = FloatBackend() if numeric is None else numeric
+        self.profiler = None
+        self.autosave = None
+
+    @classmethod
+    def from_env(cls):
+        """
+        Creates a session configured from the environment.
+
+        HISTORY_JOURNAL names a journal file every change is appended to.
+        HISTORY_CAPACITY bounds the entries kept in memory, spilling older ones
+        to HISTORY_SPILL_FILE (default: a temporary file). Setting
+        HISTORY_AUTOSAVE_INTERVAL (seconds) or HISTORY_AUTOSAVE_CHANGES autosaves
+        the history to HISTORYCSV_FILE in the background. CALC_CACHE_SIZE
+        (default 0, disabled) bounds the result cache. CALC_NUMERIC and
+        CALC_PRECISION select the numeric mode, and CALC_PROFILE profiles the
+        session (see `app.metrics`). When CALC_SNAPSHOT names an existing
+        snapshot file, the session is restored from it, together with any
+        changes journaled to HISTORY_JOURNAL after the snapshot was written.
+        """
+        cache_size = int(os.getenv("CALC_CACHE_SIZE", "0"))
+        precision = os.getenv("CALC_PRECISION")
+        numeric = create_backend(os.getenv("CALC_NUMERIC", "float"),
+                                 int(precision) if precision else None)
+        capacity = os.getenv("HISTORY_CAPACITY")
+        interval = os.getenv("HISTORY_AUTOSAVE_INTERVAL")
+        changes = os.getenv("HISTORY_AUTOSAVE_CHANGES")
+        # Autosave snapshots the history from its own thread, so it needs locking
+        history_class = ThreadSafeHistory if interval or changes else History
+        journal = os.getenv("HISTORY_JOURNAL")
+        snapshot = os.getenv("CALC_SNAPSHOT")
+        resume = bool(snapshot) and os.path.exists(snapshot)
+        # When resuming, the journal is opened by restore_snapshot instead
+        history = history_class(journal_path=None if resume else journal,
+                                capacity=int(capacity) if capacity else None,
+                                spill_path=os.getenv("HISTORY_SPILL_FILE"))
+        session = cls(history,
+                      OperationCache(cache_size) if cache_size > 0 else None, numeric)
+        if interval or changes:
+            session.autosave = Autosave(history, interval=float(interval or 5.0),
+                                        max_changes=int(changes or 100)).start()
+        if resume:
+            session.restore_snapshot(snapshot, journal_path=journal)
+        session.profiler = start_profiling()
+        return session
+
+    def parse(self, text: str):
+        """Parses an input line with the session's numeric mode; see `parse_operation`."""
+        return parse_operation(text, self.numeric.parse)
+
+    def evaluate(self, operation, operands: tuple):
+        """
+        Applies an operation with the session's numeric mode, through the
+        result cache when one is enabled. Every call is counted and timed per
+        operation in `app.metrics.metrics`.
+
+        Raises:
+            ValueError: If the operation rejects its operands or overflows.
+        """
+        name = operation.name
+        metrics.increment("calculator_operations_total", operation=name)
+        try:
+            with metrics.timer("calculator_operation_seconds", operation=name):
+                if self.cache is not None:
+                    return self.cache.evaluate(operation, operands, self.numeric.evaluate,
+                                               self.numeric.name)
+                return self.numeric.evaluate(operation, operands)
+        except ValueError:
+            metrics.increment("calculator_operation_errors_total", operation=name)
+            raise
+
+    def evaluate_expression(self, source: str):
+        """
+        Evaluates an infix expression (see `app.expression`) with the session's
+        numeric mode.
+
+        Each operation the expression applies goes through `evaluate`, so it
+        uses the result cache and is counted in the metrics, and once the whole
+        expression has succeeded each is recorded in the history as its own
+        calculation, e.g. "add 1.0 2.0 = 3.0". The steps therefore show up in
+        history queries, aggregates and analytics, and undo removes them one at
+        a time.
+
+        Raises:
+            ValueError: If the expression is malformed or an operation fails.
+        """
+        steps = []
+
+        def apply(operation, operands):
+            result = self.evaluate(operation, operands)
+            steps.append((operation.name, operands, result))
+            return result
+
+        result = compile_expression(source).evaluate(self.numeric, apply)
+        self.history.record_many(steps)
+        return result
+
+    def warm_cache(self):
+        """
+        Warms the result cache, if enabled, from the history. The history keeps
+        float results, so this only happens in float mode.
+        """
+        if self.cache is not None and self.numeric.name == FloatBackend.name:
+            self.cache.warm(self.history)
+
+    def set_numeric(self, numeric: NumericBackend):
+        """Switches the numeric mode, dropping cached results computed in the old one."""
+        self.numeric = numeric
+        if self.cache is not None:
+            self.cache.clear()
+
+    def save_snapshot(self, file_path: str = None) -> str:
+        """
+        Writes the history, numeric mode and cache counters to a snapshot file
+        (see `app.history.snapshot`).
+
+        Args:
+            file_path (str): Destination; defaults to CALC_SNAPSHOT or DEFAULT_SNAPSHOT_FILE.
+
+        Returns:
+            str: The path written to.
+        """
+        file_path = file_path or os.getenv("CALC_SNAPSHOT") or DEFAULT_SNAPSHOT_FILE
+        state = {"numeric": self.numeric.name,
+                 "precision": getattr(self.numeric, "precision", None),
+                 "cache": None if self.cache is None else self.cache.stats()}
+        self.history.write_snapshot(file_path, state)
+        return file_path
+
+    def restore_snapshot(self, file_path: str = None, journal_path: str = None) -> str:
+        """
+        Restores the history, numeric mode and cache counters from a snapshot
+        file. The history is memory-mapped; the result cache, if enabled, is
+        warmed from its most recent calculations in float mode.
+
+        Args:
+            file_path (str): Snapshot to restore; defaults to CALC_SNAPSHOT or
+                DEFAULT_SNAPSHOT_FILE.
+            journal_path (str): Journal to resume with the snapshot (see
+                `History.resume`), so entries journaled after it are kept.
+                Without one, an open journal is rewritten to the snapshot.
+
+        Returns:
+            str: The path restored from.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the file is not a snapshot or names an unknown mode.
+        """
+        file_path = file_path or os.getenv("CALC_SNAPSHOT") or DEFAULT_SNAPSHOT_FILE
+        if journal_path:
+            state = self.history.resume(file_path, journal_path)
+        else:
+            state = self.history.load_snapshot(file_path)
+        self.set_numeric(create_backend(state.get("numeric", "float"), state.get("precision")))
+        self.warm_cache()
+        if self.cache is not None:
+            for counter in ("hits", "misses", "evictions"):
+                setattr(self.cache, counter, (state.get("cache") or {}).get(counter, 0))
+        return file_path
+
+    def close(self):
+        """
+        Releases the session's resources, such as an open history journal, and
+        writes its profile and metrics when CALC_PROFILE or CALC_METRICS_FILE is set.
+        When CALC_SNAPSHOT is set, a snapshot is written first.
+        """
+        if self.autosave is not None:
+            self.autosave.stop()
+            self.autosave = None
+        if os.getenv("CALC_SNAPSHOT"):
+            self.save_snapshot()
+        self.history.close()
+        stop_profiling(self.profiler)
+        self.profiler = None
+        dump_metrics()
+
+def _show_history(session):
+    logger.info("Displaying calculation history.")
+    print("Calculation History:")
+    # Streams entries so a history that spilled to disk is not loaded into a list
+    for calc in session.history.iter_history():
+        print(calc)
+
+HISTORY_QUERY_USAGE = ("Usage: history [head [N]|tail [N]|summary] [op=NAME] [min=X] [max=X] "
+                       "[since=TIME] [until=TIME]")
+# Entries shown by "history head" and "history tail" without a count
+DEFAULT_PAGE_SIZE = 10
+
+def _parse_time(text: str) -> float:
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+
+def parse_history_query(argument: str):
+    """
+    Parses the arguments of a `history` query command.
+
+    Args:
+        argument (str): E.g. "tail 5 op=add min=10 since=2024-01-01".
+
+    Returns:
+        tuple: (view, count, filters) where `view` is "all", "head", "tail" or
+        "summary", `count` the page size, and `filters` keyword arguments for
+        `History.query` and `History.aggregate`.
+
+    Raises:
+        ValueError: If the arguments do not follow HISTORY_QUERY_USAGE.
+    """
+    words = argument.split()
+    view, count, filters = "all", None, {}
+    if words and words[0] in ("head", "tail", "summary"):
+        view = words.pop(0)
+        if view != "summary":
+            count = DEFAULT_PAGE_SIZE
+            if words and words[0].isdigit():
+                count = int(words.pop(0))
+    converters = {"op": ("operation", str), "min": ("min_result", float),
+                  "max": ("max_result", float), "since": ("since", _parse_time),
+                  "until": ("until", _parse_time)}
+    for word in words:
+        key, separator, value = word.partition("=")
+        if not separator or key not in converters:
+            raise ValueError(HISTORY_QUERY_USAGE)
+        name, convert = converters[key]
+        filters[name] = convert(value)
+    operation = get_operation(filters.get("operation", ""))
+    if operation is not None:
+        filters["operation"] = operation.name
+    return view, count, filters
+
+def _query_history(session, argument):
+    try:
+        view, count, filters = parse_history_query(argument)
+    except ValueError as error:
+        logger.error("Invalid history query %r: %s", argument, error)
+        print(f"Invalid history query. {HISTORY_QUERY_USAGE}")
+        return
+    logger.info("Querying calculation history: %s %s", view, filters)
+    if view == "summary":
+        print("History Summary:")
+        for name, stats in session.history.aggregate(**filters).items():
+            print(f"{name}: count {stats['count']}, sum {stats['sum']}, "
+                  f"min {stats['min']}, max {stats['max']}")
+        return
+    print("Calculation History:")
+    for calc in session.history.query(**filters, limit=count, newest=view == "tail"):
+        print(calc)
+
+def _clear_history(session):
+    session.history.clear()
+    logger.info("Calculation history cleared.")
+    print("History cleared.")
+
+def _undo(session):
+    session.history.undo_last()
+    logger.info("Last calculation undone.")
+    print("Last calculation undone.")
+
+UNDO_USAGE = "Usage: undo [to CHECKPOINT]"
+
+def _undo_to(session, argument):
+    words = argument.split()
+    if len(words) != 2 or words[0] != "to" or not words[1].isdigit():
+        logger.error("Invalid undo arguments %r", argument)
+        print(f"Invalid undo command. {UNDO_USAGE}")
+        return
+    try:
+        count = session.history.undo_to(int(words[1]))
+    except ValueError as error:
+        logger.error("Undo to checkpoint %s failed: %s", words[1], error)
+        print(error)
+        return
+    print(f"Undid {count} calculations back to checkpoint {words[1]}.")
+
+def _redo(session):
+    count = session.history.redo()
+    if count:
+        logger.info("Redid %d calculations.", count)
+        print(f"Redid {count} calculation{'s' if count != 1 else ''}.")
+    else:
+        print("Nothing to redo.")
 
-# Load environment
-load_dotenv()
+def _checkpoint(session):
+    number = session.history.checkpoint()
+    print(f"Checkpoint {number} at {len(session.history)} entries.")
+
+def _save_history(session):
+    history_file = os.getenv("HISTORYCSV_FILE", "default.csv")
+    session.history.save(history_file)
+    logger.info("Calculation history saved to %s.", history_file)
+    print(f"History saved to {history_file}.")
+
+LOAD_USAGE = "Usage: load [tail N|range START END]"
+
+def parse_load_arguments(argument: str) -> dict:
+    """
+    Parses the arguments of the REPL's "load" command.
+
+    Args:
+        argument (str): E.g. "", "tail 1000" or "range 0 65536".
+
+    Returns:
+        dict: Keyword arguments for `History.load` (tail or byte_range).
+
+    Raises:
+        ValueError: If the arguments do not follow LOAD_USAGE.
+    """
+    words = argument.split()
+    if not words:
+        return {}
+    if words[0] == "tail" and len(words) == 2 and int(words[1]) >= 0:
+        return {"tail": int(words[1])}
+    if words[0] == "range" and len(words) == 3 and 0 <= int(words[1]) <= int(words[2]):
+        return {"byte_range": (int(words[1]), int(words[2]))}
+    raise ValueError(LOAD_USAGE)
+
+def _report_load_progress(entries, bytes_read, bytes_total):
+    # The final chunk is reported by the "History loaded" message instead
+    if bytes_read < bytes_total:
+        print(f"Loading history: {entries} entries ({bytes_read * 100 // bytes_total}%)")
+
+def _load_history(session, argument=""):
+    try:
+        options = parse_load_arguments(argument)
+    except ValueError as error:
+        logger.error("Invalid load arguments %r: %s", argument, error)
+        print(f"Invalid load command. {LOAD_USAGE}")
+        return
+    history_file = os.getenv("HISTORYCSV_FILE", "default.csv")
+    try:
+        session.history.load(history_file, progress=_report_load_progress, **options)
+    except ValueError as error:
+        logger.error("Loading %s failed: %s", history_file, error)
+        print(error)
+        return
+    logger.info("Calculation history loaded from %s.", history_file)
+    print(f"History loaded from {history_file}.")
+    session.warm_cache()
+
+def _save_snapshot(session):
+    file_path = session.save_snapshot()
+    logger.info("Session snapshot saved to %s.", file_path)
+    print(f"Session snapshot saved to {file_path}.")
+
+def _restore_snapshot(session):
+    file_path = os.getenv("CALC_SNAPSHOT") or DEFAULT_SNAPSHOT_FILE
+    try:
+        session.restore_snapshot(file_path)
+    except FileNotFoundError:
+        logger.error("No snapshot found at %s", file_path)
+        print(f"No snapshot found at {file_path}")
+        return
+    except ValueError as error:
+        logger.error("Restoring %s failed: %s", file_path, error)
+        print(error)
+        return
+    print(f"Session restored from {file_path}: {len(session.history)} entries, "
+          f"numeric mode {session.numeric}.")
+
+def _show_cache(session):
+    if session.cache is None:
+        print("Result cache is disabled. Set CALC_CACHE_SIZE to enable it.")
+        return
+    stats = session.cache.stats()
+    logger.info("Displaying cache statistics: %s", stats)
+    print(f"Cache: {stats['size']}/{stats['maxsize']} entries, {stats['hits']} hits, "
+          f"{stats['misses']} misses, {stats['evictions']} evictions.")
+
+def _evaluate_expression(session, source):
+    try:
+        text = format_number(session.evaluate_expression(source))
+    except ValueError as error:
+        logger.error("Expression %r failed: %s", source, error)
+        print(error)
+        return
+    logger.info("Evaluated expression: %s = %s", source, text)
+    print(f"Result: {text}")
+
+def _set_mode(session, argument):
+    if not argument:
+        print(f"Numeric mode: {session.numeric}.")
+        return
+    try:
+        session.set_numeric(parse_mode(argument))
+    except ValueError as error:
+        logger.error("Invalid numeric mode %r: %s", argument, error)
+        print(error)
+        return
+    logger.info("Numeric mode set to %s.", session.numeric)
+    print(f"Numeric mode: {session.numeric}.")
+
+STATS_HISTORY_USAGE = "Usage: stats history [WINDOW_SECONDS]"
+
+def _show_history_stats(session, argument):
+    words = argument.split()
+    try:
+        window = float(words[0]) if words else None
+        if len(words) > 1 or (window is not None and window <= 0):
+            raise ValueError(STATS_HISTORY_USAGE)
+    except ValueError:
+        logger.error("Invalid history statistics arguments %r", argument)
+        print(f"Invalid stats command. {STATS_HISTORY_USAGE}")
+        return
+    stats = session.history.analytics()
+    if stats.empty:
+        print("No calculations in history.")
+        return
+    print("History Statistics:")
+    for name, row in stats.iterrows():
+        print(f"{name}: count {int(row['count'])}, mean {row['mean']}, "
+              f"min {row['min']}, max {row['max']}")
+    if window is not None:
+        latest = session.history.rolling(window).iloc[-1]
+        print(f"Last {window:g} seconds: count {int(latest['count'])}, mean {latest['mean']}, "
+              f"min {latest['min']}, max {latest['max']}")
+
+def _show_stats(session, argument):
+    word, _, rest = argument.partition(" ")
+    if word == "history":
+        _show_history_stats(session, rest)
+        return
+    try:
+        print(metrics.export(argument or "json"), end="")
+    except ValueError as error:
+        print(error)
+
+# REPL commands, dispatched with a single lookup on the lower-cased input
+COMMANDS = {
+    "history": _show_history,
+    "clear": _clear_history,
+    "undo": _undo,
+    "redo": _redo,
+    "checkpoint": _checkpoint,
+    "save": _save_history,
+    "load": _load_history,
+    "snapshot": _save_snapshot,
+    "restore": _restore_snapshot,
+    "cache": _show_cache,
+}
+
+# REPL commands that take the rest of the input line as their argument
+ARGUMENT_COMMANDS = {
+    "history": _query_history,
+    "undo": _undo_to,
+    "load": _load_history,
+    "eval": _evaluate_expression,
+    "mode": _set_mode,
+    "stats": _show_stats,
+}
+
+def repl_prompt() -> str:
+    """Builds the REPL's input prompt from the registered operations and commands."""
+    operations = ", ".join(
+        name + (f" ({' '.join(get_operation(name).aliases)})"
+                if get_operation(name).aliases else "")
+        for name in operation_names())
+    commands = ", ".join(dict.fromkeys([*COMMANDS, *ARGUMENT_COMMANDS]))
+    return (f"Enter an operation ({operations}) and its operands, "
+            f"or a command ({commands}): ")
 
 def calculator():
     """
-    Basic REPL calculator that performs addition, subtraction, multiplication,
-    and division, with support for viewing, clearing, undoing, saving, and
-    loading calculation history.
+    Basic REPL calculator that performs the registered operations, with support
+    for viewing, clearing, undoing, saving, and loading calculation history.
     """
     logger.info("Calculator started.")
 
     print("Welcome to the calculator REPL! Type 'exit' anytime to quit.")
-    print("Additional commands: 'history', 'clear', 'undo', 'save', 'load'.")
+    print("Additional commands: 'history [head|tail [N]|summary] [op=NAME] [min=X] [max=X] "
+          "[since=TIME] [until=TIME]', 'clear', 'undo [to N]', 'redo', 'checkpoint', 'save', "
+          "'load [tail N|range START END]', 'snapshot', 'restore', 'cache', "
+          "'eval <expression>', 'mode <float|int|decimal [precision]|fraction>', "
+          "'stats [json|prometheus]', 'stats history [WINDOW]'.")
 
-    history = History()
+    session = Session.from_env()
+    prompt = repl_prompt()
 
     while True:
-        user_input = input(
-            "Enter an operation (add, subtract, multiply, divide, modulus, exponent) and two "
-            "numbers, or a command (history, clear, undo, save, load): "
-        )
+        user_input = input(prompt)
         logger.info("User input received: %s", user_input)
 
-        if user_input.lower() == "exit":
+        command = user_input.strip().lower()
+        if command == "exit":
             logger.info("Calculator exited by user.")
             print("Exiting calculator...")
+            session.close()
             break
 
-        elif user_input.lower() == "history":
-            logger.info("Displaying calculation history.")
-            print("Calculation History:")
-            for calc in history.get_history():
-                print(calc)
+        handler = COMMANDS.get(command)
+        if handler is not None:
+            handler(session)
+            continue
+
+        word, _, argument = command.partition(" ")
+        handler = ARGUMENT_COMMANDS.get(word)
+        if handler is not None:
+            handler(session, argument.strip())
             continue
 
-        elif user_input.lower() == "clear":
-            history.clear()
-            logger.info("Calculation history cleared.")
-            print("History cleared.")
+        try:
+            with metrics.timer("calculator_parse_seconds"):
+                name, operation, operands = session.parse(command)
+            logger.info("Operation: %s, Operands: %s", name, operands)
+        except ValueError:
+            logger.error("Invalid input format for operation.")
+            print("Invalid input. Please follow the format: <operation> <num1> <num2>")
             continue
 
-        elif user_input.lower() == "undo":
-            history.undo_last()
-            logger.info("Last calculation undone.")
-            print("Last calculation undone.")
+        if operation is None:
+            logger.warning("Unknown operation: %s", name)
+            print(f"Unknown operation '{name}'. Supported operations: "
+                  f"{', '.join(operation_names())}.")
             continue
 
-        elif user_input.lower() == "save":
-            history_file = os.getenv("HISTORYCSV_FILE", "default.csv")
-            history.save(history_file)
-            logger.info("Calculation history saved to %s.", history_file)
-            print(f"History saved to {history_file}.")
+        try:
+            result = session.evaluate(operation, operands)
+        except ValueError as error:
+            logger.error("Operation %s failed: %s", operation.name, error)
+            print(error)
             continue
 
-        elif user_input.lower() == "load":
-            history_file = os.getenv("HISTORYCSV_FILE", "default.csv")
-            history.load(history_file)
-            logger.info("Calculation history loaded from %s.", history_file)
-            print(f"History loaded from {history_file}.")
+        try:
+            session.history.record(operation.name, operands, result)
+            text = format_number(result)
+        except ValueError as error:
+            logger.error("Could not record %s: %s", operation.name, error)
+            print(error)
             continue
+        logger.info("Performed calculation: %s %s = %s", operation.name, operands, text)
+
+        print(f"Result: {text}")
+
+def parse_lines(lines):
+    """
+    Parses operation lines lazily.
 
+    Blank lines and lines starting with '#' are skipped.
+
+    Yields:
+        tuple: (operation, operands, None) for well-formed lines, or
+        (None, None, error message) for lines that cannot be evaluated.
+    """
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            name, operation, operands = parse_operation(line)
+        except ValueError:
+            yield None, None, f"invalid input format: {line}"
+            continue
+        if operation is None:
+            yield None, None, f"unknown operation '{name}'"
         else:
+            yield operation, operands, None
+
+def evaluate_results(parsed: list) -> list:
+    """
+    Evaluates a chunk of parsed lines, one vectorized call per operation.
+
+    Operations without a vectorized implementation are evaluated per element.
+
+    Args:
+        parsed (list): Tuples produced by `parse_lines`.
+
+    Returns:
+        list: One (operation, operands, result, error) tuple per parsed line, in
+        input order. `error` is None for successful calculations; otherwise
+        `result` is None and `operation` may be None too.
+    """
+    results = [None] * len(parsed)
+    groups = {}
+    for index, (operation, operands, error) in enumerate(parsed):
+        if operation is None:
+            results[index] = (None, None, None, error)
+        elif operation.vector is None or operation.arity != 2:
             try:
-                operation, num1, num2 = user_input.lower().split()
-                num1, num2 = float(num1), float(num2)
-                logger.info("Operation: %s, Num1: %s, Num2: %s", operation, num1, num2)
-            except ValueError:
-                logger.error("Invalid input format for operation.")
-                print("Invalid input. Please follow the format: <operation> <num1> <num2>")
-                continue
-
-            if operation == "add":
-                result = addition(num1, num2)
-            elif operation == "subtract":
-                result = subtraction(num1, num2)
-            elif operation == "multiply":
-                result = multiplication(num1, num2)
-            elif operation == "divide":
-                try:
-                    result = division(num1, num2)
-                except ValueError as error:
-                    logger.error("Division by zero attempted.")
-                    print(error)
-                    continue
-            elif operation == "modulus":
-                try:
-                    result = modulus(num1, num2)
-                except ValueError as error:
-                    logger.error("Modulus by zero attempted.")
-                    print(error)
-                    continue
-            elif operation == "exponent":
-                result = exponent(num1, num2)
+                results[index] = (operation, operands, operation(*operands), None)
+            except ValueError as failure:
+                results[index] = (operation, operands, None, str(failure))
+        else:
+            groups.setdefault(operation, []).append(index)
+
+    for operation, indexes in groups.items():
+        num1s = [parsed[index][1][0] for index in indexes]
+        num2s = [parsed[index][1][1] for index in indexes]
+        values, errors = evaluate_batch(operation.name, num1s, num2s)
+        for index, num1, num2, value, error in zip(
+                indexes, num1s, num2s, values.tolist(), errors.tolist()):
+            if error:
+                results[index] = (operation, (num1, num2), None,
+                                  _batch_error(operation, num2, value))
             else:
-                logger.warning("Unknown operation: %s", operation)
-                print(f"Unknown operation '{operation}'. Supported operations: add, subtract, multiply, divide, modulus, exponent..")
-                continue
+                results[index] = (operation, (num1, num2), value, None)
+    return results
+
+def _batch_error(operation, divisor: float, value: float) -> str:
+    # The message the REPL reports for an element flagged by evaluate_batch
+    if operation.zero_guard and divisor == 0:
+        return operation.zero_error
+    if math.isinf(value):
+        return "result is too large to represent."
+    return f"{operation.name} is undefined for these operands."
 
-            calculation_str = f"{operation} {num1} {num2} = {result}"
-            history.add(calculation_str)
-            logger.info("Performed calculation: %s", calculation_str)
+def format_result(operation, operands, result, error) -> str:
+    """Formats one tuple from `evaluate_results` as a batch output line."""
+    if error is None:
+        return operation.format(operands, result)
+    if operation is None:
+        return f"error: {error}"
+    return operation.format(operands, f"error: {error}")
 
-            print(f"Result: {result}")
+def evaluate_chunk(parsed: list) -> list:
+    """
+    Evaluates a chunk of parsed lines and formats them as batch output lines.
+
+    Args:
+        parsed (list): Tuples produced by `parse_lines`.
+
+    Returns:
+        list: One output line per parsed line, in input order.
+    """
+    return [format_result(*result) for result in evaluate_results(parsed)]
+
+def run_batch(source, output, chunk_size: int = 4096, history: History = None) -> int:
+    """
+    Streams operations from `source` to `output` without prompts or console logging.
+
+    Lines are read, evaluated and written one chunk at a time, so memory use is
+    bounded by `chunk_size` regardless of the input size.
+
+    Args:
+        source: An iterable of input lines, e.g. an open file or sys.stdin.
+        output: A writable text file object.
+        chunk_size (int): Number of lines evaluated and written per chunk.
+        history (History): If given, successful calculations are recorded in it.
+
+    Returns:
+        int: The number of lines processed.
+    """
+    disable_console_logging()
+    logger.info("Batch run started with chunk size %d.", chunk_size)
+    parsed = parse_lines(source)
+    processed = 0
+    while True:
+        chunk = list(islice(parsed, chunk_size))
+        if not chunk:
+            break
+        results = evaluate_results(chunk)
+        output.write("\n".join(format_result(*result) for result in results) + "\n")
+        if history is not None:
+            history.record_many((operation.name, operands, result)
+                                for operation, operands, result, error in results if error is None)
+        processed += len(chunk)
+    output.flush()
+    logger.info("Batch run finished: %d lines processed.", processed)
+    return processed
@@ -1,36 +1,219 @@
-import pandas as pd
-from app.logging import logger
+import hashlib
 import os
+import time
+from bisect import bisect_left
+from collections import deque
+from app.logging import logger
+from app.metrics import metrics
+from app.history.analytics import ColumnCache, operation_stats, rolling_stats
+from app.history.formats import (CSV_CHUNK_ROWS, CSV_COLUMNS, csv_header, history_compression,
+                                 history_format, last_rows, load_npy, read_csv_chunks,
+                                 replace_atomically, save_npy, tail_offset, write_csv)
+from app.history.query import select_rows, summarize_rows
+from app.history.records import (RecordStore, TEXT_CODE, format_calculation, format_entry,
+                                 parse_entry)
+from app.history.snapshot import read_snapshot, write_snapshot
+
+# Journal record markers: an added entry, an undo, a clear, and a truncation
+# to a given number of entries (written by undo_to)
+JOURNAL_ADD = "+"
+JOURNAL_UNDO = "-"
+JOURNAL_CLEAR = "!"
+JOURNAL_TRUNCATE = "<"
+# A journal is compacted once it holds this many more records than live entries
+JOURNAL_COMPACT_SLACK = 1024
+# Undone entries kept for redo, across all undo steps
+DEFAULT_REDO_LIMIT = 100_000
+# Journal bytes before a snapshot's journal position that are checked on resume
+JOURNAL_DIGEST_BYTES = 4096
+# Rows read from the store and written at a time by save and write_snapshot
+SAVE_CHUNK_ROWS = 1 << 16
+
+def _escape(entry: str) -> str:
+    return (entry.replace("\\", "\\\\").replace("\n", "\\n").replace("\r", "\\r")
+            .replace("\t", "\\t"))
+
+def _unescape(text: str) -> str:
+    # Undo _escape in one left-to-right pass so "\\n" is read back as "\\" + "n"
+    parts = text.split("\\\\")
+    return "\\".join(part.replace("\\n", "\n").replace("\\r", "\r").replace("\\t", "\t")
+                     for part in parts)
+
+def _journal_digest(file_path, offset: int) -> str:
+    # Hash of the journal bytes just before `offset`, to recognise the same file
+    with open(file_path, "rb") as journal:
+        start = max(offset - JOURNAL_DIGEST_BYTES, 0)
+        journal.seek(start)
+        return hashlib.sha256(journal.read(offset - start)).hexdigest()
+
+def _journal_continues(file_path, position: dict) -> bool:
+    # Whether the journal is the one a snapshot recorded, appended to but not rewritten
+    if position is None:
+        return False
+    stat = os.stat(file_path)
+    if stat.st_ino != position["inode"] or stat.st_size < position["offset"]:
+        return False
+    return _journal_digest(file_path, position["offset"]) == position["digest"]
+
+def _frame(names: list, text: dict, start: int, codes, num1, num2, result, timestamp):
+    """
+    Builds the DataFrame that `History.to_frame` returns and CSV files hold, for
+    rows numbered from `start` with the given columns. Text rows (code -1) get
+    their entry from `text` (row number -> entry), an empty Name and zero operands.
+    """
+    import numpy as np
+    import pandas as pd
+
+    # Code -1 (text rows) selects the trailing empty name
+    names = np.array(names + [""], dtype=object)[codes]
+    operation = (names + " " + num1.astype(str) + " " + num2.astype(str)
+                 + " = " + result.astype(str))
+    if text:
+        rows = np.fromiter(text.keys(), dtype=np.int64, count=len(text))
+        operation[rows - start] = list(text.values())
+    return pd.DataFrame({
+        "Operation": operation,
+        "Name": names,
+        "Num1": num1,
+        "Num2": num2,
+        "Result": result,
+        "Timestamp": timestamp,
+    })
+
+def _frames(names: list, text: dict, chunks):
+    """Yields a `_frame` per chunk of records, each with the text entries of its rows."""
+    rows = list(text)
+    start = 0
+    for chunk in chunks:
+        stop = start + len(chunk)
+        chunk_rows = rows[bisect_left(rows, start):bisect_left(rows, stop)]
+        yield _frame(names, {row: text[row] for row in chunk_rows}, start, chunk["code"],
+                     chunk["num1"], chunk["num2"], chunk["result"], chunk["timestamp"])
+        start = stop
 
 class History:
     """
     A simple history tracker for a calculator that records every operation 
     performed.
 
+    Calculations are stored as typed columns (operation, operands, result and
+    timestamp) in a `RecordStore` and are only formatted as text such as
+    "add 2.0 3.0 = 5.0" when displayed. Entries that do not fit the columns are
+    kept as text.
+
+    When a journal file is given, every add, undo and clear is also appended to it
+    as a small record, so persisting the history costs O(1) per operation instead
+    of rewriting the whole file. Opening an existing journal replays it.
+
+    With a capacity, only the most recent entries are kept in memory and older
+    ones spill to a segment file on disk (see `RecordStore`); iterating over the
+    history streams across both.
+
+    Undone entries are kept, up to `redo_limit` of them, so `redo` can restore
+    them. `checkpoint` marks the current state and `undo_to` returns to a mark
+    in one step, in time proportional to the entries undone. Any new entry
+    discards what could be redone.
+
     Attributes:
-        history (list): Stores each operation and its result as a string.
+        history (list): Each operation and its result as a string (read-only view).
+        records (RecordStore): The columnar storage behind the history.
+        journal_path (str): Path of the append-only journal, or None.
+        redo_limit (int): Maximum undone entries kept for redo.
+        checkpoints (dict): Checkpoint number -> number of entries at that point.
 
     Methods:
         add(operation: str): Adds a new operation to the history.
+        record(name, operands, result): Adds a calculation as typed fields.
+        record_many(calculations): Adds many calculations at once.
         get_history() -> list: Returns the list of all recorded operations.
+        iter_history(): Yields the recorded operations without building a list.
         clear(): Clears all history entries.
         undo_last(): Removes the most recent entry from the history.
-        save(file_path: str): Saves the history to a CSV file.
-        load(file_path: str): Loads history from a CSV file.
+        redo() -> int: Restores the most recently undone step.
+        checkpoint() -> int: Marks the current state and returns its number.
+        undo_to(checkpoint: int) -> int: Undoes every entry after a checkpoint.
+        tail(count: int) -> list: Returns the most recent entries.
+        query(...) -> list: Returns a page of entries matching filters.
+        aggregate(...) -> dict: Returns count, sum, min and max per operation.
+        analytics() -> DataFrame: Returns count, mean, min, max and sum per operation.
+        rolling(window, operation) -> DataFrame: Returns result statistics over
+            a trailing time window at every calculation.
+        snapshot() -> History: Returns an independent copy of the entries.
+        to_frame() -> DataFrame: Returns the history as columns.
+        save(file_path: str): Saves the history to a CSV or .npy file.
+        write(file_path: str): Saves without printing a confirmation.
+        load(file_path: str): Loads history from a CSV or .npy file.
+        write_snapshot(file_path, state): Saves the records and session state
+            to a snapshot file.
+        load_snapshot(file_path) -> dict: Restores a snapshot, returning its state.
+        open_journal(file_path: str): Replays and then appends to a journal file.
+        compact_journal(): Rewrites the journal to contain only live entries.
+        flush(): Writes buffered journal records to disk.
+        close(): Flushes and closes the journal and removes spill files.
     """
 
-    def __init__(self):
-        """Initializes the History object with an empty history list."""
-        self.history = []
+    def __init__(self, journal_path: str = None, flush_every: int = 64,
+                 capacity: int = None, spill_path: str = None,
+                 redo_limit: int = DEFAULT_REDO_LIMIT):
+        """
+        Initializes the History object with an empty history.
+
+        Args:
+            journal_path (str): Optional append-only journal to replay and write to.
+            flush_every (int): Number of journal records buffered between flushes.
+            capacity (int): Maximum entries kept in memory; None keeps all of them.
+            spill_path (str): Segment file for entries beyond the capacity;
+                defaults to a temporary file.
+            redo_limit (int): Maximum undone entries kept for redo.
+
+        Raises:
+            ValueError: If the capacity is less than 1.
+        """
+        self.records = RecordStore(capacity, spill_path)
+        self.journal_path = None
+        self.flush_every = flush_every
+        self._journal = None
+        self._journal_records = 0
+        self._unflushed = 0
+        self.redo_limit = redo_limit
+        # Undone steps, most recent last: (entry count, (records, text)) as
+        # returned by RecordStore.tail_rows
+        self._redo = deque()
+        self._redo_entries = 0
+        self._undone = False
+        self.checkpoints = {}
+        self._next_checkpoint = 1
+        # Columns read by analytics, kept between calls
+        self._columns = ColumnCache()
+        # Called with no arguments after every change, e.g. by an Autosave
+        self.on_change = None
         logger.info("History instance created.")
+        if journal_path:
+            self.open_journal(journal_path)
 
-    def add(self, operation: str):
+    @property
+    def history(self) -> list:
+        """All entries formatted as strings."""
+        return list(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        """Yields entries oldest first without building a list."""
+        return iter(self.records)
+
+    def add(self, operation: str, timestamp: float = None):
         """
         Adds a new operation to the history.
 
+        Entries in the calculator's own format, e.g. "add 2.0 3.0 = 5.0", are stored
+        as typed fields; anything else is kept as text.
+
         Args:
             operation (str): A string representation of the operation, 
             e.g., "add 2 + 3 = 5".
+            timestamp (float): Seconds since the epoch; defaults to now.
 
         Raises:
             TypeError: If the operation is not a string.
@@ -38,66 +221,689 @@ class History:
         if not isinstance(operation, str):
             logger.error("Operation must be a string.")
             raise TypeError("Operation must be a string.")
-        
-        self.history.append(operation)
+
+        self._add(operation, time.time() if timestamp is None else timestamp)
         logger.info("Added operation to history: %s", operation)
 
+    def _add(self, operation: str, timestamp: float):
+        self._diverge()
+        self._append(operation, timestamp)
+        self._write_journal(f"{JOURNAL_ADD}{timestamp!r}\t{_escape(operation)}")
+        self._changed()
+
+    def record(self, name: str, operands: tuple, result, timestamp: float = None):
+        """
+        Adds a calculation to the history as typed fields.
+
+        Two float operands with a float result are stored in the columns; other
+        shapes (different arity, non-float values) are stored as their text form.
+
+        Args:
+            name (str): The operation name, e.g. "add".
+            operands (tuple): The operands the operation was applied to.
+            result: The value the operation returned.
+            timestamp (float): Seconds since the epoch; defaults to now.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        self._record(name, operands, result, timestamp)
+        logger.info("Added operation to history: %s %s = %s", name, operands, result)
+
+    def record_many(self, calculations, timestamp: float = None):
+        """
+        Adds many calculations with a single log record.
+
+        Args:
+            calculations: An iterable of (name, operands, result) tuples.
+            timestamp (float): Seconds since the epoch for all of them; defaults to now.
+        """
+        count = self._record_many(calculations,
+                                  time.time() if timestamp is None else timestamp)
+        logger.info("Added %d operations to history", count)
+
+    def _record_many(self, calculations, timestamp: float) -> int:
+        count = 0
+        for name, operands, result in calculations:
+            self._record(name, operands, result, timestamp)
+            count += 1
+        return count
+
+    def _record(self, name: str, operands: tuple, result, timestamp: float):
+        self._diverge()
+        if (len(operands) == 2 and type(result) is float
+                and all(type(operand) is float for operand in operands)):
+            self.records.append(name, operands[0], operands[1], result, timestamp)
+            if self._journal is not None:
+                entry = format_entry(name, operands[0], operands[1], result)
+                self._write_journal(f"{JOURNAL_ADD}{timestamp!r}\t{_escape(entry)}")
+        else:
+            entry = format_calculation(name, operands, result)
+            self.records.append_text(entry, timestamp)
+            self._write_journal(f"{JOURNAL_ADD}{timestamp!r}\t{_escape(entry)}")
+        self._changed()
+
+    def _append(self, entry: str, timestamp: float):
+        fields = parse_entry(entry)
+        if fields is None:
+            self.records.append_text(entry, timestamp)
+        else:
+            self.records.append(*fields, timestamp)
+
+    def _changed(self):
+        # Appends leave cached columns valid; undos cut them back
+        self._columns.invalidate(len(self.records))
+        self._notify()
+
+    def _notify(self):
+        if self.on_change is not None:
+            self.on_change()
+
     def get_history(self) -> list:
         """
         Returns the list of all recorded operations.
 
+        This formats every entry at once; use `iter_history` to stream a long
+        history instead.
+
         Returns:
             list: The list of all operations in the history.
         """
+        return list(self.iter_history())
+
+    def iter_history(self):
+        """
+        Yields the recorded operations oldest first, formatting one at a time.
+
+        Entries that spilled to disk are read as they are reached, so memory
+        does not grow with the length of the history.
+
+        Yields:
+            str: Each operation in the history.
+        """
         logger.info("Retrieving calculation history.")
-        return self.history
+        yield from self
 
     def clear(self):
-        """Clears all entries in the history."""
-        self.history.clear()
+        """Clears all entries in the history, along with redo steps and checkpoints."""
+        self.records.clear()
+        self._replaced()
+        self._write_journal(JOURNAL_CLEAR)
+        self._changed()
         logger.info("Cleared calculation history.")
 
     def undo_last(self):
         """
-        Removes the most recent entry from the history.
+        Removes the most recent entry from the history and keeps it for `redo`.
         If history is empty, it does nothing.
         """
-        if self.history:
-            last_operation = self.history.pop()
+        if self.records:
+            row = len(self.records) - 1
+            last_operation = self.records.format(row)
+            self._keep_for_redo(row)
+            self.records.pop()
+            self._write_journal(JOURNAL_UNDO)
+            self._changed()
             logger.info("Undid last operation: %s", last_operation)
 
+    def checkpoint(self) -> int:
+        """
+        Marks the current state of the history so `undo_to` can return to it.
+
+        Returns:
+            int: The checkpoint's number.
+        """
+        number = self._next_checkpoint
+        self._next_checkpoint += 1
+        self.checkpoints[number] = len(self.records)
+        logger.info("Checkpoint %d at %d entries", number, len(self.records))
+        return number
+
+    def undo_to(self, checkpoint: int) -> int:
+        """
+        Undoes every entry added after a checkpoint as a single step, which one
+        `redo` restores.
+
+        Args:
+            checkpoint (int): A number returned by `checkpoint`.
+
+        Returns:
+            int: The number of entries undone.
+
+        Raises:
+            ValueError: If the checkpoint is unknown, or is ahead of the current
+            entries because they were undone past it (redo first).
+        """
+        length = self.checkpoints.get(checkpoint)
+        if length is None:
+            raise ValueError(f"Unknown checkpoint {checkpoint}.")
+        count = len(self.records) - length
+        if count < 0:
+            raise ValueError(f"Checkpoint {checkpoint} is ahead of the history; redo first.")
+        if count:
+            self._keep_for_redo(length)
+            self.records.truncate(length)
+            self._write_journal(f"{JOURNAL_TRUNCATE}{length}")
+            self._changed()
+        logger.info("Undid %d entries back to checkpoint %d", count, checkpoint)
+        return count
+
+    def redo(self) -> int:
+        """
+        Restores the most recently undone step: the entry removed by
+        `undo_last`, or all entries removed by `undo_to`.
+
+        Returns:
+            int: The number of entries restored; 0 when there is nothing to redo.
+        """
+        if not self._redo:
+            return 0
+        count, (rows, text) = self._redo.pop()
+        self._redo_entries -= count
+        start = len(self.records)
+        self.records.extend(self.records.names, rows["code"], rows["num1"], rows["num2"],
+                            rows["result"], rows["timestamp"], text)
+        if self._journal is not None:
+            for row, timestamp in enumerate(rows["timestamp"].tolist(), start):
+                entry = self.records.format(row)
+                self._write_journal(f"{JOURNAL_ADD}{timestamp!r}\t{_escape(entry)}")
+        self._changed()
+        logger.info("Redid %d entries", count)
+        return count
+
+    def _keep_for_redo(self, start: int):
+        # Saves the entries from `start` on as one redo step, dropping the
+        # oldest steps once more than redo_limit entries are kept
+        self._undone = True
+        count = len(self.records) - start
+        if count > self.redo_limit:
+            # Older steps could only be redone after this one
+            self._redo.clear()
+            self._redo_entries = 0
+            return
+        self._redo.append((count, self.records.tail_rows(start)))
+        self._redo_entries += count
+        while self._redo_entries > self.redo_limit:
+            self._redo_entries -= self._redo.popleft()[0]
+
+    def _diverge(self):
+        # A new entry after an undo makes the undone entries, and checkpoints
+        # taken while they were present, unreachable
+        if self._undone:
+            self._redo.clear()
+            self._redo_entries = 0
+            length = len(self.records)
+            self.checkpoints = {number: position for number, position
+                                in self.checkpoints.items() if position <= length}
+            self._undone = False
+
+    def _replaced(self):
+        # The entries were replaced wholesale: drop state derived from the old ones
+        self._columns.invalidate()
+        self._redo.clear()
+        self._redo_entries = 0
+        self._undone = False
+        self.checkpoints = {}
+
+    def to_frame(self) -> "pandas.DataFrame":
+        """
+        Returns the history as a DataFrame with one column per field.
+
+        The columns are Operation (the displayed text), Name, Num1, Num2, Result
+        and Timestamp. Text entries have an empty Name and zero operands.
+        """
+        records = self.records
+        return _frame(records.names, records.text_entries(), 0, records.column("codes"),
+                      records.column("num1"), records.column("num2"),
+                      records.column("result"), records.column("timestamp"))
+
+    def tail(self, count: int) -> list:
+        """
+        Returns the most recent entries, formatting only those rows.
+
+        Args:
+            count (int): Maximum number of entries to return.
+        """
+        total = len(self.records)
+        return [self.records.format(row) for row in range(max(total - count, 0), total)]
+
+    def query(self, operation: str = None, min_result: float = None, max_result: float = None,
+              since: float = None, until: float = None, limit: int = None,
+              newest: bool = False, offset: int = 0) -> list:
+        """
+        Returns a page of the entries matching every given filter, oldest first.
+
+        Only the entries on the returned page are formatted; see
+        `app.history.query.select_rows` for how the filters are applied.
+
+        Args:
+            operation (str): Only calculations of this operation, e.g. "add".
+            min_result (float): Only calculations whose result is >= this value.
+            max_result (float): Only calculations whose result is <= this value.
+            since (float): Only entries at or after this time (seconds since the epoch).
+            until (float): Only entries at or before this time.
+            limit (int): Maximum number of entries to return; None returns all.
+            newest (bool): Page from the most recent match backwards (a tail page)
+                instead of from the oldest (a head page).
+            offset (int): Number of matches to skip from the start of the page order.
+        """
+        rows = select_rows(self.records, operation, min_result, max_result, since, until)
+        stop = len(rows) if limit is None else min(offset + limit, len(rows))
+        if newest:
+            rows = rows[max(len(rows) - stop, 0):len(rows) - offset]
+        else:
+            rows = rows[offset:stop]
+        return [self.records.format(row) for row in rows.tolist()]
+
+    def aggregate(self, operation: str = None, min_result: float = None,
+                  max_result: float = None, since: float = None, until: float = None) -> dict:
+        """
+        Returns count, sum, min and max of the results per operation for the
+        calculations matching the filters (see `query`).
+
+        Returns:
+            dict: Operation name -> {"count", "sum", "min", "max"}.
+        """
+        rows = select_rows(self.records, operation, min_result, max_result, since, until)
+        return summarize_rows(self.records, rows)
+
+    def analytics(self) -> "pandas.DataFrame":
+        """
+        Returns per-operation statistics of the results.
+
+        The columns and per-block aggregates are cached on the first call;
+        later calls only process entries added since, and an undo only drops
+        the cached blocks it touched, so reports on a large history stay fast.
+        With a capacity only the block aggregates are kept, so memory stays
+        bounded.
+
+        Returns:
+            DataFrame: Indexed by operation name, in order of first use, with
+            columns count, mean, min, max and sum. Text entries are not counted.
+        """
+        return operation_stats(self._columns, self.records)
+
+    def rolling(self, window: float, operation: str = None) -> "pandas.DataFrame":
+        """
+        Returns statistics of the results over a trailing time window, at every
+        calculation. With a capacity, the columns are read from disk for the
+        call rather than cached.
+
+        Args:
+            window (float): Window length in seconds.
+            operation (str): Only calculations of this operation; all when None.
+
+        Returns:
+            DataFrame: Indexed by calculation time, oldest first, with the
+            count, mean, min and max of the results in the `window` seconds up
+            to and including each calculation.
+
+        Raises:
+            ValueError: If the window is not positive.
+        """
+        if window <= 0:
+            raise ValueError("Rolling window must be positive.")
+        code = None if operation is None else self.records.code_of(operation)
+        if operation is not None and code is None:
+            # No calculation has used the operation; select nothing
+            code = len(self.records.names)
+        return rolling_stats(self._columns.columns(self.records), window, code)
+
+    def snapshot(self) -> "History":
+        """Returns an independent copy of the entries, without a journal or capacity."""
+        copy = History()
+        copy.records = self.records.copy()
+        return copy
+
+    def _export(self):
+        """
+        Captures what a save writes: the row count, operation names, text
+        entries and timestamp order now, and a generator that reads the rows'
+        records in chunks of SAVE_CHUNK_ROWS when it is consumed, so the rows
+        are streamed to the file instead of copied into memory first. At least
+        one (possibly empty) chunk is yielded.
+
+        Returns:
+            tuple: (count, names, text, time_ordered, chunks).
+        """
+        records = self.records
+        count = len(records)
+        return (count, list(records.names), records.text_entries(), records.time_ordered,
+                self._chunks(count, records.generation))
+
+    def _chunks(self, count: int, generation: int):
+        for start in range(0, max(count, 1), SAVE_CHUNK_ROWS):
+            yield self._read_rows(start, min(start + SAVE_CHUNK_ROWS, count), generation)
+
+    def _read_rows(self, start: int, stop: int, generation: int):  # pylint: disable=unused-argument
+        # A plain History cannot change while it is being saved
+        return self.records.rows(start, stop)
+
     def save(self, file_path: str = None):
         """
-        Saves the history to a CSV file.
+        Saves the history to a CSV or binary .npy file.
+
+        Besides the displayed Operation column, CSV files get the typed fields as
+        their own columns so `load` can restore them without parsing text. The
+        format is picked by `app.history.formats.history_format`, and a CSV file
+        name ending in .gz, .bz2, .xz or .zst is compressed while it is written.
+        The file is replaced atomically, so it is never left half-written.
 
         Args:
-            file_path (str): The path to the CSV file where the history 
+            file_path (str): The path to the file where the history 
             will be saved. Defaults to the environment variable or "default.csv".
         """
-        file_path = file_path or os.getenv("HISTORYCSV_FILE", "default.csv")
-        df = pd.DataFrame(self.history, columns=["Operation"])
-        df.to_csv(file_path, index=False)
+        file_path = self.write(file_path)
         print(f"History saved to {file_path}")
         logger.info("History saved to %s", file_path)
 
-    def load(self, file_path: str = None):
+    def write(self, file_path: str = None) -> str:
         """
-        Loads history from a CSV file and populates the history list.
+        Writes the history like `save`, without printing a confirmation.
+
+        Returns:
+            str: The path written to.
+        """
+        return self._write(file_path, self._export())
+
+    def _write(self, file_path, export) -> str:
+        # Writes the rows captured by _export
+        file_path = file_path or os.getenv("HISTORYCSV_FILE", "default.csv")
+        file_format = history_format(file_path)
+        count, names, text, _, chunks = export
+        with metrics.timer("calculator_history_save_seconds", format=file_format):
+            if file_format == "npy":
+                save_npy(file_path, count, chunks, names, text)
+            else:
+                frames = _frames(names, text, chunks)
+                compression = history_compression(file_path)
+                replace_atomically(file_path, lambda path: write_csv(frames, path, compression))
+        return file_path
+
+    def load(self, file_path: str = None, tail: int = None, byte_range: tuple = None,
+             chunk_size: int = None, progress=None):
+        """
+        Loads history from a CSV or binary .npy file and populates the history.
+
+        Binary files are memory-mapped rather than read. CSV files, compressed
+        or not, are streamed in chunks of rows, so memory stays bounded by the
+        chunk size (plus the loaded entries, which a capacity can also bound). Files written by
+        `save` are loaded column by column; files that only have an Operation
+        column are parsed entry by entry.
 
         Args:
-            file_path (str): The path to the CSV file from which the history 
+            file_path (str): The path to the file from which the history 
             will be loaded. Defaults to the environment variable or "default.csv".
+            tail (int): Load only the last `tail` entries.
+            byte_range (tuple): (start, end) byte offsets of a CSV file; only rows
+                whose line starts in that range are loaded.
+            chunk_size (int): CSV rows parsed at a time (default CSV_CHUNK_ROWS).
+            progress (callable): Called after each CSV chunk as
+                progress(entries_loaded, bytes_read, bytes_total).
+
+        Raises:
+            ValueError: If a byte range is given for a binary or compressed file.
         """
         file_path = file_path or os.getenv("HISTORYCSV_FILE", "default.csv")
+        file_format = history_format(file_path)
+        if byte_range is not None and file_format != "csv":
+            raise ValueError("Byte ranges only apply to CSV history files.")
+        if byte_range is not None and history_compression(file_path) is not None:
+            raise ValueError("Byte ranges only apply to uncompressed CSV history files.")
+        with metrics.timer("calculator_history_load_seconds", format=file_format):
+            self._load(file_path, file_format, tail, byte_range, chunk_size, progress)
+
+    def _load(self, file_path, file_format, tail, byte_range, chunk_size, progress):
         try:
-            df = pd.read_csv(file_path)
-            if 'Operation' in df.columns:
-                self.history = df['Operation'].tolist()
-                print(f"History loaded from {file_path}")
-                logger.info("History loaded from %s", file_path)
-            else:
+            if file_format == "npy":
+                base, names, text = load_npy(file_path)
+                if tail is not None:
+                    skipped = max(len(base) - tail, 0)
+                    base = base[skipped:]
+                    text = {row - skipped: entry for row, entry in text.items() if row >= skipped}
+                self.records.attach(base, names, text)
+                self._loaded(file_path)
+                return
+            columns, data_start = csv_header(file_path)
+            if 'Operation' not in columns:
                 print("CSV file does not contain 'Operation' column.")
                 logger.warning("CSV file does not contain 'Operation' column.")
+                return
+            start, end = byte_range if byte_range is not None else (None, None)
+            compressed = history_compression(file_path) is not None
+            if tail is not None and not compressed:
+                start = max(start or 0, tail_offset(file_path, tail, data_start))
+            chunks = read_csv_chunks(file_path, start, end, chunk_size or CSV_CHUNK_ROWS, progress)
+            if tail is not None and compressed:
+                # A compressed file cannot be read backwards, so stream it keeping the tail
+                chunks = last_rows(chunks, tail)
+            structured = set(CSV_COLUMNS) <= set(columns)
+            self.records.clear()
+            for df in chunks:
+                if structured:
+                    self._load_columns(df)
+                else:
+                    for entry in df['Operation'].tolist():
+                        self._append(entry, 0.0)
+            self._loaded(file_path)
         except FileNotFoundError:
             print(f"No file found at {file_path}")
             logger.error("No file found at %s", file_path)
+
+    def write_snapshot(self, file_path: str, state: dict = None):
+        """
+        Writes the records and the given session state to a snapshot file; see
+        `app.history.snapshot`. With a journal open, the journal is flushed and
+        its position is stored too, for `resume`.
+
+        Args:
+            file_path (str): Destination file, replaced atomically.
+            state (dict): JSON-serializable state to store alongside the records.
+        """
+        self._write_snapshot(file_path, state, self._snapshot_rows())
+
+    def _snapshot_rows(self):
+        # The journal position and the rows a snapshot writes, captured together
+        return self._journal_position(), self._export()
+
+    def _write_snapshot(self, file_path, state, captured):
+        journal, (count, names, text, time_ordered, chunks) = captured
+        with metrics.timer("calculator_history_save_seconds", format="snapshot"):
+            write_snapshot(file_path, count, chunks, names, text, time_ordered, state or {},
+                           journal)
+        logger.info("Snapshot of %d entries written to %s", count, file_path)
+
+    def _journal_position(self):
+        # Where the flushed journal ends and how to recognise it, or None
+        if self._journal is None:
+            return None
+        self.flush()
+        offset = os.fstat(self._journal.fileno()).st_size
+        return {"inode": os.fstat(self._journal.fileno()).st_ino, "offset": offset,
+                "records": self._journal_records,
+                "digest": _journal_digest(self.journal_path, offset)}
+
+    def load_snapshot(self, file_path: str) -> dict:
+        """
+        Replaces the history with the records of a snapshot file.
+
+        The records are memory-mapped and the per-row state is read from the
+        snapshot header, so restoring takes constant time however long the
+        history is. An open journal is compacted to the restored entries; use
+        `resume` to restore a snapshot without losing journaled entries.
+
+        Returns:
+            dict: The session state stored with the snapshot.
+
+        Raises:
+            FileNotFoundError: If the file does not exist.
+            ValueError: If the file is not a snapshot.
+        """
+        with metrics.timer("calculator_history_load_seconds", format="snapshot"):
+            base, names, text, text_file, time_ordered, state, _ = read_snapshot(file_path)
+            self.records.attach(base, names, text, time_ordered, text_file)
+        self._replaced()
+        if self._journal is not None:
+            self.compact_journal()
+        self._changed()
+        logger.info("History restored from snapshot %s", file_path)
+        return state
+
+    def resume(self, file_path: str, journal_path: str) -> dict:
+        """
+        Restores a snapshot together with the journal kept alongside it, e.g.
+        when a session starts, and keeps the journal open for appends.
+
+        If the journal is the one the snapshot was written from and has only
+        been appended to since, the snapshot is memory-mapped and only the
+        journal records written after it are replayed. Otherwise (the journal
+        was rewritten, or the snapshot was taken without it) the journal, which
+        holds every change, is replayed in full and the snapshot only supplies
+        the session state, so entries journaled after the snapshot are never
+        lost. A missing journal is created with the snapshot's entries.
+
+        Args:
+            file_path (str): The snapshot file.
+            journal_path (str): The journal file.
+
+        Returns:
+            dict: The session state stored with the snapshot.
+
+        Raises:
+            FileNotFoundError: If the snapshot does not exist.
+            ValueError: If the file is not a snapshot.
+        """
+        with metrics.timer("calculator_history_load_seconds", format="snapshot"):
+            base, names, text, text_file, time_ordered, state, position = \
+                read_snapshot(file_path)
+        exists = os.path.exists(journal_path)
+        if exists and not _journal_continues(journal_path, position):
+            logger.warning("Journal %s does not continue snapshot %s; replaying the journal",
+                           journal_path, file_path)
+            if text_file is not None:
+                text_file.close()
+            self.open_journal(journal_path)
+            return state
+
+        self.close()
+        self.records.attach(base, names, text, time_ordered, text_file)
+        self._replaced()
+        self._journal_records = position["records"] if exists else 0
+        if exists:
+            with open(journal_path, "rb") as journal:
+                journal.seek(position["offset"])
+                for line in journal:
+                    self._replay(line.decode("utf-8").rstrip("\n"))
+        self.journal_path = journal_path
+        self._journal = open(journal_path, "a", encoding="utf-8", newline="\n")
+        if exists:
+            self._maybe_compact()
+        else:
+            self.compact_journal()
+        self._changed()
+        logger.info("History resumed from snapshot %s and journal %s", file_path, journal_path)
+        return state
+
+    def _loaded(self, file_path):
+        self._replaced()
+        if self._journal is not None:
+            self.compact_journal()
+        self._changed()
+        print(f"History loaded from {file_path}")
+        logger.info("History loaded from %s", file_path)
+
+    def _load_columns(self, df):
+        import numpy as np
+        import pandas as pd
+
+        codes, names = pd.factorize(df["Name"].replace("", None))
+        is_text = codes == TEXT_CODE
+        text = dict(zip(np.flatnonzero(is_text).tolist(), df["Operation"][is_text].tolist()))
+        self.records.extend(list(names), codes, df["Num1"].to_numpy(), df["Num2"].to_numpy(),
+                            df["Result"].to_numpy(), df["Timestamp"].to_numpy(), text)
+
+    def open_journal(self, file_path: str):
+        """
+        Replays an existing journal into the history and keeps it open for appends.
+
+        Args:
+            file_path (str): Path of the journal file; it is created if missing.
+        """
+        self.close()
+        self.records.clear()
+        self._replaced()
+        self._journal_records = 0
+        if os.path.exists(file_path):
+            with open(file_path, encoding="utf-8", newline="\n") as journal:
+                for line in journal:
+                    self._replay(line.rstrip("\n"))
+            logger.info("Replayed %d journal records from %s", self._journal_records, file_path)
+        self.journal_path = file_path
+        self._journal = open(file_path, "a", encoding="utf-8", newline="\n")
+        self._maybe_compact()
+
+    def _replay(self, record: str):
+        marker = record[:1]
+        if marker == JOURNAL_ADD:
+            stamp, separator, entry = record[1:].partition("\t")
+            if separator:
+                self._append(_unescape(entry), float(stamp))
+            else:
+                # Records written before timestamps were journaled
+                self._append(_unescape(stamp), 0.0)
+        elif marker == JOURNAL_UNDO:
+            if self.records:
+                self.records.pop()
+        elif marker == JOURNAL_CLEAR:
+            self.records.clear()
+        elif marker == JOURNAL_TRUNCATE:
+            self.records.truncate(int(record[1:]))
+        else:
+            logger.warning("Skipping malformed journal record: %r", record)
+            return
+        self._journal_records += 1
+
+    def _write_journal(self, record: str):
+        if self._journal is None:
+            return
+        self._journal.write(record + "\n")
+        self._journal_records += 1
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self.flush()
+        self._maybe_compact()
+
+    def _maybe_compact(self):
+        # Compaction costs O(live entries) and only runs after at least as many
+        # dead records have accumulated, so appends stay O(1) amortized.
+        if self._journal_records > 2 * len(self.records) + JOURNAL_COMPACT_SLACK:
+            self.compact_journal()
+
+    def compact_journal(self):
+        """Rewrites the journal so it holds one add record per live entry."""
+        if self._journal is None:
+            return
+        self._journal.close()
+        temp_path = self.journal_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8", newline="\n") as journal:
+            timestamps = self.records.column("timestamp").tolist()
+            journal.writelines(f"{JOURNAL_ADD}{timestamp!r}\t{_escape(entry)}\n"
+                               for entry, timestamp in zip(self.records, timestamps))
+        os.replace(temp_path, self.journal_path)
+        self._journal = open(self.journal_path, "a", encoding="utf-8", newline="\n")
+        self._journal_records = len(self.records)
+        self._unflushed = 0
+        logger.info("Compacted journal %s to %d records", self.journal_path, self._journal_records)
+
+    def flush(self):
+        """Writes any buffered journal records to disk."""
+        if self._journal is not None:
+            self._journal.flush()
+            self._unflushed = 0
+
+    def close(self):
+        """Flushes and closes the journal, if one is open, and removes spill files."""
+        self.records.close()
+        if self._journal is not None:
+            self.flush()
+            self._journal.close()
+            self._journal = None
+            logger.info("Closed journal %s", self.journal_path)
@@ -0,0 +1,183 @@
+"""
+This file contains history analytics: per-operation statistics and rolling
+windows over time, computed with NumPy and pandas over the history's columns.
+
+`ColumnCache` keeps contiguous copies of the columns the analytics read
+between calls. When entries are appended only the new rows are copied, and
+when entries are undone the cached rows are cut back instead of rebuilt, so
+repeated reports on a large history do not re-read or re-concatenate it. It
+also keeps per-operation aggregates of every full block of STATS_BLOCK_ROWS
+rows, so a report only aggregates the last, partial block and combines the
+block totals.
+
+A history with a capacity keeps most of its rows on disk, so for it no columns
+are cached: blocks are aggregated from the store directly, reading spilled rows
+from their memory-mapped segment, and only the block aggregates are kept.
+Rolling windows then read the columns for the duration of the call.
+"""
+from app.history.records import TEXT_CODE
+
+# Rows per block of cached per-operation aggregates
+STATS_BLOCK_ROWS = 1 << 16
+
+def _block_stats(codes, results, operations: int) -> tuple:
+    # (count, sum, min, max) arrays indexed by operation code for one block
+    import numpy as np
+
+    keep = codes != TEXT_CODE
+    codes, results = codes[keep].astype(np.intp), results[keep]
+    counts = np.bincount(codes, minlength=operations)
+    sums = np.bincount(codes, weights=results, minlength=operations)
+    minimums = np.full(operations, np.inf)
+    maximums = np.full(operations, -np.inf)
+    np.minimum.at(minimums, codes, results)
+    np.maximum.at(maximums, codes, results)
+    return counts, sums, minimums, maximums
+
+class ColumnCache:
+    """
+    Contiguous NumPy copies of a RecordStore's operation, result and
+    timestamp columns, plus per-operation aggregates of full row blocks,
+    updated incrementally.
+
+    The owner calls `invalidate` with the number of rows that are still
+    unchanged whenever rows are removed or replaced. Columns of a store with a
+    capacity are not copied; see the module docstring.
+
+    Attributes:
+        rows (int): Number of leading rows cached and known to be current.
+    """
+
+    COLUMNS = ("codes", "result", "timestamp")
+
+    def __init__(self):
+        self._arrays = {}
+        self._blocks = []
+        self.rows = 0
+
+    def invalidate(self, length: int = 0):
+        """Marks every cached row from `length` on as stale."""
+        self.rows = min(self.rows, length)
+        del self._blocks[length // STATS_BLOCK_ROWS:]
+
+    def columns(self, records) -> dict:
+        """
+        Returns the store's columns, copying only rows not yet cached.
+
+        The arrays are views into the cache and are only valid until the
+        history next changes. A store with a capacity is read without caching.
+
+        Returns:
+            dict: "codes", "result" and "timestamp" -> ndarray.
+        """
+        import numpy as np
+
+        if records.capacity is not None:
+            return {name: records.column(name) for name in self.COLUMNS}
+        total = len(records)
+        if total > self.rows:
+            new_rows = np.arange(self.rows, total, dtype=np.int64)
+            for name in self.COLUMNS:
+                values = records.take(name, new_rows)
+                cached = self._arrays.get(name)
+                if cached is None or len(cached) < total:
+                    # Grows geometrically so appends cost amortized O(new rows)
+                    grown = np.empty(max(total, 2 * len(cached) if cached is not None else 0),
+                                     dtype=values.dtype)
+                    if cached is not None:
+                        grown[:self.rows] = cached[:self.rows]
+                    cached = self._arrays[name] = grown
+                cached[self.rows:total] = values
+        self.rows = total
+        if not self._arrays:
+            return {name: records.column(name) for name in self.COLUMNS}
+        return {name: self._arrays[name][:total] for name in self.COLUMNS}
+
+    def block_stats(self, records) -> list:
+        """
+        Returns (count, sum, min, max) arrays indexed by operation code for each
+        full block of STATS_BLOCK_ROWS rows, computing only blocks not yet cached.
+        """
+        operations = len(records.names)
+        for block in range(len(self._blocks), len(records) // STATS_BLOCK_ROWS):
+            start = block * STATS_BLOCK_ROWS
+            self._blocks.append(_block_stats(*self.rows_between(records, start,
+                                                                start + STATS_BLOCK_ROWS),
+                                             operations))
+        return self._blocks
+
+    def rows_between(self, records, start: int, stop: int) -> tuple:
+        """Returns the codes and results of rows [start, stop)."""
+        import numpy as np
+
+        if records.capacity is None:
+            columns = self.columns(records)
+            return columns["codes"][start:stop], columns["result"][start:stop]
+        rows = np.arange(start, stop, dtype=np.int64)
+        return records.take("codes", rows), records.take("result", rows)
+
+def operation_stats(cache: ColumnCache, records) -> "pandas.DataFrame":
+    """
+    Aggregates results per operation.
+
+    Args:
+        cache (ColumnCache): The history's column cache.
+        records (RecordStore): The history's records.
+
+    Returns:
+        DataFrame: Indexed by operation, in the order the operations were
+        first recorded, with columns count, mean, min, max and sum. Text
+        entries are not counted.
+    """
+    import numpy as np
+    import pandas as pd
+
+    operations = len(records.names)
+    blocks = cache.block_stats(records)
+    tail = _block_stats(*cache.rows_between(records, len(blocks) * STATS_BLOCK_ROWS,
+                                            len(records)), operations)
+    # Operations first used after a block was cached are missing from it
+    totals = [np.zeros(operations, dtype=np.int64), np.zeros(operations),
+              np.full(operations, np.inf), np.full(operations, -np.inf)]
+    for block in blocks + [tail]:
+        used = len(block[0])
+        totals[0][:used] += block[0]
+        totals[1][:used] += block[1]
+        np.minimum(totals[2][:used], block[2], out=totals[2][:used])
+        np.maximum(totals[3][:used], block[3], out=totals[3][:used])
+    counts, sums, minimums, maximums = totals
+    present = np.flatnonzero(counts)
+    return pd.DataFrame({"count": counts[present], "mean": sums[present] / counts[present],
+                         "min": minimums[present], "max": maximums[present],
+                         "sum": sums[present]},
+                        index=pd.Index([records.names[code] for code in present],
+                                       name="operation"))
+
+def rolling_stats(columns: dict, window: float, code: int = None) -> "pandas.DataFrame":
+    """
+    Computes statistics of the results over a trailing time window at every
+    calculation.
+
+    Args:
+        columns (dict): Columns from `ColumnCache.columns`.
+        window (float): Window length in seconds.
+        code (int): Only calculations of this operation code; all when None.
+
+    Returns:
+        DataFrame: Indexed by the calculation's time, oldest first, with the
+        count, mean, min and max of the results in the `window` seconds up to
+        and including it.
+    """
+    import pandas as pd
+
+    codes = columns["codes"]
+    keep = codes != TEXT_CODE if code is None else codes == code
+    # Whole-second timestamps would otherwise get second resolution, which
+    # rounds sub-second windows
+    times = pd.to_datetime(columns["timestamp"][keep], unit="s").as_unit("ns")
+    series = pd.Series(columns["result"][keep], index=times)
+    if not series.index.is_monotonic_increasing:
+        series = series.sort_index(kind="stable")
+    rolling = series.rolling(pd.Timedelta(seconds=window))
+    return pd.DataFrame({"count": rolling.count(), "mean": rolling.mean(),
+                         "min": rolling.min(), "max": rolling.max()})
@@ -0,0 +1,122 @@
+"""
+This file contains `Autosave`, a background scheduler that keeps a history file
+up to date without explicit `save` commands.
+
+The history reports every change through its `on_change` hook, which only
+counts it. A background thread writes the history when it has unsaved changes
+and either `interval` seconds have passed or `max_changes` changes have piled
+up, so a burst of additions is coalesced into a single write. A failed write is
+logged and retried with the next one; the thread keeps running, and a failed
+final write when autosave stops is logged too. Each write goes to
+a temporary file that is renamed over the destination (see
+`app.history.formats.replace_atomically`), so a crash never leaves a corrupt
+file and loses at most the changes made since the last write.
+
+The history must be safe to snapshot from another thread, i.e. a
+`ThreadSafeHistory`.
+"""
+import threading
+from app.logging import logger
+
+class Autosave:
+    """
+    Periodically writes a history's unsaved changes to a file.
+
+    Attributes:
+        history (ThreadSafeHistory): The history to save.
+        file_path (str): Destination file; None uses HISTORYCSV_FILE.
+        interval (float): Maximum seconds between a change and its write.
+        max_changes (int): Unsaved changes that trigger a write right away.
+        saves (int): Number of writes performed.
+    """
+
+    def __init__(self, history, file_path: str = None, interval: float = 5.0,
+                 max_changes: int = 100):
+        if interval <= 0 or max_changes < 1:
+            raise ValueError("Autosave interval must be positive and max_changes at least 1.")
+        self.history = history
+        self.file_path = file_path
+        self.interval = interval
+        self.max_changes = max_changes
+        self.saves = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def start(self) -> "Autosave":
+        """Hooks into the history and starts the background thread."""
+        self.history.on_change = self._changed
+        self._thread = threading.Thread(target=self._run, name="history-autosave", daemon=True)
+        self._thread.start()
+        logger.info("Autosaving history every %ss or %d changes", self.interval, self.max_changes)
+        return self
+
+    def _changed(self):
+        with self._lock:
+            self._pending += 1
+            full = self._pending >= self.max_changes
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:  # pylint: disable=broad-exception-caught
+                # E.g. an unsupported file format; keep autosaving and retry later
+                logger.exception("Autosave failed")
+
+    def flush(self) -> bool:
+        """
+        Writes the history now if it has unsaved changes.
+
+        Returns:
+            bool: True if a file was written.
+
+        Raises:
+            Exception: Errors other than OSError from writing the history, e.g.
+            ValueError for an unsupported format; the changes stay pending.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, 0
+        if not pending:
+            return False
+        try:
+            file_path = self.history.write(self.file_path)
+        except Exception as error:
+            # Keep the changes pending so the next attempt retries them
+            with self._lock:
+                self._pending += pending
+            if not isinstance(error, OSError):
+                raise
+            logger.error("Autosave failed: %s", error)
+            return False
+        self.saves += 1
+        logger.info("Autosaved %d changes to %s", pending, file_path)
+        return True
+
+    def stop(self) -> bool:
+        """
+        Stops the background thread and writes any remaining changes. A failed
+        final write is logged rather than raised, so shutting down a session
+        always completes.
+
+        Returns:
+            bool: False if the remaining changes could not be written.
+        """
+        self.history.on_change = None
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        try:
+            self.flush()
+        except Exception:  # pylint: disable=broad-exception-caught
+            logger.exception("Final autosave failed; %d changes were not saved", self._pending)
+            return False
+        return self._pending == 0
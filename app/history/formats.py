@@ -0,0 +1,429 @@
+"""
+This file contains the on-disk formats `History` can save to and load from.
+
+CSV is the default and stays compatible with other tools. The binary ".npy"
+format stores the records as a NumPy structured array next to a small JSON
+sidecar ("<file>.json") holding the operation names and any text entries. Binary
+files are loaded with a read-only memory map, so loading takes constant time and
+only the pages that are read (e.g. by a tail query) are paged in. The array is
+replaced first and the sidecar last, and the sidecar records the row count and
+a hash of the newest rows, so a crash between the two replacements leaves a
+pair that `load_npy` rejects instead of mixing an old array with new metadata.
+
+The format is chosen by the HISTORY_FORMAT environment variable ("csv" or "npy")
+or, when that is unset, by the file extension.
+
+CSV files whose name ends in a compression extension (".gz", ".bz2", ".xz" or
+".zst", e.g. "history.csv.gz") are compressed and decompressed as they are
+streamed, so neither saving nor loading holds the compressed file in memory.
+zstd needs Python 3.14's `compression.zstd` or the `zstandard` package. The
+compressors' dictionaries already store each repeated operation name once.
+
+CSV files are read in chunks of rows by `read_csv_chunks`, optionally limited
+to a byte range, so multi-gigabyte exports load in bounded memory. `tail_offset`
+finds where the last N rows start by reading the file backwards, which assumes
+one line per row (entries containing newlines count as several rows).
+"""
+import collections
+import csv
+import hashlib
+import io
+import json
+import os
+import stat
+import tempfile
+from app.history.records import RECORD_FIELDS
+
+FORMATS = ("csv", "npy")
+
+# Columns written by History.save, and the values read back as NaN
+CSV_COLUMNS = ("Operation", "Name", "Num1", "Num2", "Result", "Timestamp")
+CSV_NA_VALUES = {column: ["nan"] for column in CSV_COLUMNS[2:]}
+
+# Newest records hashed into a binary history's sidecar to match it to its array
+SIDECAR_DIGEST_ROWS = 1024
+
+# Extensions of compressed CSV histories and the codec each selects
+COMPRESSIONS = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz", ".zst": "zstd"}
+
+def history_compression(file_path) -> str:
+    """Returns the codec a history file's extension selects, or None if it has none."""
+    return COMPRESSIONS.get(os.path.splitext(str(file_path))[1].lower())
+
+def _zstd():
+    # The stdlib module (Python 3.14+), else the zstandard package, else None
+    try:
+        from compression import zstd  # pylint: disable=import-outside-toplevel
+        return zstd
+    except ImportError:
+        pass
+    try:
+        import zstandard  # pylint: disable=import-outside-toplevel
+        return zstandard
+    except ImportError:
+        return None
+
+def compression_available(compression: str) -> bool:
+    """Returns whether the named codec can be used in this environment."""
+    return compression != "zstd" or _zstd() is not None
+
+def open_compressed(file, mode: str, compression: str):
+    """
+    Opens a binary stream that compresses what is written to `file`, or
+    decompresses what is read from it.
+
+    Args:
+        file: A path or a binary file object.
+        mode (str): "rb" or "wb".
+        compression (str): One of the COMPRESSIONS codecs.
+
+    Raises:
+        ValueError: If zstd is requested and no zstd module is installed.
+    """
+    if compression == "gzip":
+        import gzip
+        # Level 6 compresses nearly as well as the default 9 in a fraction of the time
+        return gzip.open(file, mode, compresslevel=6)
+    if compression == "bz2":
+        import bz2
+        return bz2.open(file, mode)
+    if compression == "xz":
+        import lzma
+        return lzma.open(file, mode)
+    zstd = _zstd()
+    if zstd is None:
+        raise ValueError("zstd compression needs Python 3.14 or the zstandard package.")
+    return zstd.open(file, mode)
+
+def history_format(file_path) -> str:
+    """
+    Returns the format to use for a history file.
+
+    Raises:
+        ValueError: If HISTORY_FORMAT names an unsupported format, or the file
+            has a compression extension but is not CSV.
+    """
+    name = os.getenv("HISTORY_FORMAT", "").lower()
+    if not name:
+        path = str(file_path).lower()
+        if history_compression(path) is not None:
+            path = os.path.splitext(path)[0]
+        name = "npy" if path.endswith(".npy") else "csv"
+    if name not in FORMATS:
+        raise ValueError(f"Unsupported history format '{name}'. Supported formats: "
+                         f"{', '.join(FORMATS)}.")
+    if name != "csv" and history_compression(file_path) is not None:
+        raise ValueError("Compression only applies to CSV history files.")
+    return name
+
+def sidecar_path(file_path) -> str:
+    """Returns the path of the JSON sidecar that accompanies a binary history file."""
+    return f"{file_path}.json"
+
+def _read_umask() -> int:
+    # os.umask can only be read by setting it, so this runs once, at import,
+    # rather than racing with background saves creating files
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+# Permissions of a newly created history file
+_NEW_FILE_MODE = 0o666 & ~_read_umask()
+
+def _file_mode(file_path) -> int:
+    # The existing file's permissions, or those of a new file
+    try:
+        return stat.S_IMODE(os.stat(file_path).st_mode)
+    except FileNotFoundError:
+        return _NEW_FILE_MODE
+
+def _fsync_directory(directory):
+    # Makes a rename durable; not every platform can open a directory
+    try:
+        descriptor = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+def replace_atomically(file_path, write):
+    """
+    Writes a file by writing a temporary file next to it and renaming it over
+    the destination, so a crash mid-write never leaves a truncated file and a
+    history still memory-mapped from the old file keeps its data.
+
+    The new file keeps the permissions of the file it replaces, or gets the
+    usual permissions for a new file, rather than the owner-only mode of a
+    temporary file.
+
+    Args:
+        file_path: Destination file.
+        write (callable): Called with the temporary path to write to.
+    """
+    directory, name = os.path.split(os.path.abspath(file_path))
+    descriptor, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{name}.", suffix=".tmp")
+    os.close(descriptor)
+    try:
+        write(temp_path)
+        os.chmod(temp_path, _file_mode(file_path))
+        # Make the new contents durable before they become visible under the real name
+        descriptor = os.open(temp_path, os.O_RDONLY)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    _fsync_directory(directory)
+
+def write_csv(frames, file_path, compression: str = None):
+    """
+    Writes DataFrames one after another as a CSV history file with a single
+    header row, streaming them through the named compression codec if one is
+    given. `frames` must yield at least one (possibly empty) frame.
+    """
+    if compression is None:
+        with open(file_path, "w", encoding="utf-8", newline="") as output:
+            _write_frames(frames, output)
+        return
+    with open_compressed(file_path, "wb", compression) as binary, \
+            io.TextIOWrapper(binary, encoding="utf-8", newline="") as output:
+        _write_frames(frames, output)
+
+def _write_frames(frames, output):
+    for index, frame in enumerate(frames):
+        frame.to_csv(output, index=False, header=not index, na_rep="nan")
+
+def save_npy(file_path, count: int, chunks, names: list, text: dict):
+    """
+    Writes records as a structured .npy file plus its JSON sidecar, streaming
+    them so only one chunk is in memory at a time.
+
+    Args:
+        file_path: Destination of the .npy file.
+        count (int): Total number of records `chunks` yields.
+        chunks: Structured arrays with the RECORD_FIELDS layout, in row order.
+        names (list): Operation names that the records' codes index into.
+        text (dict): Row number -> entry for text rows.
+    """
+    import numpy as np
+
+    dtype = np.dtype(list(RECORD_FIELDS))
+    newest = np.empty(0, dtype=dtype)
+
+    def write_array(path):
+        nonlocal newest
+        with open(path, "wb") as output:
+            np.lib.format.write_array_header_1_0(output, {
+                "descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False,
+                "shape": (count,)})
+            for chunk in chunks:
+                output.write(chunk.tobytes())
+                newest = np.concatenate((newest, chunk))[-SIDECAR_DIGEST_ROWS:]
+
+    def write_metadata(path):
+        with open(path, "w", encoding="utf-8") as output:
+            json.dump(metadata, output)
+
+    # The sidecar goes last: it only matches the array once both are in place
+    replace_atomically(file_path, write_array)
+    metadata = {"names": names, "text": {str(row): entry for row, entry in text.items()},
+                "rows": count, "digest": _records_digest(newest)}
+    replace_atomically(sidecar_path(file_path), write_metadata)
+
+def _records_digest(records) -> str:
+    # Hash of the newest records, which reads a bounded number of mapped pages
+    return hashlib.sha256(records[-SIDECAR_DIGEST_ROWS:].tobytes()).hexdigest()
+
+def load_npy(file_path):
+    """
+    Memory-maps a binary history file.
+
+    Returns:
+        tuple: (records, names, text) where `records` is a read-only structured
+        memmap and `names` and `text` come from the sidecar.
+
+    Raises:
+        FileNotFoundError: If the file or its sidecar does not exist.
+        ValueError: If the file does not hold history records, or the sidecar
+        was written for a different array, e.g. after an interrupted save.
+    """
+    import numpy as np
+
+    records = np.load(file_path, mmap_mode="r")
+    if records.dtype != np.dtype(list(RECORD_FIELDS)):
+        raise ValueError(f"{file_path} does not contain history records.")
+    with open(sidecar_path(file_path), encoding="utf-8") as sidecar:
+        metadata = json.load(sidecar)
+    if (metadata.get("rows") != len(records)
+            or metadata.get("digest") != _records_digest(records)):
+        raise ValueError(f"{file_path} does not match its sidecar {sidecar_path(file_path)}.")
+    text = {int(row): entry for row, entry in metadata["text"].items()}
+    return records, metadata["names"], text
+
+# Rows parsed per chunk when streaming a CSV history
+CSV_CHUNK_ROWS = 100_000
+# Bytes read per step when scanning a file backwards for line starts
+_TAIL_BLOCK = 1 << 16
+
+def csv_header(file_path):
+    """
+    Returns the column names of a CSV file and the byte offset where its data
+    starts. For a compressed file the offset is into the decompressed data.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+    """
+    compression = history_compression(file_path)
+    with open(file_path, "rb") if compression is None else \
+            open_compressed(file_path, "rb", compression) as source:
+        header = source.readline()
+        start = source.tell()
+    columns = next(csv.reader([header.decode("utf-8-sig")]), [])
+    return columns, start
+
+def tail_offset(file_path, count: int, data_start: int) -> int:
+    """
+    Returns the byte offset at which the last `count` lines of a file start,
+    never earlier than `data_start`.
+    """
+    with open(file_path, "rb") as source:
+        position = source.seek(0, os.SEEK_END)
+        if count <= 0:
+            return position
+        # A trailing newline ends the last line rather than starting a new one
+        if position > data_start:
+            source.seek(position - 1)
+            if source.read(1) == b"\n":
+                position -= 1
+        newlines = 0
+        while position > data_start:
+            step = min(_TAIL_BLOCK, position - data_start)
+            source.seek(position - step)
+            block = source.read(step)
+            index = len(block)
+            while True:
+                index = block.rfind(b"\n", 0, index)
+                if index < 0:
+                    break
+                newlines += 1
+                if newlines == count:
+                    return position - step + index + 1
+            position -= step
+    return data_start
+
+def _line_start(source, offset: int, data_start: int) -> int:
+    # The first line boundary at or after `offset`
+    if offset <= data_start:
+        return data_start
+    source.seek(offset - 1)
+    if source.read(1) != b"\n":
+        source.readline()
+    return source.tell()
+
+class _RangeReader(io.RawIOBase):
+    """A read-only stream over bytes [start, end) of a file, counting what was read."""
+
+    def __init__(self, source, start: int, end: int):
+        super().__init__()
+        self.source = source
+        self.remaining = end - start
+        self.consumed = 0
+        source.seek(start)
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        size = min(len(buffer), self.remaining)
+        if size <= 0:
+            return 0
+        data = self.source.read(size)
+        buffer[:len(data)] = data
+        self.remaining -= len(data)
+        self.consumed += len(data)
+        return len(data)
+
+def read_csv_chunks(file_path, start: int = None, end: int = None,
+                    chunk_size: int = CSV_CHUNK_ROWS, progress=None):
+    """
+    Parses a CSV history file chunk by chunk.
+
+    Only rows whose line starts within [start, end) are read; the bounds are
+    moved to line boundaries. Compressed files are decompressed as they are
+    parsed and can only be read whole.
+
+    Args:
+        file_path: The CSV file.
+        start (int): First byte offset to read; defaults to the first data row.
+        end (int): Byte offset to stop at; defaults to the end of the file.
+        chunk_size (int): Rows per DataFrame.
+        progress (callable): Called after each chunk as
+            progress(rows_read, bytes_read, bytes_total). For a compressed file
+            the bytes are those of the compressed file.
+
+    Yields:
+        DataFrame: Up to `chunk_size` rows with the file's header as columns.
+
+    Raises:
+        ValueError: If a byte range is given for a compressed file.
+    """
+    import pandas as pd
+
+    compression = history_compression(file_path)
+    if compression is not None and (start is not None or end is not None):
+        raise ValueError("Byte ranges only apply to uncompressed CSV history files.")
+    columns, data_start = csv_header(file_path)
+    with open(file_path, "rb") as source:
+        size = source.seek(0, os.SEEK_END)
+        if compression is None:
+            first = _line_start(source, data_start if start is None else start, data_start)
+            last = size if end is None or end >= size else _line_start(source, end, data_start)
+            if last <= first:
+                return
+            reader = _RangeReader(source, first, last)
+            binary = io.BufferedReader(reader)
+            consumed, total = lambda: reader.consumed, last - first
+        else:
+            source.seek(0)
+            binary = open_compressed(source, "rb", compression)
+            binary.readline()
+            consumed, total = source.tell, size
+        stream = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+        rows = 0
+        with pd.read_csv(stream, header=None, names=columns, chunksize=chunk_size,
+                         keep_default_na=False, na_values=CSV_NA_VALUES,
+                         dtype={"Operation": str, "Name": str},
+                         float_precision="round_trip") as chunks:
+            for chunk in chunks:
+                rows += len(chunk)
+                if progress is not None:
+                    progress(rows, consumed(), total)
+                yield chunk
+
+def last_rows(chunks, count: int):
+    """
+    Yields only the last `count` rows of a stream of DataFrame chunks, holding
+    no more than those rows plus one chunk in memory. Used for the tail of
+    files that cannot be read backwards.
+    """
+    kept = collections.deque()
+    rows = 0
+    for chunk in chunks:
+        kept.append(chunk)
+        rows += len(chunk)
+        while kept and rows - len(kept[0]) >= count:
+            rows -= len(kept.popleft())
+    if count <= 0:
+        return
+    skipped = max(rows - count, 0)
+    for chunk in kept:
+        yield chunk.iloc[skipped:] if skipped else chunk
+        skipped = 0
@@ -0,0 +1,102 @@
+"""
+This file contains history queries: selecting rows by operation, result range
+and time window, and aggregating results per operation.
+
+Queries work on the `RecordStore` columns and never format or parse entry text.
+Selecting by operation reads the store's per-operation index, a time window is
+found by binary search while timestamps are in order, and only the remaining
+candidate rows have their results compared.
+"""
+from app.history.records import TEXT_CODE
+
+def select_rows(records, operation: str = None, min_result: float = None,
+                max_result: float = None, since: float = None, until: float = None):
+    """
+    Returns the row numbers matching every given filter, ascending.
+
+    Text entries have no operation or result, so they only match queries that
+    filter by time alone.
+
+    Args:
+        records (RecordStore): The store to query.
+        operation (str): Only rows of this operation.
+        min_result (float): Only rows whose result is >= this value.
+        max_result (float): Only rows whose result is <= this value.
+        since (float): Only rows at or after this time (seconds since the epoch).
+        until (float): Only rows at or before this time.
+
+    Returns:
+        ndarray: int64 row numbers.
+    """
+    import numpy as np
+
+    if operation is not None:
+        code = records.code_of(operation)
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        rows = records.rows_for(code)
+    else:
+        rows = None
+
+    if since is not None or until is not None:
+        if records.time_ordered:
+            start = 0 if since is None else records.search_time(since, "left")
+            stop = len(records) if until is None else records.search_time(until, "right")
+            if rows is None:
+                rows = np.arange(start, stop, dtype=np.int64)
+            else:
+                rows = rows[np.searchsorted(rows, start):np.searchsorted(rows, stop)]
+        else:
+            if rows is None:
+                rows = np.arange(len(records), dtype=np.int64)
+            timestamps = records.take("timestamp", rows)
+            keep = np.ones(len(rows), dtype=bool)
+            if since is not None:
+                keep &= timestamps >= since
+            if until is not None:
+                keep &= timestamps <= until
+            rows = rows[keep]
+
+    if min_result is not None or max_result is not None:
+        if rows is None:
+            rows = np.arange(len(records), dtype=np.int64)
+        keep = records.take("codes", rows) != TEXT_CODE
+        results = records.take("result", rows)
+        if min_result is not None:
+            keep &= results >= min_result
+        if max_result is not None:
+            keep &= results <= max_result
+        rows = rows[keep]
+
+    return np.arange(len(records), dtype=np.int64) if rows is None else rows
+
+def summarize_rows(records, rows) -> dict:
+    """
+    Aggregates the results of the given rows per operation.
+
+    Args:
+        records (RecordStore): The store the rows belong to.
+        rows (ndarray): Ascending row numbers, e.g. from `select_rows`.
+
+    Returns:
+        dict: Operation name -> {"count", "sum", "min", "max"}, in order of
+        first use. Text rows are not counted.
+    """
+    import numpy as np
+
+    codes = records.take("codes", rows)
+    keep = codes != TEXT_CODE
+    codes, results = codes[keep], records.take("result", rows)[keep]
+    if not len(codes):
+        return {}
+    order = np.argsort(codes, kind="stable")
+    codes, results = codes[order], results[order]
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    counts = np.diff(np.r_[starts, len(codes)])
+    sums = np.add.reduceat(results, starts)
+    minimums = np.minimum.reduceat(results, starts)
+    maximums = np.maximum.reduceat(results, starts)
+    return {records.names[code]: {"count": int(count), "sum": float(total),
+                                  "min": float(low), "max": float(high)}
+            for code, count, total, low, high
+            in zip(codes[starts].tolist(), counts, sums, minimums, maximums)}
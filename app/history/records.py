@@ -0,0 +1,546 @@
+"""
+This file contains the columnar record store behind `History`. Each calculation
+is kept as typed columns in `array.array` buffers (operation code, two operands,
+result and timestamp) instead of a formatted string, and is only turned into text
+such as "add 2.0 3.0 = 5.0" when it is displayed.
+
+Entries that do not fit the columns, e.g. free-form strings or results that are
+not floats, are kept as text in a sparse side table keyed by row number.
+
+The oldest rows can also live in a read-only "base" segment: a NumPy structured
+array, typically memory-mapped from a saved history file, so that loading is
+constant time and only the pages that are actually read are touched.
+
+A store with a `capacity` keeps at most that many rows in memory. When the
+in-memory tail is full, its oldest quarter is appended to a spill segment file
+of raw records, which then becomes the memory-mapped base segment, so memory
+stays flat however long a session runs. Text of spilled text rows goes to a
+companion file and the row keeps the text's byte offset in its num1 field.
+A base segment can keep its text that way too (e.g. a restored snapshot, see
+`attach`), so its entries are only read when they are displayed.
+
+For queries, the store keeps a per-operation index of row numbers and tracks
+whether timestamps are in order. The index is built on the first query and then
+updated on every append and pop, so filtering by operation never scans other
+rows and time windows are found by binary search.
+
+`tail_rows` and `truncate` copy out and remove the newest rows in time
+proportional to the rows involved, which is what multi-entry undo and redo
+are built on. `rows` copies out any range of rows, so a save can stream the
+store in chunks; `generation` changes whenever existing rows are removed or
+replaced, which tells a chunked reader that the rows it started from are gone.
+"""
+import json
+import os
+import tempfile
+from array import array
+from bisect import bisect_left
+from app.numeric import format_number
+from app.registry import get_operation
+
+# Operation code used for rows stored as text
+TEXT_CODE = -1
+
+# Rows copied per write when a base segment is moved to the spill file
+SPILL_COPY_ROWS = 1 << 16
+
+# Layout of one record in structured arrays and binary history files
+RECORD_FIELDS = (("code", "<i2"), ("num1", "<f8"), ("num2", "<f8"), ("result", "<f8"),
+                 ("timestamp", "<f8"))
+
+def format_calculation(name: str, operands: tuple, result) -> str:
+    """
+    Formats a calculation the way the calculator displays it, through the
+    registered operation's `Operation.format`. Operations that are not
+    registered (e.g. read from a history file) are formatted the same way.
+    """
+    operation = get_operation(name)
+    if operation is not None:
+        return operation.format(operands, result)
+    return (f"{name} {' '.join(format_number(operand) for operand in operands)} = "
+            f"{format_number(result)}")
+
+def format_entry(name: str, num1: float, num2: float, result: float) -> str:
+    """Formats a two-operand calculation record; see `format_calculation`."""
+    return format_calculation(name, (num1, num2), result)
+
+def parse_entry(entry: str):
+    """
+    Parses a displayed calculation such as "add 2.0 3.0 = 5.0" back into fields.
+
+    Only entries that format back to exactly the same text are accepted, so
+    storing the parsed fields never changes what is displayed.
+
+    Returns:
+        tuple: (name, num1, num2, result), or None if the entry does not fit.
+    """
+    left, separator, right = entry.partition(" = ")
+    parts = left.split(" ")
+    if not separator or len(parts) != 3:
+        return None
+    name, num1, num2 = parts
+    try:
+        fields = (name, float(num1), float(num2), float(right))
+    except ValueError:
+        return None
+    if format_entry(*fields) != entry:
+        return None
+    return fields
+
+class RecordStore:
+    """
+    Append-only columns of calculation records with O(1) append and pop.
+
+    Rows are numbered from 0 across the base segment (if any) followed by the
+    in-memory tail columns. Appends always go to the tail; popping past the end
+    of the tail shrinks the base segment's visible length without copying.
+
+    Attributes:
+        capacity (int): Maximum rows kept in memory, or None for no limit.
+        spill_path (str): Segment file that rows beyond the capacity spill to; a
+            temporary file is used when None. Its companion text file is
+            "<spill_path>.text". Both are scratch files, removed by `close`.
+        names (list): Operation names, indexed by operation code.
+        codes (array): Operation code per tail row, or TEXT_CODE for text rows.
+        num1 (array): First operand per tail row.
+        num2 (array): Second operand per tail row.
+        result (array): Result per tail row.
+        timestamp (array): Seconds since the epoch per tail row.
+        text (dict): Row number -> entry for rows stored as text.
+        time_ordered (bool): Whether timestamps never decrease from row to row.
+        generation (int): Incremented whenever existing rows are removed or
+            replaced; appends and spills leave it unchanged.
+    """
+
+    COLUMNS = ("codes", "num1", "num2", "result", "timestamp")
+
+    def __init__(self, capacity: int = None, spill_path: str = None):
+        if capacity is not None and capacity < 1:
+            raise ValueError("History capacity must be at least 1.")
+        self.capacity = capacity
+        self.spill_path = spill_path
+        self.names = []
+        self._code_of = {}
+        self._spill_file = None
+        self._text_file = None
+        self._base_text = None
+        self.generation = 0
+        self.clear()
+
+    def clear(self):
+        """Removes all rows; the operation name table is kept."""
+        self.generation += 1
+        self.codes = array("h")
+        self.num1 = array("d")
+        self.num2 = array("d")
+        self.result = array("d")
+        self.timestamp = array("d")
+        self.text = {}
+        self._base = None
+        self._base_len = 0
+        # Whether the base segment is the spill file (rather than e.g. a loaded file)
+        self._spilled = False
+        self._close_base_text()
+        # File holding the base's text rows that are not in `text`, as JSON
+        # lines at the byte offsets in their num1 field; None if there are none
+        self._base_text = None
+        # Operation code -> row numbers, built by the first query
+        self._index = None
+        self.time_ordered = True
+
+    def __len__(self):
+        return self._base_len + len(self.codes)
+
+    def code_for(self, name: str) -> int:
+        """Returns the operation code for a name, assigning a new one if needed."""
+        code = self._code_of.get(name)
+        if code is None:
+            code = self._code_of[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def code_of(self, name: str):
+        """Returns the operation code for a name, or None if no row has used it."""
+        return self._code_of.get(name)
+
+    def _track(self, code: int, timestamp: float):
+        row = len(self)
+        if self.time_ordered and row and timestamp < self._timestamp_at(row - 1):
+            self.time_ordered = False
+        if self._index is not None and code != TEXT_CODE:
+            rows = self._index.get(code)
+            if rows is None:
+                rows = self._index[code] = array("q")
+            rows.append(row)
+
+    def _timestamp_at(self, row: int) -> float:
+        if row < self._base_len:
+            return float(self._base["timestamp"][row])
+        return self.timestamp[row - self._base_len]
+
+    def append(self, name: str, num1: float, num2: float, result: float, timestamp: float):
+        """Appends a structured calculation record."""
+        code = self.code_for(name)
+        self._track(code, timestamp)
+        self.codes.append(code)
+        self.num1.append(num1)
+        self.num2.append(num2)
+        self.result.append(result)
+        self.timestamp.append(timestamp)
+        if self.capacity is not None and len(self.codes) > self.capacity:
+            self._spill()
+
+    def append_text(self, entry: str, timestamp: float):
+        """Appends a record that is stored and displayed as the given text."""
+        self._track(TEXT_CODE, timestamp)
+        self.text[len(self)] = entry
+        self.codes.append(TEXT_CODE)
+        self.num1.append(0.0)
+        self.num2.append(0.0)
+        self.result.append(0.0)
+        self.timestamp.append(timestamp)
+        if self.capacity is not None and len(self.codes) > self.capacity:
+            self._spill()
+
+    def pop(self) -> str:
+        """Removes the last row and returns its displayed form."""
+        row = len(self) - 1
+        entry = self.format(row)
+        self.generation += 1
+        if self._index is not None:
+            code = self.codes[-1] if self.codes else int(self._base["code"][row])
+            if code != TEXT_CODE:
+                self._index[code].pop()
+        if self.codes:
+            for column in self.COLUMNS:
+                getattr(self, column).pop()
+        else:
+            self._base_len -= 1
+        self.text.pop(row, None)
+        return entry
+
+    def format(self, row: int) -> str:
+        """Returns the displayed form of a row."""
+        if row < self._base_len:
+            code, num1, num2, result, _ = self._base[row].tolist()
+        else:
+            tail = row - self._base_len
+            code = self.codes[tail]
+            num1, num2, result = self.num1[tail], self.num2[tail], self.result[tail]
+        if code == TEXT_CODE:
+            entry = self.text.get(row)
+            return self._read_text(int(num1)) if entry is None else entry
+        return format_entry(self.names[code], num1, num2, result)
+
+    def __iter__(self):
+        return (self.format(row) for row in range(len(self)))
+
+    def column(self, name: str):
+        """
+        Returns one column over all rows as a NumPy array.
+
+        The array is a zero-copy view when all rows are in one segment.
+
+        Args:
+            name (str): One of "codes", "num1", "num2", "result" or "timestamp".
+        """
+        import numpy as np
+
+        tail = np.frombuffer(getattr(self, name), dtype=np.int16 if name == "codes" else np.float64)
+        if self._base is None:
+            return tail
+        base = self._base["code" if name == "codes" else name][:self._base_len]
+        if name == "num1" and self._base_text is not None:
+            # Text rows keep a text offset in num1; report 0.0 as for other text rows
+            base = np.where(self._base["code"][:self._base_len] == TEXT_CODE, 0.0, base)
+        return np.concatenate((base, tail)) if len(tail) else base
+
+    def text_entries(self) -> dict:
+        """Returns row number -> entry for every text row, including spilled ones."""
+        entries = dict(self.text)
+        if self._base_text is not None:
+            import numpy as np
+
+            base = self._base[:self._base_len]
+            for row in np.flatnonzero(base["code"] == TEXT_CODE).tolist():
+                if row not in entries:
+                    entries[row] = self._read_text(int(base["num1"][row]))
+        return dict(sorted(entries.items()))
+
+    def to_structured(self):
+        """Returns all rows as a structured array with the RECORD_FIELDS layout."""
+        return self.rows(0, len(self))
+
+    def rows(self, start: int, stop: int):
+        """
+        Returns a copy of rows `start` to `stop` (exclusive) as a structured
+        array with the RECORD_FIELDS layout, reading only those rows. Text rows
+        have a zero num1; their entries come from `format` or `text_entries`.
+        """
+        import numpy as np
+
+        records = np.empty(stop - start, dtype=list(RECORD_FIELDS))
+        split = min(max(self._base_len - start, 0), len(records))
+        if split:
+            records[:split] = self._base[start:start + split]
+        tail = max(start - self._base_len, 0)
+        for field, column in zip(records.dtype.names, self.COLUMNS):
+            values = np.frombuffer(getattr(self, column),
+                                   dtype=np.int16 if column == "codes" else np.float64)
+            records[field][split:] = values[tail:tail + len(records) - split]
+        # Spilled text rows keep a text offset in num1
+        records["num1"][records["code"] == TEXT_CODE] = 0.0
+        return records
+
+    def copy(self) -> "RecordStore":
+        """Returns an independent in-memory copy of all rows (without a capacity)."""
+        snapshot = RecordStore()
+        snapshot.attach(self.to_structured(), self.names, self.text_entries())
+        return snapshot
+
+    def attach(self, base, names: list, text: dict, time_ordered: bool = None,
+               text_file=None):
+        """
+        Replaces all rows and the name table with a structured base segment,
+        without copying it.
+
+        Args:
+            base (ndarray): Records with the RECORD_FIELDS layout, e.g. a memmap.
+            names (list): Operation names that the base's codes index into.
+            text (dict): Row number -> entry for the base's text rows.
+            time_ordered (bool): Whether the base's timestamps are in order, if
+                known; otherwise every timestamp is read to find out.
+            text_file: A binary file, owned by the store from now on, holding the
+                entries of text rows missing from `text` as JSON lines at the
+                byte offsets stored in their num1 field; they are read on demand.
+        """
+        self.clear()
+        self.names = list(names)
+        self._code_of = {name: code for code, name in enumerate(self.names)}
+        self._base = base
+        self._base_len = len(base)
+        self.text = dict(text)
+        self._base_text = text_file
+        self.time_ordered = self._is_time_ordered() if time_ordered is None else time_ordered
+
+    def extend(self, names: list, codes, num1, num2, result, timestamp, text: dict):
+        """
+        Appends many rows at once from NumPy columns.
+
+        Args:
+            names (list): Operation names that the `codes` column indexes into.
+            codes, num1, num2, result, timestamp (ndarray): Column values.
+            text (dict): Offset within the new rows -> entry, for text rows.
+        """
+        import numpy as np
+
+        start = len(self)
+        timestamp = np.asarray(timestamp, dtype=np.float64)
+        # Only the new rows and the boundary with the existing ones need checking,
+        # so loading a file chunk by chunk stays linear
+        if self.time_ordered and len(timestamp):
+            self.time_ordered = bool(np.all(np.diff(timestamp) >= 0)) and (
+                not start or timestamp[0] >= self._timestamp_at(start - 1))
+        # Translate the caller's code table into this store's codes in one pass;
+        # code -1 picks the trailing TEXT_CODE entry
+        remap = np.array([self.code_for(name) for name in names] + [TEXT_CODE], dtype=np.int16)
+        self.codes.frombytes(remap[codes].tobytes())
+        for column, values in (("num1", num1), ("num2", num2), ("result", result),
+                               ("timestamp", timestamp)):
+            getattr(self, column).frombytes(np.asarray(values, dtype=np.float64).tobytes())
+        self.text.update((start + offset, entry) for offset, entry in text.items())
+        if self._index is not None:
+            self._index_rows(remap[codes], start)
+        if self.capacity is not None and len(self.codes) > self.capacity:
+            self._spill()
+
+    def _index_rows(self, codes, start: int):
+        # Adds rows start, start + 1, ... with the given codes to the index
+        import numpy as np
+
+        order = np.argsort(codes, kind="stable")
+        bounds = np.flatnonzero(np.diff(codes[order])) + 1
+        for rows in np.split(order, bounds):
+            code = int(codes[rows[0]]) if len(rows) else TEXT_CODE
+            if code != TEXT_CODE:
+                self._index.setdefault(code, array("q")).frombytes(
+                    (rows.astype(np.int64) + start).tobytes())
+
+    def tail_rows(self, start: int):
+        """
+        Returns copies of the rows from `start` on, e.g. to re-append them later
+        with `extend`.
+
+        Returns:
+            tuple: (records, text) where `records` is a structured array with the
+            RECORD_FIELDS layout and `text` maps offsets within it to entries.
+        """
+        import numpy as np
+
+        records = self.rows(start, len(self))
+        offsets = np.flatnonzero(records["code"] == TEXT_CODE)
+        return records, {offset: self.format(start + offset) for offset in offsets.tolist()}
+
+    def truncate(self, length: int):
+        """
+        Removes every row from `length` on, in time proportional to the number
+        of rows removed rather than the number kept.
+        """
+        import numpy as np
+
+        if length >= len(self):
+            return
+        self.generation += 1
+        codes = self.take("codes", np.arange(length, len(self), dtype=np.int64))
+        for offset in np.flatnonzero(codes == TEXT_CODE).tolist():
+            self.text.pop(length + offset, None)
+        if self._index is not None:
+            for rows in self._index.values():
+                del rows[bisect_left(rows, length):]
+        split = max(length - self._base_len, 0)
+        for column in self.COLUMNS:
+            del getattr(self, column)[split:]
+        self._base_len = min(self._base_len, length)
+
+    def _is_time_ordered(self) -> bool:
+        import numpy as np
+
+        return bool(np.all(np.diff(self.column("timestamp")) >= 0))
+
+    def rows_for(self, code: int):
+        """
+        Returns the row numbers of an operation's records, ascending, from the
+        per-operation index (building the index if no query has yet).
+
+        Returns:
+            ndarray: An int64 array (a copy, so the store can keep growing).
+        """
+        import numpy as np
+
+        if self._index is None:
+            codes = self.column("codes")
+            order = np.argsort(codes, kind="stable")
+            bounds = np.flatnonzero(np.diff(codes[order])) + 1
+            self._index = {}
+            for rows in np.split(order, bounds):
+                if len(rows) and codes[rows[0]] != TEXT_CODE:
+                    self._index[int(codes[rows[0]])] = array("q", rows.astype(np.int64).tobytes())
+        return np.array(self._index.get(code, ()), dtype=np.int64)
+
+    def search_time(self, timestamp: float, side: str = "left") -> int:
+        """
+        Returns the first row whose timestamp is >= (side "left") or >
+        (side "right") the given one. Requires `time_ordered`.
+        """
+        import numpy as np
+
+        if self._base_len:
+            row = int(np.searchsorted(self._base["timestamp"][:self._base_len], timestamp, side))
+            if row < self._base_len:
+                return row
+        tail = np.frombuffer(self.timestamp, dtype=np.float64)
+        return self._base_len + int(np.searchsorted(tail, timestamp, side))
+
+    def take(self, name: str, rows):
+        """
+        Returns one column's values at the given row numbers, without
+        concatenating the segments.
+
+        Args:
+            name (str): One of "codes", "num1", "num2", "result" or "timestamp".
+            rows (ndarray): Ascending row numbers.
+        """
+        import numpy as np
+
+        split = int(np.searchsorted(rows, self._base_len))
+        tail = np.frombuffer(getattr(self, name), dtype=np.int16 if name == "codes" else np.float64)
+        values = tail[rows[split:] - self._base_len]
+        if split:
+            base = self._base["code" if name == "codes" else name][rows[:split]]
+            values = np.concatenate((base, values))
+        return values
+
+    def _spill(self):
+        """Moves the oldest rows of the in-memory tail to the spill segment."""
+        import numpy as np
+
+        dtype = np.dtype(list(RECORD_FIELDS))
+        if self._spill_file is None:
+            self._open_spill_files()
+        if not self._spilled and self._base_len:
+            # The base is e.g. a loaded history file: copy it to the segment once,
+            # moving text it keeps in its own file to the spill text file
+            self._spill_file.seek(0)
+            self._text_file.seek(0, os.SEEK_END)
+            for start in range(0, self._base_len, SPILL_COPY_ROWS):
+                rows = np.array(self._base[start:min(start + SPILL_COPY_ROWS, self._base_len)])
+                if self._base_text is not None:
+                    for offset in np.flatnonzero(rows["code"] == TEXT_CODE).tolist():
+                        if start + offset not in self.text:
+                            entry = self._read_text(int(rows["num1"][offset]))
+                            rows["num1"][offset] = self._text_file.tell()
+                            self._text_file.write(json.dumps(entry).encode("utf-8") + b"\n")
+                self._spill_file.write(rows.tobytes())
+            self._close_base_text()
+
+        count = len(self.codes) - (self.capacity - self.capacity // 4)
+        rows = np.empty(count, dtype=dtype)
+        for field, column in zip(dtype.names, self.COLUMNS):
+            rows[field] = np.frombuffer(getattr(self, column), dtype=np.int16 if column == "codes"
+                                        else np.float64)[:count]
+        self._text_file.seek(0, os.SEEK_END)
+        for offset in np.flatnonzero(rows["code"] == TEXT_CODE).tolist():
+            entry = self.text.pop(self._base_len + offset, None)
+            if entry is not None:
+                rows["num1"][offset] = self._text_file.tell()
+                self._text_file.write(json.dumps(entry).encode("utf-8") + b"\n")
+        self._text_file.flush()
+
+        # Rows past _base_len in the segment were undone; overwrite them
+        self._spill_file.seek(self._base_len * dtype.itemsize)
+        self._spill_file.write(rows.tobytes())
+        self._spill_file.flush()
+        for column in self.COLUMNS:
+            del getattr(self, column)[:count]
+        self._base_len += count
+        self._base = np.memmap(self._spill_file, dtype=dtype, mode="r", shape=(self._base_len,))
+        self._spilled = True
+        self._base_text = self._text_file
+
+    def _open_spill_files(self):
+        if self.spill_path is None:
+            descriptor, self.spill_path = tempfile.mkstemp(prefix="history-", suffix=".spill")
+            os.close(descriptor)
+        # pylint: disable=consider-using-with
+        self._spill_file = open(self.spill_path, "w+b")
+        self._text_file = open(f"{self.spill_path}.text", "w+b")
+
+    def _read_text(self, offset: int) -> str:
+        if self._base_text.closed:
+            # A base text file closed by `close`: entries stay readable
+            # pylint: disable-next=consider-using-with
+            self._base_text = open(self._base_text.name, "rb")
+        self._base_text.seek(offset)
+        return json.loads(self._base_text.readline())
+
+    def _close_base_text(self):
+        # Closes a base text file that is not the store's own spill text file
+        if self._base_text is not None and self._base_text is not self._text_file:
+            self._base_text.close()
+        self._base_text = None
+
+    def close(self):
+        """
+        Removes the spill segment files, if any, and closes the base's text
+        file. A store without spill files can still be read afterwards.
+        """
+        if self._base_text is not None and self._base_text is not self._text_file:
+            self._base_text.close()
+        if self._spill_file is None:
+            return
+        self.generation += 1
+        self._base = None
+        for spill in (self._spill_file, self._text_file):
+            spill.close()
+            os.remove(spill.name)
+        self._spill_file = self._text_file = None
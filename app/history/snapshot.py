@@ -0,0 +1,132 @@
+"""
+This file contains the session snapshot format: one binary file holding a
+history's records together with the state derived from them and the state of
+the session that owns them, so a restarted calculator resumes without
+re-reading or re-parsing its history.
+
+A snapshot file is laid out as:
+
+    b"CALCSNAP"            magic
+    uint64 (little-endian) length of the JSON header
+    JSON header            version, row count, operation names, number of text
+                           rows, whether timestamps are in order, session state,
+                           and where the history's journal ended, if it had one
+    zero padding           up to a multiple of SNAPSHOT_ALIGNMENT bytes
+    records                raw RECORD_FIELDS records, one per row; text rows hold
+                           the file offset of their entry in num1
+    text entries           one JSON-encoded entry per line
+
+Restoring reads the header and memory-maps the records, so it takes the same
+time whatever the number of rows, including text rows such as the exact
+results of the int, decimal and fraction modes: rows, and the entries of text
+rows, are only read when they are displayed. Version 1 snapshots, which kept
+the text entries in the header, can still be restored, in time proportional
+to their text rows.
+The journal position lets a restarted session replay only the journal records
+written after the snapshot (see `History.resume`).
+"""
+import json
+import struct
+from app.history.formats import replace_atomically
+from app.history.records import RECORD_FIELDS, TEXT_CODE
+
+SNAPSHOT_MAGIC = b"CALCSNAP"
+SNAPSHOT_VERSION = 2
+# Records start at a multiple of this many bytes from the start of the file
+SNAPSHOT_ALIGNMENT = 64
+
+_LENGTH = struct.Struct("<Q")
+
+def _data_offset(header_length: int) -> int:
+    end = len(SNAPSHOT_MAGIC) + _LENGTH.size + header_length
+    return -(-end // SNAPSHOT_ALIGNMENT) * SNAPSHOT_ALIGNMENT
+
+def write_snapshot(file_path, count: int, chunks, names: list, text: dict,
+                   time_ordered: bool, state: dict, journal: dict = None):
+    """
+    Writes records and session state to a snapshot file, atomically. The
+    records are streamed, so only one chunk of them is in memory at a time.
+
+    Args:
+        file_path: Destination file.
+        count (int): Total number of records `chunks` yields.
+        chunks: Structured arrays with the RECORD_FIELDS layout, in row order.
+        names (list): Operation names that the records' codes index into.
+        text (dict): Row number -> entry for text rows.
+        time_ordered (bool): Whether the records' timestamps are in order.
+        state (dict): JSON-serializable session state, returned by `read_snapshot`.
+        journal (dict): Where the journal holding the same entries ended, or None.
+    """
+    import numpy as np
+
+    header = json.dumps({
+        "version": SNAPSHOT_VERSION,
+        "rows": count,
+        "names": names,
+        "text_rows": len(text),
+        "time_ordered": time_ordered,
+        "state": state,
+        "journal": journal,
+    }).encode("utf-8")
+    offset = _data_offset(len(header))
+    # Text entries follow the records; each text row points at its entry
+    entries = [json.dumps(entry).encode("utf-8") + b"\n" for entry in text.values()]
+    positions = np.cumsum([0] + [len(entry) for entry in entries[:-1]], dtype=np.int64)
+    positions += offset + count * np.dtype(list(RECORD_FIELDS)).itemsize
+    text_offsets = dict(zip(text, positions.tolist()))
+
+    def write(path):
+        with open(path, "wb") as output:
+            output.write(SNAPSHOT_MAGIC + _LENGTH.pack(len(header)) + header)
+            output.write(b"\0" * (offset - output.tell()))
+            start = 0
+            for chunk in chunks:
+                for row in np.flatnonzero(chunk["code"] == TEXT_CODE).tolist():
+                    chunk["num1"][row] = text_offsets[start + row]
+                output.write(chunk.tobytes())
+                start += len(chunk)
+            output.writelines(entries)
+
+    replace_atomically(file_path, write)
+
+def read_snapshot(file_path):
+    """
+    Reads a snapshot's header and memory-maps its records.
+
+    Returns:
+        tuple: (records, names, text, text_file, time_ordered, state, journal)
+        where `records` is a read-only structured memmap, `text_file` is an open
+        binary file holding the text rows' entries at the offsets in their num1
+        field (None if there are none; the caller closes it), `text` maps rows
+        to entries for version 1 snapshots, and the rest come from the header;
+        `journal` is None for snapshots taken without a journal.
+
+    Raises:
+        FileNotFoundError: If the file does not exist.
+        ValueError: If the file is not a snapshot or has an unsupported version.
+    """
+    import numpy as np
+
+    with open(file_path, "rb") as source:
+        prefix = source.read(len(SNAPSHOT_MAGIC) + _LENGTH.size)
+        if len(prefix) < len(SNAPSHOT_MAGIC) + _LENGTH.size or \
+                not prefix.startswith(SNAPSHOT_MAGIC):
+            raise ValueError(f"{file_path} is not a calculator snapshot.")
+        (length,) = _LENGTH.unpack(prefix[len(SNAPSHOT_MAGIC):])
+        header = json.loads(source.read(length))
+    if header.get("version") not in (1, SNAPSHOT_VERSION):
+        raise ValueError(f"Unsupported snapshot version {header.get('version')} "
+                         f"in {file_path}.")
+
+    dtype = np.dtype(list(RECORD_FIELDS))
+    if header["rows"]:
+        records = np.memmap(file_path, dtype=dtype, mode="r", offset=_data_offset(length),
+                            shape=(header["rows"],))
+    else:
+        # An empty file region cannot be memory-mapped
+        records = np.empty(0, dtype=dtype)
+    text = {int(row): entry for row, entry in header.get("text", {}).items()}
+    # pylint: disable-next=consider-using-with
+    text_file = open(file_path, "rb") if header.get("text_rows") else None
+    return (records, header["names"], text, text_file, header["time_ordered"],
+            header["state"], header.get("journal"))
@@ -0,0 +1,202 @@
+"""
+This file contains `ThreadSafeHistory`, a History that several threads can
+share, e.g. when it is embedded in a threaded worker service.
+
+Every method that reads or changes the entries holds a per-history lock while it
+touches them. For `add`, `record` and `record_many` that is only the columnar
+append, the journal write and the column-cache update; their log records and
+the `on_change` callback (e.g. `Autosave`) run after the lock is released, so a
+slow log file or callback never stalls other writers. Saving never copies the
+whole history: the row count, operation names and text entries are captured
+while holding the lock, and the rows are then streamed to the file in chunks,
+each read under the lock, so writers are only paused for one chunk at a time and
+memory stays bounded when a capacity spills rows to disk. If rows the save
+started from are removed meanwhile (an undo, clear or load), the save starts
+again from the current entries, holding the lock throughout after
+SAVE_ATTEMPTS tries. `save_async` runs the write on a background thread and
+returns a Future. Iteration streams the same way and raises RuntimeError if
+entries are removed or replaced before it finishes.
+
+The lock keeps writers consistent; it does not make them parallel. Appends are
+pure-Python work that holds CPython's global interpreter lock, so total append
+throughput stays roughly flat as writer threads are added (see
+`benchmarks/suite.py --only threads`). What the short critical sections buy is
+that writers are not blocked by each other's logging, callbacks or saves.
+"""
+import functools
+import threading
+from app.history import History
+from app.logging import logger
+
+# Saves restarted because the entries changed before holding the lock for one
+SAVE_ATTEMPTS = 3
+# Entries formatted per lock acquisition while iterating
+ITERATION_CHUNK_ROWS = 4096
+
+class _HistoryChanged(Exception):
+    """Raised while streaming rows when rows that were captured have been removed."""
+
+def _synchronized(method):
+    """
+    Wraps a History method so it runs while holding the history's lock. Changes
+    it makes are reported to `on_change` after the outermost locked call has
+    released the lock.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        changes = 0
+        try:
+            with self._lock:
+                self._depth += 1
+                try:
+                    return method(self, *args, **kwargs)
+                finally:
+                    self._depth -= 1
+                    if not self._depth:
+                        changes, self._unreported = self._unreported, 0
+        finally:
+            self._report(changes)
+    return wrapper
+
+def _log_saved(future):
+    if future.exception() is not None:
+        logger.error("Background save failed: %s", future.exception())
+    else:
+        logger.info("History saved to %s in the background", future.result())
+
+class ThreadSafeHistory(History):
+    """
+    A History whose methods can be called concurrently from several threads.
+
+    Iterating over it, or reading `history`, yields the entries present when
+    iteration starts, in chunks read under the lock. Background saves are
+    written one at a time, in the order they were requested.
+    """
+
+    def __init__(self, *args, **kwargs):
+        # Reentrant because locked methods call each other, e.g. a journal
+        # append may trigger compact_journal
+        self._lock = threading.RLock()
+        # Nesting of locked calls, and changes not yet passed to on_change
+        self._depth = 0
+        self._unreported = 0
+        self._saver = None
+        super().__init__(*args, **kwargs)
+
+    # add, record and record_many lock only these, and log outside the lock
+    _add = _synchronized(History._add)
+    _record = _synchronized(History._record)
+    _record_many = _synchronized(History._record_many)
+    clear = _synchronized(History.clear)
+    undo_last = _synchronized(History.undo_last)
+    redo = _synchronized(History.redo)
+    checkpoint = _synchronized(History.checkpoint)
+    undo_to = _synchronized(History.undo_to)
+    to_frame = _synchronized(History.to_frame)
+    tail = _synchronized(History.tail)
+    query = _synchronized(History.query)
+    aggregate = _synchronized(History.aggregate)
+    analytics = _synchronized(History.analytics)
+    rolling = _synchronized(History.rolling)
+    snapshot = _synchronized(History.snapshot)
+    _export = _synchronized(History._export)
+    _snapshot_rows = _synchronized(History._snapshot_rows)
+    load = _synchronized(History.load)
+    load_snapshot = _synchronized(History.load_snapshot)
+    resume = _synchronized(History.resume)
+    open_journal = _synchronized(History.open_journal)
+    compact_journal = _synchronized(History.compact_journal)
+    flush = _synchronized(History.flush)
+    __len__ = _synchronized(History.__len__)
+
+    def _notify(self):
+        # Called with the lock held; _synchronized reports the change later
+        self._unreported += 1
+
+    def _report(self, changes: int):
+        on_change = self.on_change
+        if on_change is not None:
+            for _ in range(changes):
+                on_change()
+
+    @property
+    def history(self) -> list:
+        """All entries formatted as strings."""
+        return list(self)
+
+    def __iter__(self):
+        """
+        Yields the entries present when iteration starts.
+
+        Raises:
+            RuntimeError: If entries are removed or replaced before iteration ends.
+        """
+        with self._lock:
+            count, generation = len(self.records), self.records.generation
+        for start in range(0, count, ITERATION_CHUNK_ROWS):
+            with self._lock:
+                if self.records.generation != generation:
+                    raise RuntimeError("History changed during iteration.")
+                entries = [self.records.format(row)
+                           for row in range(start, min(start + ITERATION_CHUNK_ROWS, count))]
+            yield from entries
+
+    def _read_rows(self, start: int, stop: int, generation: int):
+        with self._lock:
+            if self.records.generation != generation:
+                raise _HistoryChanged
+            return self.records.rows(start, stop)
+
+    def _retry(self, write, capture, captured):
+        # Runs write(captured), capturing the entries again if they changed
+        # underneath it, and finally holding the lock for the whole write
+        for _ in range(SAVE_ATTEMPTS):
+            try:
+                return write(captured)
+            except _HistoryChanged:
+                logger.info("History changed while it was being saved; saving it again")
+                captured = capture()
+        with self._lock:
+            return write(capture())
+
+    def _write(self, file_path, export) -> str:
+        return self._retry(functools.partial(History._write, self, file_path),
+                           self._export, export)
+
+    def _write_snapshot(self, file_path, state, captured):
+        return self._retry(functools.partial(History._write_snapshot, self, file_path, state),
+                           self._snapshot_rows, captured)
+
+    def save_async(self, file_path: str = None):
+        """
+        Captures the entries now and writes them on a background thread.
+        Completion is logged, not printed, so it does not interrupt the console.
+
+        Args:
+            file_path (str): Destination file; see `History.save`.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the path written, or raises
+            the error that prevented the write.
+        """
+        # Imported here so sessions that never save in the background do not load it
+        from concurrent.futures import ThreadPoolExecutor
+
+        export = self._export()
+        with self._lock:
+            if self._saver is None:
+                self._saver = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-save")
+            saver = self._saver
+        logger.info("Scheduled background save of %d entries", export[0])
+        future = saver.submit(self._write, file_path, export)
+        future.add_done_callback(_log_saved)
+        return future
+
+    def close(self):
+        """Waits for background saves, then closes the journal and spill files."""
+        with self._lock:
+            saver, self._saver = self._saver, None
+        if saver is not None:
+            saver.shutdown(wait=True)
+        with self._lock:
+            super().close()
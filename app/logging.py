@@ -1,20 +1,182 @@
+"""
+Logging configuration for the calculator.
+
+Records go to LOG_FILE and to the console. By default they are written
+synchronously by the thread that logs them. With LOG_ASYNC=1 the calling thread
+only puts the unformatted record on a queue; a background listener thread
+formats and writes records in batches of up to LOG_BATCH_SIZE, flushing the log
+file once per batch. Pending records are flushed when the process exits.
+Exact numbers too long for decimal text are logged in hexadecimal.
+
+Environment variables:
+    LOG_FILE: Path of the log file (default "default.log").
+    LOG_LEVEL: Minimum level that is logged (default "INFO").
+    LOG_ASYNC: "1"/"true"/"yes" to enable queue-backed logging.
+    LOG_BATCH_SIZE: Records written per batch in async mode (default 100).
+"""
+import atexit
 import logging
 import os
+import queue
+import sys
+from fractions import Fraction
+from logging.handlers import QueueHandler, QueueListener
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
+# Load environment variables from .env file. This is the only place the .env
+# file is parsed; every other module gets the values through app.logging.
 load_dotenv()
 
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+class LongNumberFilter(logging.Filter):
+    """
+    Rewrites record arguments that are exact numbers too long for decimal text,
+    e.g. 2 ** 20000 in int mode, as `app.numeric.format_number` shows them, so
+    every handler can format the record.
+    """
+
+    def filter(self, record):
+        limit = sys.get_int_max_str_digits()
+        if limit and isinstance(record.args, tuple) and any(
+                _bit_length(arg) > 3 * limit for arg in record.args):
+            # Imported here because app.numeric logs through this module
+            from app.numeric import format_number
+            record.args = tuple(format_number(arg) if _bit_length(arg) > 3 * limit else arg
+                                for arg in record.args)
+        return True
+
+def _bit_length(value) -> int:
+    # Bits in the larger part of an int or Fraction; 0 for other values
+    if isinstance(value, Fraction):
+        return max(value.numerator.bit_length(), value.denominator.bit_length())
+    return value.bit_length() if type(value) is int else 0
+
+class BatchFileHandler(logging.FileHandler):
+    """
+    A FileHandler that can leave flushing to its caller.
+
+    While `deferred` is set, records only reach the disk when `flush_batch` is
+    called or the file buffer fills, so a batch costs one write, not one per record.
+    """
+
+    deferred = False
+
+    def flush(self):
+        if not self.deferred:
+            super().flush()
+
+    def flush_batch(self):
+        """Writes buffered records to disk."""
+        super().flush()
+
+    def close(self):
+        self.flush_batch()
+        super().close()
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    A QueueHandler that enqueues records without formatting them.
+
+    The standard handler merges the message and its arguments in the logging
+    thread; here that work is left to the listener thread. Arguments passed to
+    the logger must therefore not be mutated after the call.
+    """
+
+    def prepare(self, record):
+        return record
+
+class BatchingQueueListener(QueueListener):
+    """A QueueListener that handles queued records in batches and then flushes."""
+
+    def __init__(self, record_queue, *handlers, batch_size: int = 100):
+        super().__init__(record_queue, *handlers, respect_handler_level=True)
+        self.batch_size = batch_size
+
+    def _monitor(self):
+        stopping = False
+        while not stopping:
+            batch = [self.dequeue(True)]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            for record in batch:
+                if record is self._sentinel:
+                    stopping = True
+                else:
+                    self.handle(record)
+            for handler in self.handlers:
+                getattr(handler, "flush_batch", handler.flush)()
+
 # Configure logging with a default file name if LOG_FILE is not set
 log_file = os.getenv("LOG_FILE", "default.log")
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(log_file),  # Logs to specified file
-        logging.StreamHandler()         # Also logs to console
-    ]
-)
+file_handler = BatchFileHandler(log_file)  # Logs to specified file
+console_handler = logging.StreamHandler()  # Also logs to console
+for _handler in (file_handler, console_handler):
+    _handler.setFormatter(logging.Formatter(LOG_FORMAT))
 
 # Create a named logger
 logger = logging.getLogger("Calculator")
+logger.addFilter(LongNumberFilter())
+
+_queue_handler = None
+_listener = None
+
+def _env_flag(name: str) -> bool:
+    return os.getenv(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+def configure_logging(asynchronous: bool = None, level=None, batch_size: int = None):
+    """
+    Attaches the file and console handlers to the root logger.
+
+    Calling it again replaces the previous configuration, flushing any records
+    still queued by an asynchronous listener.
+
+    Args:
+        asynchronous (bool): Use a background listener thread; defaults to LOG_ASYNC.
+        level (str or int): Minimum level logged; defaults to LOG_LEVEL or INFO.
+        batch_size (int): Records per batch in async mode; defaults to LOG_BATCH_SIZE.
+    """
+    global _queue_handler, _listener
+    if asynchronous is None:
+        asynchronous = _env_flag("LOG_ASYNC")
+    if level is None:
+        level = os.getenv("LOG_LEVEL", "INFO")
+    if batch_size is None:
+        batch_size = int(os.getenv("LOG_BATCH_SIZE", "100"))
+
+    shutdown_logging()
+    root = logging.getLogger()
+    for handler in (file_handler, console_handler, _queue_handler):
+        if handler in root.handlers:
+            root.removeHandler(handler)
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+    file_handler.deferred = asynchronous
+    if asynchronous:
+        record_queue = queue.SimpleQueue()
+        _queue_handler = DeferredQueueHandler(record_queue)
+        _listener = BatchingQueueListener(record_queue, file_handler, console_handler,
+                                          batch_size=batch_size)
+        _listener.start()
+        root.addHandler(_queue_handler)
+    else:
+        root.addHandler(file_handler)
+        root.addHandler(console_handler)
+
+def shutdown_logging():
+    """Stops the asynchronous listener, if any, after it has written every queued record."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    file_handler.flush_batch()
+
+def disable_console_logging():
+    """Stops log records from being echoed to the console; file logging is kept."""
+    console_handler.setLevel(logging.CRITICAL + 1)
+
+configure_logging()
+atexit.register(shutdown_logging)
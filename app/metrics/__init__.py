@@ -0,0 +1,232 @@
+"""
+This file contains the calculator's built-in instrumentation: counters and
+latency histograms kept in process, and an opt-in cProfile hook.
+
+Metrics are identified by a name and optional labels, e.g.
+`metrics.increment("calculator_operations_total", operation="add")`, and can be
+exported as JSON or in the Prometheus text exposition format. Recording a value
+costs a dictionary lookup and, for histograms, a bisect over the bucket bounds,
+so instrumentation stays on in production.
+
+Environment variables:
+    CALC_METRICS_FILE: When set, metrics are written to this file when a
+        session ends or a batch finishes.
+    CALC_METRICS_FORMAT: "json" or "prometheus"; defaults to "prometheus" for
+        files ending in .prom and "json" otherwise.
+    CALC_PROFILE: When set, a REPL session runs under cProfile and the profile
+        is written to this file (readable with `python -m pstats`) on exit.
+"""
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from app.logging import logger
+
+# Upper bounds, in seconds, of the latency histogram buckets
+DEFAULT_BUCKETS = (1e-6, 5e-6, 1e-5, 5e-5, 1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0, 5.0)
+
+METRIC_FORMATS = ("json", "prometheus")
+
+class Histogram:
+    """
+    A fixed-bucket histogram of observed values.
+
+    Attributes:
+        bounds (tuple): Upper bound of each bucket, ascending.
+        counts (list): Observations per bucket; the last entry counts values
+            above every bound.
+        sum (float): Sum of all observed values.
+        count (int): Number of observations.
+    """
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple = DEFAULT_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        """Records one value."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list:
+        """Returns (upper bound, observations <= bound) pairs, ending with +Inf."""
+        pairs, total = [], 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+def _format_labels(key: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+class Metrics:
+    """
+    A registry of counters and histograms.
+
+    Attributes:
+        counters (dict): (name, labels) -> count.
+        histograms (dict): (name, labels) -> Histogram.
+
+    Values may be recorded from several threads (the server handles requests
+    in a thread pool); a lock keeps updates and exports consistent.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, amount: int = 1, **labels):
+        """Adds `amount` to a counter."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels):
+        """Records a value, typically a duration in seconds, in a histogram."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """Observes the wall time spent in the `with` block, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        """Discards every recorded value."""
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def to_dict(self) -> dict:
+        """
+        Returns the metrics as plain data.
+
+        Returns:
+            dict: {"counters": [...], "histograms": [...]}, where each entry has
+            "name" and "labels", plus "value" for counters or "count", "sum" and
+            cumulative "buckets" for histograms.
+        """
+        with self._lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in sorted(self.counters.items())]
+            histograms = [{"name": name, "labels": dict(labels), "count": histogram.count,
+                           "sum": histogram.sum,
+                           "buckets": {_format_bound(bound): total
+                                       for bound, total in histogram.cumulative()}}
+                          for (name, labels), histogram in sorted(self.histograms.items())]
+        return {"counters": counters, "histograms": histograms}
+
+    def to_json(self) -> str:
+        """Returns the metrics as a JSON document; see `to_dict`."""
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Returns the metrics in the Prometheus text exposition format."""
+        lines, typed = [], set()
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = [(key, histogram.cumulative(), histogram.sum, histogram.count)
+                          for key, histogram in sorted(self.histograms.items())]
+        for (name, labels), value in counters:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+        for (name, labels), cumulative, total_sum, count in histograms:
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            for bound, total in cumulative:
+                bucket = _format_labels(labels, f'le="{_format_bound(bound)}"')
+                lines.append(f"{name}_bucket{bucket} {total}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {total_sum!r}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, metric_format: str = "json") -> str:
+        """
+        Returns the metrics in the given format.
+
+        Raises:
+            ValueError: If the format is not "json" or "prometheus".
+        """
+        if metric_format == "json":
+            return self.to_json()
+        if metric_format == "prometheus":
+            return self.to_prometheus()
+        raise ValueError(f"Unsupported metrics format '{metric_format}'. Supported formats: "
+                         f"{', '.join(METRIC_FORMATS)}.")
+
+# The process-wide registry the calculator records into
+metrics = Metrics()
+
+def dump_metrics(file_path: str = None, metric_format: str = None):
+    """
+    Writes the metrics to a file, by default the one named by CALC_METRICS_FILE.
+
+    Does nothing when no file is given and CALC_METRICS_FILE is unset.
+
+    Args:
+        file_path (str): Destination file.
+        metric_format (str): "json" or "prometheus"; defaults to
+            CALC_METRICS_FORMAT, then to the file extension.
+    """
+    file_path = file_path or os.getenv("CALC_METRICS_FILE")
+    if not file_path:
+        return
+    metric_format = metric_format or os.getenv("CALC_METRICS_FORMAT", "").lower() or (
+        "prometheus" if file_path.endswith(".prom") else "json")
+    text = metrics.export(metric_format)
+    with open(file_path, "w", encoding="utf-8") as output:
+        output.write(text)
+    logger.info("Metrics written to %s", file_path)
+
+def start_profiling():
+    """
+    Starts a cProfile profiler if CALC_PROFILE is set.
+
+    Returns:
+        cProfile.Profile: The running profiler, or None when profiling is off.
+    """
+    if not os.getenv("CALC_PROFILE"):
+        return None
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    logger.info("Profiling enabled.")
+    return profiler
+
+def stop_profiling(profiler, file_path: str = None):
+    """Stops a profiler from `start_profiling` and writes its stats to CALC_PROFILE."""
+    if profiler is None:
+        return
+    profiler.disable()
+    file_path = file_path or os.getenv("CALC_PROFILE")
+    profiler.dump_stats(file_path)
+    logger.info("Profile written to %s", file_path)
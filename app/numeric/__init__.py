@@ -0,0 +1,183 @@
+"""
+This file contains the numeric backends a calculator session can evaluate with.
+A backend decides how operands are parsed and evaluates operations on them:
+
+- "float": Python floats, the default and the fastest.
+- "int": exact integers. Operands must be whole numbers; arithmetic is exact
+  (division yields a fraction such as 1/3 when it does not divide evenly) and
+  results that are whole numbers are shown as integers, so `exponent 2 1000`
+  is computed exactly instead of overflowing.
+- "decimal": `decimal.Decimal` with a per-session precision (significant digits).
+  Note that Decimal's remainder takes the sign of the dividend.
+- "fraction": exact rationals (`fractions.Fraction`); operands may be written
+  as "1/3".
+
+Arithmetic errors such as overflow are reported as ValueError, like the
+zero-divisor errors raised by the operations themselves.
+
+Exact results can have more digits than Python converts to decimal text (see
+`sys.set_int_max_str_digits`); `format_number` shows those in hexadecimal.
+"""
+import decimal
+from fractions import Fraction
+from app.logging import logger
+
+DEFAULT_DECIMAL_PRECISION = 28
+
+def format_number(value) -> str:
+    """
+    Formats an operand or result as text, e.g. for the history and the REPL.
+
+    Integers and fractions whose decimal form exceeds Python's integer string
+    conversion limit are written exactly in hexadecimal, e.g. "0x1000...0" or
+    "0x..../0x...", which takes linear time, instead of raising ValueError.
+    """
+    try:
+        return str(value)
+    except ValueError:
+        if isinstance(value, Fraction):
+            if value.denominator == 1:
+                return f"{value.numerator:#x}"
+            return f"{value.numerator:#x}/{value.denominator:#x}"
+        return f"{value:#x}"
+
+class NumericBackend:
+    """
+    Parses operands and evaluates operations for one kind of number.
+
+    Attributes:
+        name (str): The backend's name, e.g. "float".
+    """
+
+    name: str = ""
+
+    def parse(self, text: str):
+        """
+        Converts an operand from its text form.
+
+        Raises:
+            ValueError: If the text is not a valid number for this backend.
+        """
+        raise NotImplementedError
+
+    def _apply(self, operation, operands: tuple):
+        # The implementation is called directly, skipping Operation.__call__
+        return operation.func(*operands)
+
+    def evaluate(self, operation, operands: tuple):
+        """
+        Applies an operation to parsed operands.
+
+        Raises:
+            ValueError: If the operation rejects its operands or the result
+            cannot be represented, e.g. on overflow.
+        """
+        try:
+            return self._apply(operation, operands)
+        except (OverflowError, decimal.Overflow) as error:
+            logger.error("%s overflowed: %s", operation.name, error)
+            raise ValueError("result is too large to represent.") from error
+        except ArithmeticError as error:
+            logger.error("%s failed: %r", operation.name, error)
+            raise ValueError(f"{operation.name} is undefined for these operands.") from error
+
+    def __str__(self):
+        return self.name
+
+class FloatBackend(NumericBackend):
+    """Binary floating point, as used by the calculator by default."""
+
+    name = "float"
+
+    def parse(self, text: str) -> float:
+        return float(text)
+
+class FractionBackend(NumericBackend):
+    """Exact rational arithmetic."""
+
+    name = "fraction"
+
+    def parse(self, text: str) -> Fraction:
+        return Fraction(text)
+
+class IntBackend(FractionBackend):
+    """Exact integer arithmetic; results that are whole numbers are shown as ints."""
+
+    name = "int"
+
+    def parse(self, text: str) -> Fraction:
+        return Fraction(int(text))
+
+    def _apply(self, operation, operands: tuple):
+        # Whole results are ints, which would divide as floats if passed back in,
+        # e.g. as the operand of the next operation in an expression
+        result = operation.func(*(Fraction(operand) if type(operand) is int else operand
+                                  for operand in operands))
+        if isinstance(result, Fraction) and result.denominator == 1:
+            return int(result)
+        return result
+
+class DecimalBackend(NumericBackend):
+    """
+    Decimal arithmetic with a fixed number of significant digits.
+
+    Attributes:
+        precision (int): Significant digits kept by each operation.
+    """
+
+    name = "decimal"
+
+    def __init__(self, precision: int = DEFAULT_DECIMAL_PRECISION):
+        if precision < 1:
+            raise ValueError("Precision must be at least 1.")
+        self.precision = precision
+        self.context = decimal.Context(prec=precision)
+
+    def parse(self, text: str) -> decimal.Decimal:
+        try:
+            return decimal.Decimal(text)
+        except decimal.InvalidOperation:
+            raise ValueError(f"invalid decimal number: {text!r}") from None
+
+    def _apply(self, operation, operands: tuple):
+        with decimal.localcontext(self.context):
+            return operation.func(*operands)
+
+    def __str__(self):
+        return f"decimal (precision {self.precision})"
+
+BACKENDS = {backend.name: backend for backend in
+            (FloatBackend, IntBackend, DecimalBackend, FractionBackend)}
+
+def create_backend(name: str = "float", precision: int = None) -> NumericBackend:
+    """
+    Creates a numeric backend by name.
+
+    Args:
+        name (str): One of "float", "int", "decimal" or "fraction".
+        precision (int): Significant digits for the decimal backend.
+
+    Raises:
+        ValueError: If the name is unknown, or a precision is given for a
+        backend other than decimal.
+    """
+    backend = BACKENDS.get(name.lower())
+    if backend is None:
+        raise ValueError(f"Unknown numeric mode '{name}'. Supported modes: {', '.join(BACKENDS)}.")
+    if backend is DecimalBackend:
+        return DecimalBackend(DEFAULT_DECIMAL_PRECISION if precision is None else precision)
+    if precision is not None:
+        raise ValueError(f"Precision only applies to the decimal mode, not '{name}'.")
+    return backend()
+
+def parse_mode(argument: str) -> NumericBackend:
+    """
+    Creates a backend from a mode argument such as "int" or "decimal 50".
+
+    Raises:
+        ValueError: If the argument is malformed or names an unknown mode.
+    """
+    name, *precision = argument.split()
+    if len(precision) > 1:
+        raise ValueError("Usage: mode <float|int|decimal [precision]|fraction>")
+    return create_backend(name, int(precision[0]) if precision else None)
@@ -3,8 +3,23 @@ This file contains basic arithmetic functions for addition, subtraction, multipl
 division, modulus, and exponentiation. Each function takes two float numbers as inputs 
 and returns the result of the specified operation. The division and modulus functions 
 include error handling to prevent division or modulus by zero.
+
+`modular_exponent` computes (a ** b) % m on whole numbers without overflow.
+`evaluate_batch` applies the same operations element-wise over NumPy arrays and
+records per-operation batch timings in `app.metrics`. The functions are
+registered with `app.registry` under the names the calculator accepts.
+
+Each registered operation also has a logging-free variant. `configure_operations`
+installs those when INFO records would be discarded anyway (e.g. LOG_LEVEL=WARNING),
+so a quiet process does not pay for building log calls on every calculation;
+errors are still logged in both modes.
 """
+import logging
+import operator
+import time
 from app.logging import logger
+from app.metrics import metrics
+from app.registry import get_operation, register_operation
 
 def addition(a: float, b: float) -> float:
     """This function takes two float numbers as arguments and returns their sum."""
@@ -49,3 +64,165 @@ def exponent(a: float, b: float) -> float:
     result = a ** b
     logger.info("Performed exponentiation: %s ** %s = %s", a, b, result)
     return result
+
+# Floats at or beyond this magnitude may have been rounded from the number entered
+_EXACT_FLOAT_LIMIT = 2 ** 53
+
+def _as_integer(value, role: str) -> int:
+    """
+    Converts a whole-number operand of any numeric type to int.
+
+    Floats too large to be known exact are rejected rather than giving a
+    wrong answer for the number that was rounded to them.
+    """
+    try:
+        integer = int(value)
+    except (TypeError, ValueError, OverflowError):
+        integer = None
+    if integer is None or integer != value:
+        logger.error("Non-integer %s for modular exponentiation: %s", role, value)
+        raise ValueError(f"powmod requires a whole-number {role}.")
+    if isinstance(value, float) and abs(value) >= _EXACT_FLOAT_LIMIT:
+        logger.error("Inexact %s for modular exponentiation: %s", role, value)
+        raise ValueError(f"powmod {role} {value:g} is too large to be exact as a float.")
+    return integer
+
+def modular_exponent(a, b, m) -> int:
+    """
+    Returns (a ** b) % m for whole numbers, using fast modular exponentiation.
+
+    The power is never computed in full, so huge exponents are cheap. A negative
+    exponent computes a modular inverse.
+    """
+    if m == 0:
+        logger.error("Attempted modular exponentiation with modulus zero: %s ** %s %% %s", a, b, m)
+        raise ValueError("modulus by zero is not allowed.")
+    result = pow(_as_integer(a, "base"), _as_integer(b, "exponent"), _as_integer(m, "modulus"))
+    logger.info("Performed modular exponentiation: %s ** %s %% %s = %s", a, b, m, result)
+    return result
+
+def _quiet_division(a, b):
+    if b == 0:
+        logger.error("Attempted division by zero: %s / %s", a, b)
+        raise ValueError("division by zero is not allowed.")
+    return a / b
+
+def _quiet_modulus(a, b):
+    if b == 0:
+        logger.error("Attempted modulus by zero: %s %% %s", a, b)
+        raise ValueError("modulus by zero is not allowed.")
+    return a % b
+
+def _quiet_modular_exponent(a, b, m):
+    if m == 0:
+        logger.error("Attempted modular exponentiation with modulus zero: %s ** %s %% %s", a, b, m)
+        raise ValueError("modulus by zero is not allowed.")
+    return pow(_as_integer(a, "base"), _as_integer(b, "exponent"), _as_integer(m, "modulus"))
+
+# Operation name -> (logged implementation, logging-free implementation)
+_VARIANTS = {
+    "add": (addition, operator.add),
+    "subtract": (subtraction, operator.sub),
+    "multiply": (multiplication, operator.mul),
+    "divide": (division, _quiet_division),
+    "modulus": (modulus, _quiet_modulus),
+    "exponent": (exponent, operator.pow),
+    "powmod": (modular_exponent, _quiet_modular_exponent),
+}
+
+def configure_operations(quiet: bool = None) -> bool:
+    """
+    Installs the logged or the logging-free implementation of each built-in
+    operation in the registry.
+
+    Called when this module is imported; call it again after changing the log
+    level. Operations that other code has re-registered are left alone.
+
+    Args:
+        quiet (bool): Use the logging-free variants; defaults to whether the
+            calculator's logger discards INFO records.
+
+    Returns:
+        bool: Whether the logging-free variants are installed.
+    """
+    if quiet is None:
+        quiet = not logger.isEnabledFor(logging.INFO)
+    for name, (logged, fast) in _VARIANTS.items():
+        operation = get_operation(name)
+        if operation is not None and operation.func in (logged, fast):
+            operation.func = fast if quiet else logged
+    logger.debug("Operations configured with logging %s.", "off" if quiet else "on")
+    return quiet
+
+def evaluate_batch(op: str, a, b):
+    """
+    Applies a registered operation element-wise to two array-likes of operands.
+
+    Instead of raising on a zero divisor, the offending elements are set to NaN
+    and flagged in the returned error mask. Elements whose operands are finite
+    but whose result is not, i.e. overflow such as 10 ** 400 (inf) or an
+    undefined result (NaN), are flagged too and keep that value. A single
+    summary record is logged per batch rather than one per element.
+
+    Args:
+        op (str): Operation name or alias, e.g. "add" or "divide".
+        a (array_like): First operands.
+        b (array_like): Second operands, broadcastable against `a`.
+
+    Returns:
+        tuple: (results, errors) where `results` is a float64 array and `errors`
+        is a boolean array marking elements that could not be computed.
+
+    Raises:
+        ValueError: If the operation is unknown or has no vectorized implementation.
+    """
+    import numpy as np
+
+    operation = get_operation(op)
+    if operation is None or operation.vector is None or operation.arity != 2:
+        logger.error("No batch implementation for operation: %s", op)
+        raise ValueError(f"Unknown operation '{op}'.")
+
+    start = time.perf_counter()
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=np.float64), np.asarray(b, dtype=np.float64))
+    if operation.zero_guard:
+        errors = b == 0
+    else:
+        errors = np.zeros(a.shape, dtype=bool)
+
+    # Any element-wise callable may be registered, so the vector form is called
+    # without ufunc keywords and the zero divisors are masked afterwards
+    with np.errstate(all="ignore"):
+        results = np.array(np.broadcast_to(operation.vector(a, b), a.shape), dtype=np.float64)
+    results[errors] = np.nan
+    invalid = ~np.isfinite(results) & ~errors & np.isfinite(a) & np.isfinite(b)
+
+    metrics.observe("calculator_batch_seconds", time.perf_counter() - start,
+                    operation=operation.name)
+    metrics.increment("calculator_batch_elements_total", int(errors.size),
+                      operation=operation.name)
+
+    if errors.any():
+        logger.error("Attempted %s by zero in %d of %d batch elements",
+                     operation.zero_guard, np.count_nonzero(errors), errors.size)
+    if invalid.any():
+        logger.error("Batch %s overflowed or was undefined in %d of %d elements",
+                     operation.name, np.count_nonzero(invalid), invalid.size)
+        errors |= invalid
+    logger.info("Performed batch %s on %d elements", operation.name, errors.size)
+    return results, errors
+
+# Register the built-in operations with the calculator's dispatch table
+# Vectorized forms are named by NumPy ufunc so NumPy is only imported by batch work
+register_operation("add", addition, symbol="+", aliases=("+",), vector="add")
+register_operation("subtract", subtraction, symbol="-", aliases=("-",), vector="subtract")
+register_operation("multiply", multiplication, symbol="*", aliases=("*",), vector="multiply")
+register_operation("divide", division, symbol="/", aliases=("/",), zero_guard="division",
+                   vector="divide")
+register_operation("modulus", modulus, symbol="%", aliases=("%", "mod"), zero_guard="modulus",
+                   vector="mod")
+register_operation("exponent", exponent, symbol="^", aliases=("^", "**", "pow"),
+                   vector="power")
+register_operation("powmod", modular_exponent, arity=3, zero_guard="modulus",
+                   integer_operands=True)
+configure_operations()
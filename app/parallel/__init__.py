@@ -0,0 +1,119 @@
+"""
+This file contains a process-pool evaluator for large job files of
+"<operation> <num1> <num2>" lines. The file is split into shards of
+`chunk_size` lines that are evaluated in parallel by worker processes, each
+using the same vectorized chunk evaluation as batch mode. Results are written
+and recorded in input order, and at most a few shards per worker are in flight
+at any time, so memory stays bounded for arbitrarily large files.
+
+Successful calculations are only sent back from the workers and recorded in a
+History when the caller asks for them, so evaluating without one keeps memory
+independent of the file's length.
+
+Worker processes resolve operations through `app.registry`. Operations
+registered at runtime are only visible to workers when the pool is started by
+forking, the default on Linux.
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from itertools import islice
+from app.calculator import evaluate_results, format_result, parse_lines
+from app.history import History
+from app.logging import disable_console_logging, logger
+
+# Shards submitted per worker ahead of the one being written
+SHARDS_IN_FLIGHT_PER_WORKER = 2
+
+def evaluate_shard(lines: list, record: bool = True):
+    """
+    Evaluates one shard of input lines in a worker process.
+
+    Args:
+        lines (list): The shard's input lines.
+        record (bool): Whether to return the successful calculations.
+
+    Returns:
+        tuple: (output lines, records) where `records` holds a
+        (name, operands, result) tuple per successful calculation, or is
+        empty when `record` is False.
+    """
+    results = evaluate_results(list(parse_lines(lines)))
+    outputs = [format_result(*result) for result in results]
+    if not record:
+        return outputs, []
+    records = [(operation.name, operands, result)
+               for operation, operands, result, error in results if error is None]
+    return outputs, records
+
+def _shards(lines, chunk_size: int):
+    lines = iter(lines)
+    while True:
+        shard = list(islice(lines, chunk_size))
+        if not shard:
+            return
+        yield shard
+
+def evaluate_parallel(lines, workers: int = None, chunk_size: int = 10000,
+                      record: bool = True):
+    """
+    Evaluates input lines across a pool of worker processes.
+
+    Args:
+        lines: An iterable of input lines, e.g. an open file.
+        workers (int): Number of worker processes; defaults to the CPU count.
+        chunk_size (int): Number of lines per shard.
+        record (bool): Whether workers return their successful calculations.
+
+    Yields:
+        tuple: The result of `evaluate_shard` for each shard, in input order.
+    """
+    workers = workers or os.cpu_count() or 1
+    logger.info("Parallel evaluation started with %d workers, shard size %d.",
+                workers, chunk_size)
+    evaluate = partial(evaluate_shard, record=record)
+    with ProcessPoolExecutor(max_workers=workers, initializer=disable_console_logging) as pool:
+        pending = deque()
+        for shard in _shards(lines, chunk_size):
+            pending.append(pool.submit(evaluate, shard))
+            if len(pending) >= workers * SHARDS_IN_FLIGHT_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def run_parallel(source, output=None, workers: int = None, chunk_size: int = 10000,
+                 history: History = None, record: bool = True) -> History:
+    """
+    Evaluates a job file in parallel, writing results and optionally collecting
+    a History. Like `app.calculator.run_batch`, it logs to the log file only.
+
+    Args:
+        source: An iterable of input lines, e.g. an open file.
+        output: Optional writable text file object for the result lines.
+        workers (int): Number of worker processes; defaults to the CPU count.
+        chunk_size (int): Number of lines per shard.
+        history (History): History to record into; a new one is created if
+            omitted and `record` is set.
+        record (bool): Whether to record successful calculations. When False
+            and no history is given, nothing is kept and None is returned.
+
+    Returns:
+        History: The history holding every successful calculation, in input
+        order, or None when nothing is recorded.
+    """
+    disable_console_logging()
+    record = record or history is not None
+    if record and history is None:
+        history = History()
+    processed = 0
+    for outputs, records in evaluate_parallel(source, workers, chunk_size, record):
+        if output is not None and outputs:
+            output.write("\n".join(outputs) + "\n")
+        if record:
+            history.record_many(records)
+        processed += len(outputs)
+    if output is not None:
+        output.flush()
+    logger.info("Parallel evaluation finished: %d lines processed.", processed)
+    return history
@@ -0,0 +1,129 @@
+"""
+This file contains the operation registry used by the calculator to dispatch
+commands such as "add 2 3" to their implementing functions. Each operation is
+registered once under a canonical name, optionally with aliases, and carries the
+metadata the REPL, the batch evaluator and the history need: its arity, its
+symbol, an optional zero-divisor guard and an optional vectorized implementation.
+
+Third-party code can extend the calculator by calling `register_operation`;
+the built-in operations are registered by `app.operations`.
+"""
+from app.logging import logger
+from app.numeric import format_number
+
+class Operation:
+    """
+    A registered calculator operation.
+
+    Attributes:
+        name (str): Canonical name used in history entries, e.g. "add".
+        func (callable): Scalar implementation taking `arity` numbers.
+        arity (int): Number of operands the operation expects.
+        symbol (str): Infix symbol for display, e.g. "+".
+        aliases (tuple): Alternative names accepted on input.
+        zero_guard (str): Noun used when the last operand must not be zero,
+            e.g. "division"; None if the operation has no such guard.
+        vector (callable): Element-wise implementation over NumPy arrays,
+            or None if the operation can only be evaluated per element. It may
+            be registered as the name of a NumPy ufunc, e.g. "add", which is
+            resolved on first use so NumPy is not imported at start-up.
+        integer_operands (bool): The operands are whole numbers, so input that
+            is written as one is parsed as an exact int whatever the numeric mode.
+    """
+
+    __slots__ = ("name", "func", "arity", "symbol", "aliases", "zero_guard", "_vector",
+                 "integer_operands")
+
+    def __init__(self, name, func, arity=2, symbol=None, aliases=(), zero_guard=None,
+                 vector=None, integer_operands=False):
+        self.name = name
+        self.func = func
+        self.arity = arity
+        self.symbol = symbol or name
+        self.aliases = tuple(aliases)
+        self.zero_guard = zero_guard
+        self._vector = vector
+        self.integer_operands = integer_operands
+
+    @property
+    def vector(self):
+        """The element-wise implementation, importing NumPy if it was named by string."""
+        if isinstance(self._vector, str):
+            import numpy as np
+            self._vector = getattr(np, self._vector)
+        return self._vector
+
+    def __call__(self, *operands):
+        return self.func(*operands)
+
+    def __repr__(self):
+        return f"Operation({self.name!r}, arity={self.arity})"
+
+    @property
+    def zero_error(self) -> str:
+        """The error message reported when the guarded operand is zero."""
+        return f"{self.zero_guard} by zero is not allowed."
+
+    def format(self, operands, result) -> str:
+        """
+        Formats a calculation as a history entry, e.g. "add 2.0 3.0 = 5.0".
+
+        Args:
+            operands (tuple): The operands the operation was applied to.
+            result: The value the operation returned.
+        """
+        return (f"{self.name} {' '.join(format_number(operand) for operand in operands)} = "
+                f"{format_number(result)}")
+
+# Canonical name -> Operation, in registration order
+_operations = {}
+# Canonical name or alias -> Operation
+_lookup = {}
+
+def register_operation(name: str, func, *, arity: int = 2, symbol: str = None,
+                       aliases=(), zero_guard: str = None, vector=None,
+                       integer_operands: bool = False) -> Operation:
+    """
+    Registers an operation so the calculator can dispatch to it.
+
+    Registering a name that already exists replaces the previous operation.
+
+    Raises:
+        ValueError: If an alias is already used by a different operation.
+
+    Returns:
+        Operation: The registered operation.
+    """
+    name = name.lower()
+    aliases = tuple(alias.lower() for alias in aliases)
+    for key in aliases:
+        owner = _lookup.get(key)
+        if owner is not None and owner.name != name:
+            raise ValueError(f"Alias '{key}' is already registered for '{owner.name}'.")
+
+    if name in _operations:
+        unregister_operation(name)
+    operation = Operation(name, func, arity=arity, symbol=symbol, aliases=aliases,
+                          zero_guard=zero_guard, vector=vector,
+                          integer_operands=integer_operands)
+    _operations[name] = operation
+    for key in (name,) + aliases:
+        _lookup[key] = operation
+    logger.debug("Registered operation: %s", name)
+    return operation
+
+def unregister_operation(name: str):
+    """Removes an operation and its aliases. Unknown names are ignored."""
+    operation = _operations.pop(name.lower(), None)
+    if operation is not None:
+        for key in (operation.name,) + operation.aliases:
+            _lookup.pop(key, None)
+        logger.debug("Unregistered operation: %s", operation.name)
+
+def get_operation(name: str) -> Operation:
+    """Returns the operation registered under a lower-case name or alias, or None."""
+    return _lookup.get(name)
+
+def operation_names() -> list:
+    """Returns the canonical names of all registered operations."""
+    return list(_operations)
@@ -0,0 +1,218 @@
+"""
+This file contains an asyncio server that serves the calculator to many
+concurrent clients from one process, instead of one REPL subprocess per client.
+
+Each connection gets its own `Session` (history, numeric mode) and speaks a
+line-oriented protocol: every request is one line in the REPL's syntax, e.g.
+"add 2 3", "history", "undo", "redo", "clear", "mode decimal 50" or "eval 2 * (3 + 4)",
+and every response is one JSON object on its own line:
+
+    {"ok": true, "result": 5.0}
+    {"ok": true, "history": ["add 2.0 3.0 = 5.0"]}
+    {"ok": false, "error": "division by zero is not allowed."}
+
+Results that JSON numbers cannot hold exactly or at all (exact Fraction and
+Decimal values, big integers, infinities and NaN) are sent as strings, e.g.
+{"ok": true, "result": "inf"}. A request that fails unexpectedly gets an error
+response and the connection stays open.
+
+Requests may be pipelined: a client can send many lines without waiting, and
+responses come back in request order. Each response is followed by
+`writer.drain()`, so a client that stops reading makes its session stop reading
+too and TCP flow control pushes back on the sender instead of responses
+piling up in memory. Lines longer than MAX_LINE_BYTES are rejected and the
+connection is closed.
+
+Requests are handled in the event loop's default thread pool, so a slow
+request (a huge exponent, a long expression) does not stall the other clients.
+A connection waits for each response before it handles its next request, so a
+session is never used by two threads at once.
+"""
+import asyncio
+import json
+import math
+from app.calculator import Session
+from app.history import History
+from app.logging import disable_console_logging, logger
+from app.numeric import format_number, parse_mode
+from app.registry import operation_names
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Longest request line accepted, in bytes
+MAX_LINE_BYTES = 64 * 1024
+# Pending connections queued by the kernel; asyncio's default of 100 resets
+# clients when thousands connect at once
+LISTEN_BACKLOG = 4096
+
+def _json_value(value):
+    # Exact results (Fraction, Decimal, big ints) and non-finite floats, which
+    # JSON has no literal for, are sent as their text form; so are ints too long
+    # for decimal text, in hexadecimal (see `format_number`)
+    if isinstance(value, float):
+        return value if math.isfinite(value) else str(value)
+    text = format_number(value)
+    return value if type(value) is int and text.lstrip("-").isdigit() else text
+
+def _calculate(session: Session, command: str) -> dict:
+    try:
+        name, operation, operands = session.parse(command)
+    except ValueError:
+        return {"ok": False,
+                "error": "Invalid input. Please follow the format: <operation> <num1> <num2>"}
+    if operation is None:
+        return {"ok": False, "error": f"Unknown operation '{name}'. Supported operations: "
+                                      f"{', '.join(operation_names())}."}
+    try:
+        result = session.evaluate(operation, operands)
+    except ValueError as error:
+        return {"ok": False, "error": str(error)}
+    session.history.record(operation.name, operands, result)
+    return {"ok": True, "result": _json_value(result)}
+
+def _evaluate(session: Session, source: str) -> dict:
+    try:
+        result = session.evaluate_expression(source)
+    except ValueError as error:
+        return {"ok": False, "error": str(error)}
+    return {"ok": True, "result": _json_value(result)}
+
+def _set_mode(session: Session, argument: str) -> dict:
+    if argument:
+        try:
+            session.set_numeric(parse_mode(argument))
+        except ValueError as error:
+            return {"ok": False, "error": str(error)}
+    return {"ok": True, "mode": str(session.numeric)}
+
+def _clear(session: Session) -> dict:
+    session.history.clear()
+    return {"ok": True}
+
+def _undo(session: Session) -> dict:
+    session.history.undo_last()
+    return {"ok": True}
+
+def _redo(session: Session) -> dict:
+    return {"ok": True, "redone": session.history.redo()}
+
+# Requests that are a single word, and requests that take the rest of the line
+COMMANDS = {
+    "history": lambda session: {"ok": True, "history": session.history.get_history()},
+    "clear": _clear,
+    "undo": _undo,
+    "redo": _redo,
+}
+ARGUMENT_COMMANDS = {
+    "eval": _evaluate,
+    "mode": _set_mode,
+}
+
+def handle_request(session: Session, line: str) -> dict:
+    """
+    Handles one request line for a session.
+
+    Args:
+        session (Session): The connection's session.
+        line (str): A request in the REPL's syntax.
+
+    Returns:
+        dict: The JSON-serializable response. Unexpected failures are reported
+        as an error response rather than raised, so one bad request does not
+        end the connection.
+    """
+    command = line.strip().lower()
+    try:
+        handler = COMMANDS.get(command)
+        if handler is not None:
+            return handler(session)
+        word, _, argument = command.partition(" ")
+        handler = ARGUMENT_COMMANDS.get(word)
+        if handler is not None:
+            return handler(session, argument.strip())
+        return _calculate(session, command)
+    except Exception as error:  # pylint: disable=broad-exception-caught
+        logger.exception("Request %r failed", command)
+        return {"ok": False, "error": f"Request failed: {error}"}
+
+class CalculatorServer:
+    """
+    Serves calculator sessions over TCP.
+
+    Attributes:
+        host (str): Interface to listen on.
+        port (int): Port to listen on; 0 picks a free port (see `start`).
+        sessions (int): Number of currently connected clients.
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+        self.host = host
+        self.port = port
+        self.sessions = 0
+        self._server = None
+
+    async def start(self):
+        """Starts listening; `port` is updated to the bound port."""
+        self._server = await asyncio.start_server(self._serve_client, self.host, self.port,
+                                                  limit=MAX_LINE_BYTES, backlog=LISTEN_BACKLOG)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("Calculator server listening on %s:%d", self.host, self.port)
+
+    async def serve_forever(self):
+        """Starts the server if needed and serves until cancelled."""
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Stops accepting connections and waits for the listener to close."""
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        session = Session(History())
+        self.sessions += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # The line exceeded MAX_LINE_BYTES; the stream cannot be resynchronized
+                    writer.write(b'{"ok": false, "error": "Request line too long."}\n')
+                    break
+                if not line:
+                    break
+                response = await loop.run_in_executor(
+                    None, handle_request, session, line.decode("utf-8", "replace"))
+                writer.write(json.dumps(response).encode() + b"\n")
+                # Waits only while the client is not reading its responses
+                await writer.drain()
+        except ConnectionError:
+            logger.warning("Client connection lost.")
+        finally:
+            self.sessions -= 1
+            # Only the history is released; metrics are dumped once, by the process
+            session.history.close()
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
+    """Runs a calculator server in the current thread until interrupted."""
+    disable_console_logging()
+    server = CalculatorServer(host, port)
+
+    async def run():
+        await server.start()
+        print(f"Calculator server listening on {server.host}:{server.port}. "
+              "Press Ctrl+C to stop.")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        logger.info("Calculator server stopped.")
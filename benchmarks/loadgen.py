@@ -0,0 +1,91 @@
+"""
+Load generator for the calculator server (`python main.py --serve`).
+
+Opens many concurrent connections, each of which keeps a window of pipelined
+requests in flight, and reports throughput and request latency percentiles.
+Requests are drawn from the same seeded generator as benchmarks/suite.py.
+
+Usage:
+    python benchmarks/loadgen.py [--host 127.0.0.1] [--port 8765] [--clients 1000]
+        [--requests 100] [--pipeline 8] [--json results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# pylint: disable=wrong-import-position
+from app.logging import disable_console_logging
+from app.server import DEFAULT_HOST, DEFAULT_PORT
+from benchmarks.suite import generate_lines
+# pylint: enable=wrong-import-position
+
+async def run_client(host: str, port: int, lines: list, pipeline: int, latencies: list) -> int:
+    """
+    Sends `lines` over one connection with up to `pipeline` requests in flight.
+
+    Appends each request's latency (seconds) to `latencies` and returns the
+    number of error responses.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    sent_at = []
+    errors = 0
+    next_line = 0
+    for received in range(len(lines)):
+        while next_line < len(lines) and next_line - received < pipeline:
+            writer.write(lines[next_line].encode() + b"\n")
+            sent_at.append(time.perf_counter())
+            next_line += 1
+        await writer.drain()
+        response = json.loads(await reader.readline())
+        latencies.append(time.perf_counter() - sent_at[received])
+        errors += not response["ok"]
+    writer.close()
+    await writer.wait_closed()
+    return errors
+
+async def run(host: str, port: int, clients: int, requests: int, pipeline: int) -> dict:
+    """Runs every client concurrently and returns summary statistics."""
+    latencies = []
+    start = time.perf_counter()
+    errors = await asyncio.gather(*(
+        run_client(host, port, generate_lines(requests, seed=client), pipeline, latencies)
+        for client in range(clients)))
+    elapsed = time.perf_counter() - start
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {"clients": clients, "requests": len(latencies), "errors": sum(errors),
+            "elapsed_s": elapsed, "requests_per_s": len(latencies) / elapsed,
+            "latency_ms": {"p50": quantiles[49] * 1000, "p90": quantiles[89] * 1000,
+                           "p99": quantiles[98] * 1000, "max": max(latencies) * 1000}}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=100, help="requests per client")
+    parser.add_argument("--pipeline", type=int, default=8,
+                        help="requests each client keeps in flight")
+    parser.add_argument("--json", metavar="FILE", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    disable_console_logging()
+    results = asyncio.run(run(args.host, args.port, args.clients, args.requests, args.pipeline))
+    print(f"{results['requests']} requests from {results['clients']} clients in "
+          f"{results['elapsed_s']:.2f} s ({results['requests_per_s']:.0f} requests/s), "
+          f"{results['errors']} errors")
+    print("latency ms: " + ", ".join(f"{name} {value:.2f}"
+                                    for name, value in results["latency_ms"].items()))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
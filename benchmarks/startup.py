@@ -0,0 +1,82 @@
+"""
+Start-up time benchmark for the calculator.
+
+Runs `python -X importtime` on the modules a calculator launch imports, several
+times in fresh processes, and reports the cumulative import time of each module
+of interest. The run fails if the median total exceeds the budget or if a module
+that should only be imported on first use (pandas, NumPy) is imported at start-up.
+
+Usage:
+    python benchmarks/startup.py [--runs 10] [--budget-ms 150] [--json results.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules imported when `python main.py` starts
+STARTUP_IMPORT = "import main"
+# Heavy dependencies that must only be imported on first use
+DEFERRED_MODULES = ("pandas", "numpy")
+REPORTED_MODULES = ("main", "app.calculator", "app.history", "app.operations", "app.logging",
+                    "dotenv")
+
+def import_times(statement: str = STARTUP_IMPORT) -> dict:
+    """
+    Imports modules in a fresh interpreter and returns cumulative import times.
+
+    Returns:
+        dict: Top-level module name -> cumulative import time in microseconds.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    times = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+def run(runs: int) -> dict:
+    """Runs the benchmark and returns median times (ms) and deferred-module violations."""
+    samples = [import_times() for _ in range(runs)]
+    medians = {name: statistics.median(sample.get(name, 0) for sample in samples) / 1000
+               for name in REPORTED_MODULES}
+    eager = sorted({name for sample in samples for name in DEFERRED_MODULES if name in sample})
+    return {"runs": runs, "median_ms": medians, "total_ms": medians["main"],
+            "eager_imports": eager}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=150.0,
+                        help="maximum allowed median start-up import time")
+    parser.add_argument("--json", metavar="FILE", help="also write the results as JSON")
+    args = parser.parse_args(argv)
+
+    results = run(args.runs)
+    results["budget_ms"] = args.budget_ms
+    for name, value in results["median_ms"].items():
+        print(f"{name:<16} {value:8.1f} ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump(results, output, indent=2)
+
+    failed = False
+    if results["eager_imports"]:
+        print(f"FAIL: imported at start-up: {', '.join(results['eager_imports'])}")
+        failed = True
+    if results["total_ms"] > args.budget_ms:
+        print(f"FAIL: start-up {results['total_ms']:.1f} ms exceeds {args.budget_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,310 @@
+"""
+Throughput benchmark suite for the calculator.
+
+Measures the paths the correctness tests do not time: per-call overhead of the
+registered operations, `History.save`/`load` at several sizes in each history
+format and compressed CSV codec, lines per second through the `calculator()`
+REPL with `input` replaced by a fixed script, and ThreadSafeHistory write
+throughput by writer thread count.
+The logging group compares per-call overhead with INFO disabled between the
+logged operations, their logging-free variants and raw arithmetic. All data
+comes from seeded generators, so two runs on the same machine measure the same work.
+
+Results can be written as JSON and compared against a baseline, the JSON of an
+earlier run on the same machine (timings from other machines are not
+comparable, so no baseline is kept in the repository); the run fails if any
+benchmark's median time is slower than the baseline by more than the tolerance.
+
+Usage:
+    python benchmarks/suite.py [--sizes 1000,10000,100000] [--repeat 5]
+        [--only history|operations|logging|repl|threads] [--json results.json]
+        [--baseline earlier-results.json] [--tolerance 0.25]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from unittest.mock import patch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# The timed operations log at INFO; unless LOG_FILE is set, send those records to
+# the null device so they are still formatted and written but do not pile up on disk
+os.environ.setdefault("LOG_FILE", os.devnull)
+
+# pylint: disable=wrong-import-position
+from app.calculator import calculator
+from app.history import History
+from app.history.formats import COMPRESSIONS, FORMATS, compression_available
+from app.history.threadsafe import ThreadSafeHistory
+from app.logging import disable_console_logging
+from app.operations import configure_operations
+from app.registry import get_operation
+# pylint: enable=wrong-import-position
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+SEED = 20240601
+# Operations exercised by the generators and their operand ranges
+BINARY_OPERATIONS = ("add", "subtract", "multiply", "divide", "modulus", "exponent")
+OPERATION_CALLS = 10000
+REPL_LINES = 20000
+THREAD_WRITES = 40000
+THREAD_COUNTS = (1, 2, 4, 8)
+
+def generate_calculations(count: int, seed: int = SEED) -> list:
+    """
+    Returns `count` (name, operands, result) tuples drawn from a seeded generator.
+
+    Divisors are kept non-zero and exponents small so every calculation succeeds.
+    """
+    rng = random.Random(seed)
+    calculations = []
+    for _ in range(count):
+        name = rng.choice(BINARY_OPERATIONS)
+        num1 = float(rng.randint(-1000, 1000))
+        num2 = float(rng.randint(1, 8) if name == "exponent" else rng.randint(1, 1000))
+        calculations.append((name, (num1, num2), get_operation(name)(num1, num2)))
+    return calculations
+
+def generate_lines(count: int, seed: int = SEED) -> list:
+    """Returns `count` REPL input lines such as "add 12 7" from a seeded generator."""
+    return [f"{name} {num1:g} {num2:g}"
+            for name, (num1, num2), _ in generate_calculations(count, seed)]
+
+def _silent(*_args, **_kwargs):
+    """Replaces print while timing, so console output is not measured."""
+
+def measure(function, repeat: int) -> dict:
+    """
+    Calls `function` once to warm up (lazy imports, caches), then `repeat` times
+    more, and returns the min and median wall time of the timed calls.
+    """
+    function()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return {"min_s": min(samples), "median_s": statistics.median(samples)}
+
+def bench_operations(repeat: int) -> dict:
+    """Times OPERATION_CALLS direct calls of each binary operation."""
+    results = {}
+    for name in BINARY_OPERATIONS:
+        operation = get_operation(name)
+        operands = (7.0, 3.0)
+
+        def run(operation=operation, operands=operands):
+            for _ in range(OPERATION_CALLS):
+                operation(*operands)
+
+        timing = measure(run, repeat)
+        timing["per_call_us"] = timing["median_s"] / OPERATION_CALLS * 1e6
+        results[f"operations.{name}"] = timing
+    return results
+
+def bench_logging(repeat: int) -> dict:
+    """
+    Times OPERATION_CALLS calls of each binary operation with INFO records
+    disabled, using the logged and then the logging-free implementations, and
+    the same number of raw additions as the floor.
+    """
+    results = {}
+    root = logging.getLogger()
+    level = root.level
+    root.setLevel(logging.WARNING)
+    try:
+        for quiet in (False, True):
+            configure_operations(quiet)
+            for name in BINARY_OPERATIONS:
+                # The implementation the numeric backends call
+                func = get_operation(name).func
+
+                def run(func=func):
+                    for _ in range(OPERATION_CALLS):
+                        func(7.0, 3.0)
+
+                timing = measure(run, repeat)
+                timing["per_call_us"] = timing["median_s"] / OPERATION_CALLS * 1e6
+                results[f"logging.{'quiet' if quiet else 'logged'}.{name}"] = timing
+    finally:
+        root.setLevel(level)
+        configure_operations()
+
+    def raw(a=7.0, b=3.0):
+        for _ in range(OPERATION_CALLS):
+            a + b  # pylint: disable=pointless-statement
+
+    timing = measure(raw, repeat)
+    timing["per_call_us"] = timing["median_s"] / OPERATION_CALLS * 1e6
+    results["logging.raw.add"] = timing
+    return results
+
+def bench_history(sizes, repeat: int) -> dict:
+    """
+    Times History.save and History.load in every format and every available
+    CSV compression at each size, and writing and restoring a session snapshot.
+    Compressed results also record the file size and its ratio to plain CSV.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as directory, patch("builtins.print", _silent):
+        for size in sizes:
+            history = History()
+            history.record_many(generate_calculations(size), timestamp=0.0)
+            for file_format in FORMATS:
+                path = os.path.join(directory, f"history-{size}.{file_format}")
+                timing = measure(lambda path=path: history.save(path), repeat)
+                timing["entries"] = size
+                results[f"history.save.{file_format}.{size}"] = timing
+
+                def load(path=path):
+                    loaded = History()
+                    loaded.load(path)
+                    # Touch every row so lazily mapped formats pay for reading them
+                    loaded.records.column("result").sum()
+
+                timing = measure(load, repeat)
+                timing["entries"] = size
+                results[f"history.load.{file_format}.{size}"] = timing
+
+            csv_bytes = os.path.getsize(os.path.join(directory, f"history-{size}.csv"))
+            for extension, compression in COMPRESSIONS.items():
+                if not compression_available(compression):
+                    continue
+                path = os.path.join(directory, f"history-{size}.csv{extension}")
+                timing = measure(lambda path=path: history.save(path), repeat)
+                timing["entries"] = size
+                timing["bytes"] = os.path.getsize(path)
+                timing["ratio"] = csv_bytes / timing["bytes"]
+                results[f"history.save.csv.{compression}.{size}"] = timing
+
+                def load_compressed(path=path):
+                    History().load(path)
+
+                timing = measure(load_compressed, repeat)
+                timing["entries"] = size
+                results[f"history.load.csv.{compression}.{size}"] = timing
+
+            path = os.path.join(directory, f"history-{size}.snapshot")
+            timing = measure(lambda path=path: history.write_snapshot(path), repeat)
+            timing["entries"] = size
+            results[f"history.save.snapshot.{size}"] = timing
+            timing = measure(lambda path=path: History().load_snapshot(path), repeat)
+            timing["entries"] = size
+            results[f"history.restore.snapshot.{size}"] = timing
+    return results
+
+def bench_threads(repeat: int) -> dict:
+    """
+    Times THREAD_WRITES records into one ThreadSafeHistory split across 1-8
+    writer threads, with a background save running during each run. Appends
+    hold the GIL, so the expected result is flat total throughput, not scaling;
+    a drop as threads are added would mean the lock is contended.
+    """
+    calculations = generate_calculations(THREAD_WRITES)
+    results = {}
+    with tempfile.TemporaryDirectory() as directory, patch("builtins.print", _silent):
+        for writers in THREAD_COUNTS:
+            shards = [calculations[index::writers] for index in range(writers)]
+
+            def run(shards=shards):
+                history = ThreadSafeHistory()
+                threads = [threading.Thread(target=lambda shard=shard: [
+                    history.record(*calculation) for calculation in shard]) for shard in shards]
+                for thread in threads:
+                    thread.start()
+                history.save_async(os.path.join(directory, "threads.npy"))
+                for thread in threads:
+                    thread.join()
+                history.close()
+
+            timing = measure(run, repeat)
+            timing["writes_per_s"] = THREAD_WRITES / timing["median_s"]
+            results[f"threads.record.{writers}"] = timing
+    return results
+
+def bench_repl(repeat: int) -> dict:
+    """Times REPL_LINES calculations fed through calculator() with a scripted input."""
+    lines = generate_lines(REPL_LINES)
+
+    def run():
+        feed = iter(lines + ["exit"])
+        with patch("builtins.input", lambda _prompt="": next(feed)), \
+                patch("builtins.print", _silent):
+            calculator()
+
+    timing = measure(run, repeat)
+    timing["lines_per_s"] = REPL_LINES / timing["median_s"]
+    return {"repl.calculations": timing}
+
+def run(sizes, repeat: int, only: str = None) -> dict:
+    """Runs the selected benchmark groups and returns their results by name."""
+    groups = {
+        "operations": lambda: bench_operations(repeat),
+        "logging": lambda: bench_logging(repeat),
+        "history": lambda: bench_history(sizes, repeat),
+        "repl": lambda: bench_repl(repeat),
+        "threads": lambda: bench_threads(repeat),
+    }
+    results = {}
+    for group, bench in groups.items():
+        if only is None or group == only:
+            results.update(bench())
+    return results
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """
+    Returns (name, baseline_s, current_s) for benchmarks whose median time grew
+    by more than `tolerance` (a fraction, e.g. 0.25 for 25%) over the baseline.
+    Benchmarks missing from either side are ignored.
+    """
+    regressions = []
+    for name, timing in results.items():
+        previous = baseline.get(name)
+        if previous and timing["median_s"] > previous["median_s"] * (1 + tolerance):
+            regressions.append((name, previous["median_s"], timing["median_s"]))
+    return regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma-separated history sizes, e.g. 1000,10000000")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", choices=("operations", "logging", "history", "repl", "threads"),
+                        help="run a single benchmark group")
+    parser.add_argument("--json", metavar="FILE", help="also write the results as JSON")
+    parser.add_argument("--baseline", metavar="FILE",
+                        help="JSON results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown against the baseline (default 0.25)")
+    args = parser.parse_args(argv)
+
+    disable_console_logging()
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = run(sizes, args.repeat, args.only)
+    for name, timing in results.items():
+        print(f"{name:<32} {timing['median_s'] * 1000:10.2f} ms")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as output:
+            json.dump({"python": platform.python_version(), "seed": SEED, "repeat": args.repeat,
+                       "results": results}, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for name, before, after in regressions:
+            print(f"FAIL: {name} took {after * 1000:.2f} ms, baseline {before * 1000:.2f} ms")
+        if regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
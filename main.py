@@ -1,8 +1,67 @@
 """The initial point to initiate the calculator."""
-from app.calculator import calculator
+import argparse
+import os
+import sys
+from contextlib import ExitStack
+from app.calculator import calculator, run_batch
+from app.logging import disable_console_logging, logger
+from app.metrics import dump_metrics
+from app.server import DEFAULT_HOST, DEFAULT_PORT, serve
 
-def main():
-    calculator()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calculator REPL and batch evaluator.")
+    parser.add_argument("--batch", nargs="?", const="-", metavar="FILE",
+                        help="evaluate '<operation> <num1> <num2>' lines from FILE "
+                             "(or stdin when omitted or '-') instead of starting the REPL")
+    parser.add_argument("--output", default="-", metavar="FILE",
+                        help="where batch results are written (default: stdout)")
+    parser.add_argument("--chunk-size", type=int, default=4096,
+                        help="number of lines evaluated per batch chunk or worker shard")
+    parser.add_argument("--workers", type=int, metavar="N",
+                        help="evaluate the batch in N worker processes (0: one per CPU)")
+    parser.add_argument("--history", metavar="FILE",
+                        help="save the batch's successful calculations as a history file")
+    parser.add_argument("--serve", nargs="?", const=f"{DEFAULT_HOST}:{DEFAULT_PORT}",
+                        metavar="[HOST:]PORT",
+                        help="serve calculator sessions over TCP instead of starting the REPL "
+                             f"(default {DEFAULT_HOST}:{DEFAULT_PORT})")
+    args = parser.parse_args(argv)
+
+    if args.serve is not None:
+        host, _, port = args.serve.rpartition(":")
+        serve(host or DEFAULT_HOST, int(port))
+        return
+
+    if args.batch is None:
+        calculator()
+        return
+
+    # Batch output may be piped, so nothing but results goes to the console
+    disable_console_logging()
+    history = None
+    if args.history:
+        from app.history import History
+        # HISTORY_CAPACITY bounds the entries kept in memory, as in the REPL
+        capacity = os.getenv("HISTORY_CAPACITY")
+        history = History(capacity=int(capacity) if capacity else None,
+                          spill_path=os.getenv("HISTORY_SPILL_FILE"))
+    with ExitStack() as files:
+        source = (sys.stdin if args.batch == "-"
+                  else files.enter_context(open(args.batch, encoding="utf-8")))
+        output = (sys.stdout if args.output == "-"
+                  else files.enter_context(open(args.output, "w", encoding="utf-8")))
+        if args.workers is not None:
+            # Imported here so the process pool machinery is only loaded when used
+            from app.parallel import run_parallel
+            run_parallel(source, output, args.workers or None, args.chunk_size, history,
+                         record=history is not None)
+        else:
+            run_batch(source, output, args.chunk_size, history)
+    if history is not None:
+        # write, not save: save prints a confirmation into the results on stdout
+        logger.info("Batch history saved to %s", history.write(args.history))
+        history.close()
+    dump_metrics()
 
 if __name__ == "__main__":
 
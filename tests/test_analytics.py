@@ -0,0 +1,145 @@
+"""
+This module contains test cases for history analytics in `app.history.analytics`.
+It checks per-operation statistics against a direct computation, that the
+column cache only copies new rows and follows undo, redo, clear and load,
+that cached block aggregates match a fresh computation across block boundaries,
+that a history with a capacity keeps only block aggregates,
+rolling-window statistics over time, and the REPL's `stats history` command.
+"""
+
+from unittest.mock import patch
+import pandas as pd
+import pytest
+from app.calculator import calculator
+from app.history import History
+from app.history import analytics
+from app.history.threadsafe import ThreadSafeHistory
+
+def mixed_history(history=None):
+    """Adds ten calculations, alternating divide and add, and a text entry."""
+    history = History() if history is None else history
+    for value in range(10):
+        history.record("add" if value % 2 else "divide", (float(value), 2.0), float(value),
+                       timestamp=float(value))
+    history.add("note", timestamp=10.0)
+    return history
+
+@pytest.mark.parametrize("history_class", [History, ThreadSafeHistory])
+def test_analytics(history_class):
+    """Tests count, mean, min, max and sum per operation, in order of first use."""
+    stats = mixed_history(history_class()).analytics()
+    assert stats.index.tolist() == ["divide", "add"]
+    assert stats.loc["divide"].tolist() == [5, 4.0, 0.0, 8.0, 20.0]
+    assert stats.loc["add"].tolist() == [5, 5.0, 1.0, 9.0, 25.0]
+    assert History().analytics().empty
+
+def test_column_cache_is_incremental(tmp_path):
+    """Tests that cached columns are extended on append and cut back on undo."""
+    history = mixed_history()
+    history.analytics()
+    assert history._columns.rows == 11  # pylint: disable=protected-access
+
+    history.record("add", (100.0, 0.0), 100.0, timestamp=11.0)
+    assert history.analytics().loc["add", "max"] == 100.0
+    history.undo_last()
+    assert history._columns.rows == 11  # pylint: disable=protected-access
+    history.record("add", (-5.0, 0.0), -5.0, timestamp=12.0)
+    assert history.analytics().loc["add"].tolist() == [6, 20.0 / 6, -5.0, 9.0, 20.0]
+
+    start = history.checkpoint()
+    history.record("multiply", (2.0, 2.0), 4.0)
+    assert "multiply" in history.analytics().index
+    history.undo_to(start)
+    assert "multiply" not in history.analytics().index
+    history.redo()
+    assert history.analytics().loc["multiply", "count"] == 1
+
+    file_path = tmp_path / "history.csv"
+    History().save(file_path)
+    history.load(file_path)
+    assert history.analytics().empty
+    mixed_history(history)
+    history.clear()
+    assert history.analytics().empty
+
+def test_block_stats(monkeypatch):
+    """Tests that cached block aggregates combine to the same statistics as a fresh history."""
+    monkeypatch.setattr(analytics, "STATS_BLOCK_ROWS", 4)
+    history = mixed_history()
+    history.analytics()
+    assert len(history._columns._blocks) == 2  # pylint: disable=protected-access
+    # Blocks cached before an operation was first used are shorter
+    history.record("multiply", (3.0, 3.0), 9.0, timestamp=11.0)
+    history.record("multiply", (4.0, 3.0), 12.0, timestamp=12.0)
+    assert history.analytics().loc["multiply", "count"] == 2
+    assert len(history._columns._blocks) == 3  # pylint: disable=protected-access
+    history.undo_last()
+    history.undo_last()
+    assert len(history._columns._blocks) == 2  # pylint: disable=protected-access
+
+    expected = History()
+    for entry in history.get_history():
+        if entry == "note":
+            continue
+        name, num1, num2, _, result = entry.split()
+        expected.record(name, (float(num1), float(num2)), float(result))
+    pd.testing.assert_frame_equal(history.analytics(), expected.analytics())
+
+def test_bounded_history_keeps_only_aggregates(monkeypatch):
+    """Tests that a history with a capacity gets the same statistics without cached columns."""
+    monkeypatch.setattr(analytics, "STATS_BLOCK_ROWS", 4)
+    bounded = mixed_history(History(capacity=3))
+    unbounded = mixed_history()
+    for history in (bounded, unbounded):
+        history.analytics()
+        history.record("multiply", (3.0, 3.0), 9.0, timestamp=11.0)
+        history.undo_last()
+        history.undo_last()
+        history.record("add", (7.0, 0.0), 7.0, timestamp=12.0)
+    assert bounded.records._base_len  # pylint: disable=protected-access
+    pd.testing.assert_frame_equal(bounded.analytics(), unbounded.analytics())
+    pd.testing.assert_frame_equal(bounded.rolling(2.5), unbounded.rolling(2.5))
+    assert not bounded._columns._arrays  # pylint: disable=protected-access
+    assert len(bounded._columns._blocks) == 2  # pylint: disable=protected-access
+    bounded.close()
+
+@pytest.mark.parametrize("operation, expected_counts, expected_means", [
+    (None, [1, 2, 3, 3, 3, 3, 3, 3, 3, 3], [0.0, 0.5, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0]),
+    ("add", [1, 2, 2, 2, 2], [1.0, 2.0, 4.0, 6.0, 8.0]),
+    ("root", [], []),
+])
+def test_rolling(operation, expected_counts, expected_means):
+    """Tests trailing-window statistics at every calculation, optionally per operation."""
+    window = 2.5 if operation is None else 3.5
+    rolling = mixed_history().rolling(window, operation)
+    assert rolling["count"].tolist() == expected_counts
+    assert rolling["mean"].tolist() == expected_means
+    assert rolling.index.is_monotonic_increasing
+
+def test_rolling_out_of_order():
+    """Tests that entries recorded out of time order are windowed by their timestamps."""
+    history = History()
+    for timestamp, value in [(5.0, 1.0), (1.0, 2.0), (6.0, 3.0)]:
+        history.record("add", (value, 0.0), value, timestamp=timestamp)
+    rolling = history.rolling(2.0)
+    assert rolling.index.tolist() == list(pd.to_datetime([1.0, 5.0, 6.0], unit="s"))
+    assert rolling["count"].tolist() == [1, 1, 2]
+    with pytest.raises(ValueError, match="Rolling window must be positive."):
+        history.rolling(0)
+
+@pytest.mark.parametrize("user_inputs, expected_outputs", [
+    (["stats history", "exit"], ["No calculations in history."]),
+    (["add 1 2", "multiply 2 3", "add 5 5", "stats history 3600", "exit"],
+     ["History Statistics:\nadd: count 2, mean 6.5, min 3.0, max 10.0\n"
+      "multiply: count 1, mean 6.0, min 6.0, max 6.0\n"
+      "Last 3600 seconds: count 3, mean 6.333333333333333, min 3.0, max 10.0"]),
+    (["stats history soon", "stats history -1", "exit"],
+     ["Invalid stats command. Usage: stats history [WINDOW_SECONDS]"]),
+])
+def test_repl_stats_history(user_inputs, expected_outputs, capsys):
+    """Tests the REPL's history statistics command."""
+    with patch("builtins.input", side_effect=user_inputs):
+        calculator()
+    output = capsys.readouterr().out
+    for expected_output in expected_outputs:
+        assert expected_output in output
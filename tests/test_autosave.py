@@ -0,0 +1,144 @@
+"""
+This module contains test cases for background autosave in `app.history.autosave`
+and atomic file replacement in `app.history.formats`. It checks that bursts of
+changes are coalesced into few writes, that the timer flushes idle changes, that
+stopping writes what is left, that a failed write leaves the previous file
+intact, that a failing autosave keeps running and retries, that a failing final
+write is logged instead of raised on stop, that replaced files
+keep their permissions, and that the REPL enables autosave from the environment.
+"""
+
+import logging
+import os
+import time
+from unittest.mock import patch
+import pytest
+from app.calculator import calculator
+from app.history import History
+from app.history.autosave import Autosave
+from app.history.formats import replace_atomically
+from app.history.threadsafe import ThreadSafeHistory
+
+def saved_entries(file_path):
+    """Returns the entries stored in a history file."""
+    loaded = History()
+    loaded.load(str(file_path))
+    return loaded.get_history()
+
+def test_burst_is_coalesced(tmp_path):
+    """Tests that a burst of changes produces far fewer writes than changes."""
+    history = ThreadSafeHistory()
+    autosave = Autosave(history, str(tmp_path / "history.csv"), interval=60,
+                        max_changes=100).start()
+    for value in range(1000):
+        history.record("add", (float(value), 1.0), value + 1.0)
+    autosave.stop()
+    assert 1 <= autosave.saves <= 11
+    assert len(saved_entries(tmp_path / "history.csv")) == 1000
+
+def test_timer_flushes_idle_changes(tmp_path):
+    """Tests that changes below max_changes are written once the interval passes."""
+    file_path = tmp_path / "history.npy"
+    history = ThreadSafeHistory()
+    autosave = Autosave(history, str(file_path), interval=0.05, max_changes=1000).start()
+    history.add("note")
+    deadline = time.monotonic() + 5
+    # The array is written before its sidecar, so wait for the whole save
+    while not autosave.saves and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert saved_entries(file_path) == ["note"]
+    history.undo_last()
+    autosave.stop()
+    assert saved_entries(file_path) == []
+    assert not autosave.flush()
+
+def test_failed_autosave_keeps_running(tmp_path, caplog):
+    """Tests that an error other than OSError is logged and the next write retries."""
+    file_path = tmp_path / "history.csv"
+    history = ThreadSafeHistory()
+    write = history.write
+    failures = [ValueError("bad format")]
+
+    def fail_once(path):
+        if failures:
+            raise failures.pop()
+        return write(path)
+
+    autosave = Autosave(history, str(file_path), interval=0.05, max_changes=1000)
+    with patch.object(history, "write", side_effect=fail_once), \
+            caplog.at_level(logging.ERROR, logger="Calculator"):
+        autosave.start()
+        history.add("note")
+        deadline = time.monotonic() + 5
+        while not file_path.exists() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert autosave._thread.is_alive()
+        autosave.stop()
+    assert "Autosave failed" in caplog.text and "bad format" in caplog.text
+    assert autosave.saves == 1
+    assert saved_entries(file_path) == ["note"]
+
+def test_failed_final_write_is_logged(tmp_path, caplog):
+    """Tests that stop() logs a failing final write instead of raising it."""
+    history = ThreadSafeHistory()
+    autosave = Autosave(history, str(tmp_path / "history.npy.gz"), interval=60,
+                        max_changes=1000).start()
+    history.add("note")
+    with caplog.at_level(logging.ERROR, logger="Calculator"):
+        assert not autosave.stop()
+    assert "Final autosave failed; 1 changes were not saved" in caplog.text
+    assert "Compression only applies to CSV history files." in caplog.text
+
+def test_repl_exits_when_final_autosave_fails(tmp_path, monkeypatch, capsys):
+    """Tests that the REPL still exits cleanly when its last autosave cannot be written."""
+    monkeypatch.setenv("HISTORYCSV_FILE", str(tmp_path / "history.npy.gz"))
+    monkeypatch.setenv("HISTORY_AUTOSAVE_CHANGES", "100")
+    with patch("builtins.input", side_effect=["add 1 2", "exit"]):
+        calculator()
+    assert "Exiting calculator..." in capsys.readouterr().out
+
+@pytest.mark.parametrize("interval, max_changes", [(0, 10), (-1, 10), (1, 0)])
+def test_autosave_negative(interval, max_changes):
+    """Tests that a non-positive interval or change threshold is rejected."""
+    with pytest.raises(ValueError, match="Autosave interval must be positive"):
+        Autosave(ThreadSafeHistory(), interval=interval, max_changes=max_changes)
+
+def test_failed_write_keeps_previous_file(tmp_path):
+    """Tests that an interrupted write leaves the old file and no temporary files."""
+    file_path = tmp_path / "history.csv"
+    file_path.write_text("old contents", encoding="utf-8")
+
+    def interrupted(path):
+        with open(path, "w", encoding="utf-8") as output:
+            output.write("half")
+        raise OSError("disk full")
+
+    with pytest.raises(OSError, match="disk full"):
+        replace_atomically(str(file_path), interrupted)
+    assert file_path.read_text(encoding="utf-8") == "old contents"
+    assert os.listdir(tmp_path) == ["history.csv"]
+
+@pytest.mark.parametrize("mode", [0o644, 0o600, 0o664])
+def test_replace_keeps_permissions(mode, tmp_path):
+    """Tests that saving over a file keeps its mode and a new file gets the umask default."""
+    history = History()
+    history.add("add 1.0 1.0 = 2.0")
+    file_path = tmp_path / "history.csv"
+    file_path.write_text("old contents", encoding="utf-8")
+    os.chmod(file_path, mode)
+    history.save(str(file_path))
+    assert file_path.stat().st_mode & 0o777 == mode
+
+    history.save(str(tmp_path / "new.csv"))
+    umask = os.umask(0)
+    os.umask(umask)
+    assert (tmp_path / "new.csv").stat().st_mode & 0o777 == 0o666 & ~umask
+
+def test_repl_autosave(tmp_path, monkeypatch):
+    """Tests that HISTORY_AUTOSAVE_CHANGES makes the REPL persist without 'save'."""
+    file_path = tmp_path / "history.csv"
+    monkeypatch.setenv("HISTORYCSV_FILE", str(file_path))
+    monkeypatch.setenv("HISTORY_AUTOSAVE_CHANGES", "2")
+    with patch("builtins.input", side_effect=["add 1 2", "multiply 2 3", "exit"]):
+        calculator()
+    assert saved_entries(file_path) == ["add 1.0 2.0 = 3.0", "multiply 2.0 3.0 = 6.0"]
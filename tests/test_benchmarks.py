@@ -0,0 +1,48 @@
+"""
+This module contains test cases for the baseline comparison in `benchmarks/suite.py`.
+It checks that `compare` reports benchmarks slower than the baseline by more
+than the tolerance, accepts slowdowns within it, ignores benchmarks missing
+from either side, and that `--baseline` makes the run fail on a regression.
+"""
+
+import importlib
+import json
+import os
+from unittest.mock import patch
+import pytest
+
+@pytest.fixture(scope="module")
+def suite():
+    """Imports the suite without keeping the LOG_FILE default it sets for its own runs."""
+    with patch.dict(os.environ):
+        return importlib.import_module("benchmarks.suite")
+
+def timings(**medians):
+    """Returns results in the suite's format from benchmark name -> median seconds."""
+    return {name: {"median_s": median} for name, median in medians.items()}
+
+@pytest.mark.parametrize("results, tolerance, expected", [
+    # More than 25% slower is a regression
+    (timings(add=0.13), 0.25, [("add", 0.1, 0.13)]),
+    # Slower, but within the tolerance
+    (timings(add=0.12), 0.25, []),
+    (timings(add=0.12), 0.1, [("add", 0.1, 0.12)]),
+    # Faster than the baseline
+    (timings(add=0.05), 0.0, []),
+    # Only the benchmarks present in both runs are compared
+    (timings(add=0.1, load=5.0), 0.25, []),
+    (timings(save=0.5, load=5.0), 0.25, [("save", 0.2, 0.5)]),
+])
+def test_compare(suite, results, tolerance, expected):
+    """Tests which benchmarks are reported as regressions."""
+    baseline = timings(add=0.1, save=0.2)
+    assert suite.compare(results, baseline, tolerance) == expected
+
+@pytest.mark.parametrize("median, exit_code", [(0.11, 0), (0.2, 1)])
+def test_baseline_exit_code(suite, median, exit_code, tmp_path, capsys):
+    """Tests that a run fails only when a benchmark regressed past the tolerance."""
+    baseline_path = tmp_path / "baseline.json"
+    baseline_path.write_text(json.dumps({"results": timings(add=0.1)}), encoding="utf-8")
+    with patch.object(suite, "run", return_value=timings(add=median)):
+        assert suite.main(["--baseline", str(baseline_path)]) == exit_code
+    assert ("FAIL: add" in capsys.readouterr().out) == bool(exit_code)
@@ -0,0 +1,126 @@
+"""
+This module contains test cases for the LRU result cache in `app.cache`.
+It checks hit/miss/eviction accounting, least-recently-used eviction order,
+caching of zero-divisor errors, signed zeros, warming from a History, that
+results are not shared between numeric modes, and the REPL's `cache` command.
+"""
+
+from fractions import Fraction
+from unittest.mock import Mock, patch
+import pytest
+from app.cache import OperationCache
+from app.calculator import Session, calculator
+from app.history import History
+from app.numeric import create_backend
+from app.registry import get_operation
+
+def counting(name):
+    """Wraps a registered operation so calls to it can be counted."""
+    operation = get_operation(name)
+    wrapped = Mock(side_effect=operation.func)
+    wrapped.name = operation.name
+    return wrapped
+
+def test_hits_and_misses():
+    """Tests that repeated calculations are answered from the cache."""
+    cache = OperationCache(maxsize=4)
+    add = counting("add")
+    assert cache.evaluate(add, (1.0, 2.0)) == 3.0
+    assert cache.evaluate(add, (1.0, 2.0)) == 3.0
+    assert cache.evaluate(add, (2.0, 2.0)) == 4.0
+    assert add.call_count == 2
+    assert cache.stats() == {"size": 2, "maxsize": 4, "hits": 1, "misses": 2, "evictions": 0}
+
+def test_lru_eviction():
+    """Tests that the least recently used result is evicted first."""
+    cache = OperationCache(maxsize=2)
+    add = counting("add")
+    cache.evaluate(add, (1.0, 1.0))
+    cache.evaluate(add, (2.0, 2.0))
+    cache.evaluate(add, (1.0, 1.0))  # (1, 1) is now the most recently used
+    cache.evaluate(add, (3.0, 3.0))  # evicts (2, 2)
+    cache.evaluate(add, (1.0, 1.0))
+    assert cache.stats()["evictions"] == 1
+    assert cache.hits == 2
+    cache.evaluate(add, (2.0, 2.0))
+    assert cache.misses == 4
+
+def test_errors_are_cached():
+    """Tests that zero-divisor errors are cached and raised again."""
+    cache = OperationCache()
+    divide = counting("divide")
+    for _ in range(3):
+        with pytest.raises(ValueError, match="division by zero is not allowed."):
+            cache.evaluate(divide, (1.0, 0.0))
+    assert divide.call_count == 1
+    assert cache.hits == 2
+
+def test_signed_zero_keys():
+    """Tests that 0.0 and -0.0 operands are cached separately."""
+    cache = OperationCache()
+    add = get_operation("add")
+    assert str(cache.evaluate(add, (-0.0, -0.0))) == "-0.0"
+    assert str(cache.evaluate(add, (0.0, 0.0))) == "0.0"
+    assert cache.misses == 2
+
+def test_zero_with_huge_exact_operand():
+    """Tests that a zero next to an int or Fraction too large for a float is a valid key."""
+    cache = OperationCache()
+    huge = 10 ** 400
+    assert cache.evaluate(get_operation("powmod"), (0, huge, 7)) == 0
+    assert cache.evaluate(get_operation("multiply"), (Fraction(0), Fraction(huge)),
+                          create_backend("int").evaluate, "int") == 0
+    assert cache.misses == 2
+
+def test_warm_from_history():
+    """Tests that a cache warmed from a History answers its calculations as hits."""
+    history = History()
+    history.record("multiply", (2.0, 3.0), 6.0)
+    history.add("free text")
+    history.record("add", (1.0, 1.0), 2.0)
+    history.record("add", (5.0, 5.0), 10.0)
+
+    cache = OperationCache(maxsize=2)
+    assert cache.warm(history) == 2
+    assert cache.evaluate(get_operation("add"), (1.0, 1.0)) == 2.0
+    assert cache.evaluate(get_operation("multiply"), (2.0, 3.0)) == 6.0
+    assert (cache.hits, cache.misses) == (1, 1)
+    cache.clear()
+    assert len(cache) == 0
+
+@pytest.mark.parametrize("mode, expected", [
+    ("float", 2.0), ("int", 2), ("decimal", "2"), ("fraction", "2"),
+])
+def test_results_are_per_mode(mode, expected):
+    """Tests that a session in an exact mode is not answered with cached or warmed float results."""
+    session = Session(History(), cache=OperationCache(8))
+    divide = get_operation("divide")
+    session.history.record("divide", (6.0, 3.0), 2.0)
+    session.evaluate(divide, (6.0, 3.0))
+    session.set_numeric(create_backend(mode))
+    session.warm_cache()
+    assert len(session.cache) == (1 if mode == "float" else 0)
+    result = session.evaluate(divide, session.parse("divide 6 3")[2])
+    assert str(result) == str(expected)
+    assert isinstance(result, float) == (mode == "float")
+
+    cache = OperationCache(8)
+    cache.evaluate(divide, (6.0, 3.0))
+    assert cache.evaluate(divide, (6, 3), create_backend("int").evaluate, "int") == 2
+    assert (cache.hits, cache.misses) == (0, 2)
+
+def test_invalid_size():
+    """Tests that a cache must hold at least one result."""
+    with pytest.raises(ValueError, match="Cache size must be at least 1."):
+        OperationCache(0)
+
+@pytest.mark.parametrize("cache_size, expected_output", [
+    ("8", "Cache: 1/8 entries, 1 hits, 1 misses, 0 evictions."),
+    ("0", "Result cache is disabled. Set CALC_CACHE_SIZE to enable it."),
+])
+def test_cache_command(cache_size, expected_output, monkeypatch, capsys):
+    """Tests the REPL's cache command with the cache enabled and disabled."""
+    monkeypatch.setenv("CALC_CACHE_SIZE", cache_size)
+    with patch("builtins.input", side_effect=["add 1 2", "add 1 2", "cache", "exit"]):
+        calculator()
+    assert expected_output in capsys.readouterr().out
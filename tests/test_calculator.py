@@ -12,9 +12,10 @@ Each test case uses `capsys` to capture output and `unittest.mock.patch` to simu
 user input.
 """
 
+import io
 from unittest.mock import patch
 import pytest
-from app.calculator import calculator
+from app.calculator import calculator, repl_prompt, run_batch
 
 # Positive test cases for the calculator function, including history management
 @pytest.mark.parametrize("user_inputs, expected_outputs", [
@@ -40,11 +41,23 @@ from app.calculator import calculator
      ["Result: 3.0", "Result: 2.0", "Last calculation undone.",
       "Last calculation undone.", "Calculation History:"]),
 
+    # Test checkpoints, undoing back to one, and redo
+    (["add 1 2", "checkpoint", "add 3 4", "multiply 2 5", "undo to 1", "history", "redo",
+      "redo", "exit"],
+     ["Checkpoint 1 at 1 entries.", "Undid 2 calculations back to checkpoint 1.\n"
+      "Calculation History:\nadd 1.0 2.0 = 3.0\n", "Redid 2 calculations.",
+      "Nothing to redo."]),
+
     # Test saving and loading the history
     (["add 10 20", "save", "clear", "load", "history", "exit"],
      ["Result: 30.0", "History cleared.", "History saved to default.csv",
       "History loaded from default.csv", "Calculation History:", "add 10.0 20.0 = 30.0"]),
 
+    # Test loading only the newest saved entries
+    (["add 1 2", "add 3 4", "add 5 6", "save", "load tail 2", "history", "exit"],
+     ["History loaded from default.csv.\nCalculation History:\n"
+      "add 3.0 4.0 = 7.0\nadd 5.0 6.0 = 11.0\n"]),
+
     # Test modulus operation
     (["modulus 10 3", "history", "exit"],
      ["Result: 1.0", "Calculation History:", "modulus 10.0 3.0 = 1.0"]),
@@ -52,6 +65,55 @@ from app.calculator import calculator
     # Test exponent operation
     (["exponent 2 3", "history", "exit"],
      ["Result: 8.0", "Calculation History:", "exponent 2.0 3.0 = 8.0"]),
+
+    # Test evaluating an infix expression
+    (["eval (1 + 2) * 3 ^ 2", "history", "exit"],
+     ["Result: 27.0", "add 1.0 2.0 = 3.0", "exponent 3.0 2.0 = 9.0",
+      "multiply 3.0 9.0 = 27.0"]),
+
+    # Expression steps are recorded as calculations, so queries see them
+    (["eval 1 + 2 + 3", "eval 2 * 5", "history summary", "exit"],
+     ["add: count 2, sum 9.0, min 3.0, max 6.0", "multiply: count 1, sum 10.0"]),
+
+    # Test modular exponentiation with three operands
+    (["powmod 4 13 497", "history", "exit"],
+     ["Result: 445", "powmod 4 13 497 = 445"]),
+    # Whole-number powmod operands are exact beyond 2 ** 53 in float mode
+    (["powmod 3 100000000000000000000001 1000000007", "exit"], ["Result: 647050044"]),
+
+    # Test exact integer mode beyond the float range
+    (["mode int", "exponent 2 100", "divide 1 3", "mode", "exit"],
+     ["Numeric mode: int.", "Result: 1267650600228229401496703205376", "Result: 1/3"]),
+    # Expressions are evaluated in the session's numeric mode too
+    (["mode int", "eval 2 ^ 100", "eval 10 ^ 400 / 10 ^ 399", "exit"],
+     ["Result: 1267650600228229401496703205376", "Result: 10\n"]),
+
+    # Exact results beyond Python's decimal text limit are shown in hexadecimal
+    (["mode int", "exponent 2 20000", "history", "exit"],
+     ["Result: 0x1" + "0" * 5000 + "\n", "exponent 2 20000 = 0x1" + "0" * 5000 + "\n"]),
+    (["mode fraction", "exponent 2 20000", "divide 1 3", "exit"],
+     ["Result: 0x1" + "0" * 5000 + "\n", "Result: 1/3"]),
+
+    # Test decimal mode with a chosen precision
+    (["mode decimal 50", "divide 1 7", "exit"],
+     ["Numeric mode: decimal (precision 50).",
+      "Result: 0.14285714285714285714285714285714285714285714285714"]),
+
+    # Test fraction operands
+    (["mode fraction", "add 1/3 1/6", "exit"],
+     ["Result: 1/2"]),
+
+    # Test history queries: filters, pages and summary
+    (["add 1 2", "multiply 2 3", "add 5 5", "history op=+ min=4", "history tail 1",
+      "history summary", "exit"],
+     ["Calculation History:\nadd 5.0 5.0 = 10.0\n",
+      "Calculation History:\nadd 5.0 5.0 = 10.0\nHistory Summary",
+      "History Summary:\nadd: count 2, sum 13.0, min 3.0, max 10.0\n"
+      "multiply: count 1, sum 6.0, min 6.0, max 6.0"]),
+
+    # Test operation aliases and case-insensitive commands
+    (["MOD 10 3", "^ 2 2", "HISTORY", "exit"],
+     ["Result: 1.0", "Result: 4.0", "modulus 10.0 3.0 = 1.0", "exponent 2.0 2.0 = 4.0"]),
 ])
 def test_calculator_positive_history_cases(user_inputs, expected_outputs, capsys):
     """
@@ -70,6 +132,24 @@ def test_calculator_positive_history_cases(user_inputs, expected_outputs, capsys
             assert expected_output in captured.out
 
 
+def test_history_command_streams_entries(capsys):
+    """Tests that the history command prints entries without building the full list."""
+    with patch("builtins.input", side_effect=["add 1 2", "multiply 2 3", "history", "exit"]), \
+            patch("app.history.History.get_history", side_effect=AssertionError("list built")):
+        calculator()
+    assert "add 1.0 2.0 = 3.0\nmultiply 2.0 3.0 = 6.0" in capsys.readouterr().out
+
+
+def test_repl_prompt_lists_registered_operations_and_commands():
+    """Tests that the prompt is built from the registry and the command tables."""
+    prompt = repl_prompt()
+    assert prompt.startswith("Enter an operation (add (+), subtract (-), ")
+    for word in ("powmod", "eval", "mode", "redo", "checkpoint", "snapshot", "cache", "stats"):
+        assert word in prompt
+    with patch("builtins.input", side_effect=["exit"]) as mock_input:
+        calculator()
+    mock_input.assert_called_once_with(prompt)
+
 # Negative test cases for the calculator function's history management and error handling
 @pytest.mark.parametrize("user_inputs, expected_outputs", [
     # Check undo with an empty history
@@ -91,12 +171,31 @@ def test_calculator_positive_history_cases(user_inputs, expected_outputs, capsys
     # Test invalid operation name
     (["unknown 1 2", "exit"],
      ["Unknown operation 'unknown'. Supported operations: add, subtract, "
-      "multiply, divide, modulus, exponent."]),
+      "multiply, divide, modulus, exponent, powmod."]),
+
+    # Test malformed history queries
+    (["history op", "history color=red", "history since=yesterday", "exit"],
+     ["Invalid history query. Usage: history [head [N]|tail [N]|summary] [op=NAME] [min=X] "
+      "[max=X] [since=TIME] [until=TIME]"]),
 
     # Test division by zero
     (["divide 10 0", "exit"],
      ["division by zero is not allowed."]),
 
+    # Test a float result that overflows
+    (["exponent 10 400", "exit"],
+     ["result is too large to represent."]),
+
+    # Test invalid numeric modes
+    (["mode complex", "mode float 10", "mode decimal 0", "exit"],
+     ["Unknown numeric mode 'complex'. Supported modes: float, int, decimal, fraction.",
+      "Precision only applies to the decimal mode, not 'float'.",
+      "Precision must be at least 1."]),
+
+    # Test operands that the numeric mode cannot parse
+    (["mode int", "add 1.5 2", "exit"],
+     ["Invalid input. Please follow the format: <operation> <num1> <num2>"]),
+
     # Test modulus by zero
     (["modulus 10 0", "exit"],
      ["modulus by zero is not allowed."]),
@@ -113,10 +212,23 @@ def test_calculator_positive_history_cases(user_inputs, expected_outputs, capsys
     (["add 1 2 3", "exit"],
      ["Invalid input. Please follow the format: <operation> <num1> <num2>"]),
 
+    # Test invalid expressions and expression errors
+    (["eval 1 +", "eval 4 / 0", "eval 10 ^ 400", "eval 0 ^ -1", "exit"],
+     ["Expected an operand but found end of expression.", "division by zero is not allowed.",
+      "result is too large to represent.", "exponent is undefined for these operands."]),
+
     # Test saving history with no calculations
     (["clear", "save", "history", "exit"],
      ["History cleared.", "History saved to default.csv", "Calculation History:"]),
 
+    # Test malformed undo arguments and unknown checkpoints
+    (["undo 5", "undo to 7", "exit"],
+     ["Invalid undo command. Usage: undo [to CHECKPOINT]", "Unknown checkpoint 7."]),
+
+    # Test malformed load arguments
+    (["load tail", "load range 5 1", "exit"],
+     ["Invalid load command. Usage: load [tail N|range START END]"]),
+
     # Test loading history when "default.csv" is empty
     (["clear", "save", "load", "history", "exit"],
     ["History cleared.", "History saved to default.csv",
@@ -137,3 +249,31 @@ def test_calculator_negative_cases(user_inputs, expected_outputs, capsys):
         # Assert that each expected output is in the captured output
         for expected_output in expected_outputs:
             assert expected_output in captured.out
+
+
+# Batch mode test cases
+@pytest.mark.parametrize("lines, expected_outputs", [
+    (["add 1 2", "multiply 4 5"], ["add 1.0 2.0 = 3.0", "multiply 4.0 5.0 = 20.0"]),
+    (["divide 10 0", "modulus 10 0", "divide 9 3"],
+     ["divide 10.0 0.0 = error: division by zero is not allowed.",
+      "modulus 10.0 0.0 = error: modulus by zero is not allowed.",
+      "divide 9.0 3.0 = 3.0"]),
+    (["", "# comment", "unknown 1 2", "add a b", "exponent 2 3"],
+     ["error: unknown operation 'unknown'", "error: invalid input format: add a b",
+      "exponent 2.0 3.0 = 8.0"]),
+    # Non-finite results from finite operands are errors, with the REPL's messages
+    (["exponent 10 400", "multiply 1e308 10", "exponent -8 0.5", "add inf 1"],
+     ["exponent 10.0 400.0 = error: result is too large to represent.",
+      "multiply 1e+308 10.0 = error: result is too large to represent.",
+      "exponent -8.0 0.5 = error: exponent is undefined for these operands.",
+      "add inf 1.0 = inf"]),
+])
+def test_run_batch(lines, expected_outputs):
+    """
+    Tests that batch mode writes one result line per input line, in order,
+    across several chunks.
+    """
+    output = io.StringIO()
+    processed = run_batch(io.StringIO("\n".join(lines)), output, chunk_size=2)
+    assert output.getvalue().splitlines() == expected_outputs
+    assert processed == len(expected_outputs)
@@ -0,0 +1,93 @@
+"""
+This module contains test cases for the expression engine in `app.expression`.
+The positive tests check precedence, associativity, parentheses, function-call
+syntax, compilation caching, and vectorized evaluation over arrays of bindings.
+The negative tests check that malformed expressions and evaluation errors raise
+ExpressionError or ValueError with a helpful message.
+"""
+
+from fractions import Fraction
+import numpy as np
+import pytest
+from app.expression import (ExpressionError, compile_expression, evaluate_expression,
+                            parse_expression)
+from app.numeric import create_backend
+
+# Positive test cases
+@pytest.mark.parametrize("source, expected", [
+    ("1 + 2 * 3", 7.0),          # * binds tighter than +
+    ("(1 + 2) * 3", 9.0),        # Parentheses
+    ("10 - 4 - 3", 3.0),         # Left-associative subtraction
+    ("2 ^ 3 ^ 2", 512.0),        # Right-associative exponent
+    ("2 ** 3", 8.0),             # ** is an alias of ^
+    ("-2 ^ 2", -4.0),            # Unary minus binds looser than ^
+    ("2 ^ -1", 0.5),             # Unary minus in an exponent
+    ("10 % 4 * 3", 6.0),         # % has the same precedence as *
+    ("add(1, 2) * modulus(7, 4)", 9.0),  # Operations called by name
+    ("1e3 + .5", 1000.5),        # Exponent and leading-dot numbers
+])
+def test_evaluate_expression(source, expected):
+    """Tests that expressions evaluate with the expected precedence rules."""
+    assert evaluate_expression(source) == expected
+
+def test_compile_is_cached_and_binds_variables():
+    """Tests that compiled expressions are reused and accept variable bindings."""
+    compiled = compile_expression("x * (y + 1)")
+    assert compile_expression("x * (y + 1)") is compiled
+    assert compiled.variables == ("x", "y")
+    assert compiled.evaluate(x=2.0, y=3.0) == 8.0
+    assert parse_expression("-x") == ("neg", ("var", "x"))
+
+def test_evaluate_with_numeric_backend():
+    """Tests that a backend parses the constants and applies the operations exactly."""
+    assert evaluate_expression("2 ^ 100 + 1", create_backend("int")) == 2 ** 100 + 1
+    assert evaluate_expression("1 / 3 - x", create_backend("fraction"),
+                               x=Fraction(1, 3)) == 0
+    with pytest.raises(ValueError, match="division by zero is not allowed."):
+        evaluate_expression("1 / 0", create_backend("int"))
+
+def test_evaluate_batch_over_bindings():
+    """Tests vectorized evaluation with per-element zero-divisor errors."""
+    compiled = compile_expression("x / (y - 1) + 2 ^ x")
+    x = np.arange(4, dtype=float)
+    results, errors = compiled.evaluate_batch(x=x, y=np.array([0.0, 1.0, 2.0, 3.0]))
+    assert errors.tolist() == [False, True, False, False]
+    assert results[[0, 2, 3]].tolist() == [1.0, 6.0, 9.5]
+    assert np.isnan(results[1])
+
+def test_evaluate_batch_broadcasts_constants():
+    """Tests that scalar bindings and constants broadcast against arrays."""
+    results, errors = compile_expression("-(a % b)").evaluate_batch(a=[5, 7, 9], b=4)
+    assert results.tolist() == [-1.0, -3.0, -1.0]
+    assert not errors.any()
+
+def test_evaluate_batch_flags_overflow():
+    """Tests that non-finite results from finite operands are flagged as errors."""
+    results, errors = compile_expression("x ^ y").evaluate_batch(x=[10, 2, 0], y=[400, 3, -1])
+    assert errors.tolist() == [True, False, True]
+    assert results[1] == 8.0
+    assert np.isnan(results[[0, 2]]).all()
+
+# Negative test cases
+@pytest.mark.parametrize("source, message", [
+    ("", "Empty expression."),
+    ("1 +", "Expected an operand but found end of expression."),
+    ("(1 + 2", "Expected '\\)' but found end of expression."),
+    ("1 2", "Unexpected '2' after complete expression."),
+    ("1 $ 2", "Unexpected character '\\$' at position 2."),
+    (")", "Expected an operand but found '\\)'."),
+    ("root(4)", "Unknown operation 'root'."),
+    ("add(1)", "Operation 'add' takes 2 operands but 1 were given."),
+    ("x + 1", "Unknown variable 'x'."),
+    ("10 ^ 400", "result is too large to represent."),
+    ("0 ^ -1", "exponent is undefined for these operands."),
+])
+def test_expression_errors(source, message):
+    """Tests that malformed expressions raise ExpressionError."""
+    with pytest.raises(ExpressionError, match=message):
+        evaluate_expression(source)
+
+def test_division_by_zero_in_expression():
+    """Tests that scalar evaluation reports division by zero like the operation does."""
+    with pytest.raises(ValueError, match="division by zero is not allowed."):
+        evaluate_expression("1 / (2 - 2)")
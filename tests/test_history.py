@@ -1,7 +1,7 @@
 """
 This module contains test cases for the History class in the `app.history` module.
-It uses pytest to validate the behavior of the add, get_history, undo_last, clear,
-save, and load methods of the History class. The tests are organized into positive
+It uses pytest to validate the behavior of the add, get_history, iter_history, undo_last,
+clear, save, and load methods of the History class. The tests are organized into positive
 and negative cases to ensure comprehensive coverage of both expected and edge case
 behaviors.
 
@@ -13,11 +13,38 @@ Test functions:
   a CSV file.
 - `test_history_negative`: Tests edge cases and incorrect usage of the History class,
   such as adding None and clearing the history.
+- `test_journal_replay`, `test_journal_compaction`, `test_journal_follows_csv_load`:
+  Test the append-only journal persistence mode.
+- `test_record_structured`, `test_add_parses_calculator_entries`: Test that
+  calculations are stored as typed columns and displayed unchanged.
+- `test_entries_are_formatted_by_the_registry`: Tests that entries are displayed
+  through the registered operation's `Operation.format`.
+- `test_binary_format_round_trip`, `test_binary_history_is_memory_mapped`,
+  `test_history_format_selection`: Test the memory-mapped .npy history format.
+- `test_capacity_spills_to_disk`, `test_spill_after_binary_load`,
+  `test_capacity_negative`: Test the bounded in-memory history that spills
+  older entries to a segment file.
+- `test_query_filters`, `test_query_pages`, `test_aggregate`,
+  `test_query_index_follows_undo`: Test filtered queries, paging and
+  per-operation aggregates.
+- `test_chunked_load_matches_full_load`, `test_load_tail`, `test_load_byte_ranges`,
+  `test_load_progress`, `test_load_legacy_csv_in_chunks`, `test_load_negative`:
+  Test streaming CSV loads in chunks, of the last N entries or of a byte range.
+- `test_undo_redo`, `test_undo_to_checkpoint`, `test_redo_limit`,
+  `test_new_entry_discards_redo`, `test_undo_to_negative`, `test_undo_redo_journal`:
+  Test multi-level undo and redo with checkpoints.
+- `test_compressed_round_trip`, `test_compressed_tail`, `test_compressed_progress`,
+  `test_compressed_negative`: Test CSV histories compressed by file extension.
 """
 
+import numpy as np
 import pandas as pd
 import pytest
-from app.history import History
+from app.history import History, formats
+from app.history.formats import COMPRESSIONS, compression_available, open_compressed
+# Importing the operations module registers the built-in operations
+import app.operations  # pylint: disable=unused-import
+from app.registry import Operation
 
 # Positive test cases for the History class
 
@@ -182,3 +209,596 @@ def test_load_history_negative(file_path, expected_message, tmp_path, capsys):
     # Capture the output and check for the expected message
     captured = capsys.readouterr()
     assert expected_message in captured.out
+
+
+# Journal (append-only persistence) test cases
+@pytest.mark.parametrize("actions, expected_history", [
+    ([("add", "add 1 + 2 = 3"), ("add", "add 2 + 2 = 4")], ["add 1 + 2 = 3", "add 2 + 2 = 4"]),
+    ([("add", "a"), ("add", "b"), ("undo_last",), ("add", "c")], ["a", "c"]),
+    ([("add", "a"), ("clear",), ("add", "b"), ("undo_last",), ("undo_last",)], []),
+    ([("add", "multi\nline \\n entry")], ["multi\nline \\n entry"]),
+])
+def test_journal_replay(actions, expected_history, tmp_path):
+    """
+    Tests that a journal written by one History is replayed by another.
+
+    Args:
+        actions (list): Method name and arguments applied to the first History.
+        expected_history (list): Expected history after replaying the journal.
+        tmp_path (path): Temporary directory provided by pytest for file operations.
+    """
+    journal_path = str(tmp_path / "history.journal")
+    history = History(journal_path=journal_path, flush_every=2)
+    for name, *args in actions:
+        getattr(history, name)(*args)
+    history.close()
+
+    assert History(journal_path=journal_path).get_history() == expected_history
+
+
+def test_journal_compaction(tmp_path):
+    """Tests that a journal with many dead records is compacted on the fly."""
+    journal_path = tmp_path / "history.journal"
+    history = History(journal_path=str(journal_path))
+    history.add("kept")
+    for index in range(3000):
+        history.add(f"entry {index}")
+        history.undo_last()
+    history.close()
+
+    # The journal was rewritten at least once, so it is far smaller than 6001 records
+    assert len(journal_path.read_text(encoding="utf-8").splitlines()) < 1500
+    assert History(journal_path=str(journal_path)).get_history() == ["kept"]
+
+
+def test_journal_follows_csv_load(tmp_path, capsys):
+    """Tests that loading a CSV into a journaled History rewrites the journal."""
+    csv_path = tmp_path / "default.csv"
+    pd.DataFrame({"Operation": ["x", "y"]}).to_csv(csv_path, index=False)
+    journal_path = tmp_path / "history.journal"
+    journal_path.write_text("+stale\n?bad record\n", encoding="utf-8")
+
+    history = History(journal_path=str(journal_path))
+    assert history.get_history() == ["stale"]
+    history.load(csv_path)
+    history.close()
+    history.close()  # Closing twice is harmless
+    capsys.readouterr()
+
+    # Entries loaded from a CSV without a Timestamp column are stamped 0.0
+    assert journal_path.read_text(encoding="utf-8") == "+0.0\tx\n+0.0\ty\n"
+
+
+# Structured record test cases
+@pytest.mark.parametrize("name, operands, result, expected_entry, structured", [
+    ("add", (2.0, 3.0), 5.0, "add 2.0 3.0 = 5.0", True),
+    ("divide", (1.0, 3.0), 1 / 3, f"divide 1.0 3.0 = {1 / 3}", True),
+    ("exponent", (-8.0, 0.5), (-8.0) ** 0.5, f"exponent -8.0 0.5 = {(-8.0) ** 0.5}", False),
+    ("negate", (4.0,), -4.0, "negate 4.0 = -4.0", False),
+])
+def test_record_structured(name, operands, result, expected_entry, structured, tmp_path):
+    """
+    Tests that calculations are stored as typed fields when they fit the columns,
+    displayed lazily, and survive a CSV round trip unchanged.
+    """
+    history = History()
+    history.record(name, operands, result, timestamp=123.5)
+    history.add("free text entry")
+
+    assert history.get_history() == [expected_entry, "free text entry"]
+    assert (history.records.column("codes")[0] != -1) == structured
+
+    file_path = tmp_path / "default.csv"
+    history.save(file_path)
+    loaded = History()
+    loaded.load(file_path)
+    assert loaded.get_history() == [expected_entry, "free text entry"]
+    assert loaded.records.column("timestamp")[0] == 123.5
+    assert loaded.to_frame()["Name"].tolist()[0] == (name if structured else "")
+
+
+def test_entries_are_formatted_by_the_registry(monkeypatch):
+    """Tests that structured and text entries are displayed through Operation.format."""
+    monkeypatch.setattr(Operation, "format", lambda self, operands, result:
+                        f"{' {} '.format(self.symbol).join(map(str, operands))} = {result}")
+    history = History()
+    history.record("add", (1.0, 2.0), 3.0)
+    history.record("powmod", (2, 10, 7), 2)
+    assert history.get_history() == ["1.0 + 2.0 = 3.0", "2 powmod 10 powmod 7 = 2"]
+
+def test_add_parses_calculator_entries(tmp_path):
+    """Tests that formatted entries added as strings are stored as typed fields."""
+    history = History()
+    history.add("modulus 10.0 3.0 = 1.0")
+    history.add("add 2 + 3 = 5")
+    assert history.records.column("codes").tolist() == [0, -1]
+    assert history.records.names == ["modulus"]
+    assert history.to_frame()["Result"].tolist() == [1.0, 0.0]
+
+    # A CSV with only an Operation column is parsed entry by entry
+    file_path = tmp_path / "legacy.csv"
+    pd.DataFrame({"Operation": ["add 1.0 2.0 = 3.0", "add 1 2 = 3"]}).to_csv(file_path, index=False)
+    history.load(file_path)
+    assert history.get_history() == ["add 1.0 2.0 = 3.0", "add 1 2 = 3"]
+    assert history.records.column("codes").tolist() == [1, -1]
+
+
+# Binary (.npy) history format test cases
+@pytest.mark.parametrize("entries", [
+    ["add 1.0 2.0 = 3.0", "free text", "divide 1.0 3.0 = 0.3333333333333333"],
+    ["text only"],
+    [],
+])
+def test_binary_format_round_trip(entries, tmp_path):
+    """Tests that a history saved as .npy loads back unchanged."""
+    history = History()
+    for index, entry in enumerate(entries):
+        history.add(entry, timestamp=float(index))
+    file_path = tmp_path / "history.npy"
+    history.save(file_path)
+
+    loaded = History()
+    loaded.load(file_path)
+    assert loaded.get_history() == entries
+    assert loaded.records.column("timestamp").tolist() == [float(i) for i in range(len(entries))]
+    assert (tmp_path / "history.npy.json").exists()
+
+def test_binary_format_rejects_mismatched_sidecar(tmp_path):
+    """Tests that an array left next to another save's sidecar is not loaded."""
+    file_path = tmp_path / "history.npy"
+    sidecar = tmp_path / "history.npy.json"
+    history = History()
+    history.record("add", (1.0, 2.0), 3.0)
+    history.save(file_path)
+    old_sidecar = sidecar.read_bytes()
+    history.undo_last()
+    history.record("add", (2.0, 2.0), 4.0)
+    history.save(file_path)
+    # As if a save crashed after replacing the array but before the sidecar
+    sidecar.write_bytes(old_sidecar)
+    with pytest.raises(ValueError, match="does not match its sidecar"):
+        History().load(file_path)
+
+
+def test_binary_history_is_memory_mapped(tmp_path):
+    """
+    Tests that a loaded .npy history is memory-mapped, and that undo, append,
+    tail and re-saving over the mapped file all work on top of the mapping.
+    """
+    history = History()
+    for value in range(5):
+        history.record("add", (float(value), 1.0), value + 1.0, timestamp=float(value))
+    file_path = tmp_path / "history.npy"
+    history.save(file_path)
+
+    loaded = History()
+    loaded.load(file_path)
+    assert isinstance(loaded.records.column("num1"), np.memmap)
+    assert loaded.tail(2) == ["add 3.0 1.0 = 4.0", "add 4.0 1.0 = 5.0"]
+
+    loaded.undo_last()
+    loaded.undo_last()
+    loaded.record("multiply", (2.0, 2.0), 4.0)
+    loaded.add("note")
+    assert loaded.tail(3) == ["add 2.0 1.0 = 3.0", "multiply 2.0 2.0 = 4.0", "note"]
+
+    # Saving over the file that is still mapped replaces it atomically
+    loaded.save(file_path)
+    reloaded = History()
+    reloaded.load(file_path)
+    assert reloaded.get_history() == loaded.get_history()
+    assert len(reloaded) == 5
+
+
+def test_history_format_selection(tmp_path, monkeypatch):
+    """Tests that HISTORY_FORMAT overrides the extension and rejects unknown formats."""
+    history = History()
+    history.add("add 1.0 1.0 = 2.0")
+    file_path = tmp_path / "history.bin"
+
+    monkeypatch.setenv("HISTORY_FORMAT", "npy")
+    history.save(file_path)
+    assert np.load(file_path).shape == (1,)
+    loaded = History()
+    loaded.load(file_path)
+    assert loaded.get_history() == ["add 1.0 1.0 = 2.0"]
+
+    monkeypatch.setenv("HISTORY_FORMAT", "xml")
+    with pytest.raises(ValueError, match="Unsupported history format 'xml'."):
+        history.save(file_path)
+
+
+@pytest.mark.parametrize("capacity", [1, 4, 10])
+def test_capacity_spills_to_disk(capacity, tmp_path):
+    """
+    Tests that at most `capacity` entries stay in memory while every entry,
+    including spilled text entries, is still listed, saved and undoable.
+    """
+    spill_path = tmp_path / "history.spill"
+    history = History(capacity=capacity, spill_path=str(spill_path))
+    expected = []
+    for value in range(25):
+        if value % 7 == 3:
+            entry = f"note {value}\nwith a newline"
+            history.add(entry, timestamp=float(value))
+        else:
+            history.record("add", (float(value), 1.0), value + 1.0, timestamp=float(value))
+            entry = f"add {float(value)} 1.0 = {value + 1.0}"
+        expected.append(entry)
+        assert len(history.records.codes) <= capacity
+    assert spill_path.exists()
+    entries = history.iter_history()
+    assert next(entries) == expected[0]
+    assert [expected[0], *entries] == expected
+    assert history.to_frame()["Num1"].tolist()[3] == 0.0
+
+    # Undo reaches into the spilled segment, and new entries overwrite it
+    for _ in range(capacity + 2):
+        history.undo_last()
+    del expected[-(capacity + 2):]
+    for value in range(3):
+        history.add(f"after {value}")
+        expected.append(f"after {value}")
+    assert history.get_history() == expected
+
+    file_path = tmp_path / "history.npy"
+    history.save(file_path)
+    loaded = History()
+    loaded.load(file_path)
+    assert loaded.get_history() == expected
+
+    history.close()
+    assert not spill_path.exists()
+
+def test_spill_after_binary_load(tmp_path):
+    """Tests that a memory-mapped history keeps its entries once new ones spill."""
+    history = History()
+    for value in range(6):
+        history.record("multiply", (float(value), 2.0), value * 2.0)
+    history.add("loaded note")
+    file_path = tmp_path / "history.npy"
+    history.save(file_path)
+
+    bounded = History(capacity=2)
+    bounded.load(file_path)
+    bounded.undo_last()
+    for value in range(5):
+        bounded.record("add", (float(value), 0.0), float(value))
+    assert bounded.get_history() == (history.get_history()[:-1]
+                                     + [f"add {float(value)} 0.0 = {float(value)}"
+                                        for value in range(5)])
+    bounded.close()
+
+@pytest.mark.parametrize("capacity", [0, -5])
+def test_capacity_negative(capacity):
+    """Tests that a capacity below one is rejected."""
+    with pytest.raises(ValueError, match="History capacity must be at least 1."):
+        History(capacity=capacity)
+
+
+def query_history():
+    """Returns a History of alternating add/multiply calculations and one text entry."""
+    history = History()
+    for value in range(10):
+        history.record("add" if value % 2 else "multiply", (float(value), 1.0), float(value),
+                       timestamp=float(value))
+    history.add("note", timestamp=10.0)
+    return history
+
+@pytest.mark.parametrize("filters, expected_results", [
+    ({"operation": "add"}, [1.0, 3.0, 5.0, 7.0, 9.0]),
+    ({"operation": "divide"}, []),
+    ({"min_result": 7.0}, [7.0, 8.0, 9.0]),
+    ({"operation": "multiply", "max_result": 4.0}, [0.0, 2.0, 4.0]),
+    ({"since": 3.0, "until": 5.0}, [3.0, 4.0, 5.0]),
+    ({"since": 8.0}, [8.0, 9.0, "note"]),
+    ({"operation": "add", "since": 2.5, "min_result": 5.0}, [5.0, 7.0, 9.0]),
+])
+@pytest.mark.parametrize("ordered", [True, False])
+def test_query_filters(filters, expected_results, ordered):
+    """Tests filtering by operation, result range and time window, in or out of time order."""
+    history = query_history()
+    if not ordered:
+        # An out-of-order entry that no filter above matches forces the scanning path
+        history.add("late", timestamp=-1.0)
+    entries = history.query(**filters)
+    assert [entry if entry == "note" else float(entry.rsplit(" = ", 1)[1])
+            for entry in entries] == expected_results
+    assert history.records.time_ordered is ordered
+
+@pytest.mark.parametrize("kwargs, expected", [
+    ({"limit": 2}, ["multiply 0.0 1.0 = 0.0", "add 1.0 1.0 = 1.0"]),
+    ({"limit": 2, "offset": 9}, ["add 9.0 1.0 = 9.0", "note"]),
+    ({"limit": 2, "newest": True}, ["add 9.0 1.0 = 9.0", "note"]),
+    ({"limit": 2, "newest": True, "offset": 1}, ["multiply 8.0 1.0 = 8.0", "add 9.0 1.0 = 9.0"]),
+    ({"operation": "add", "limit": 1, "newest": True}, ["add 9.0 1.0 = 9.0"]),
+    ({"limit": 0}, []),
+])
+def test_query_pages(kwargs, expected):
+    """Tests head and tail pages of query results."""
+    assert query_history().query(**kwargs) == expected
+
+def test_aggregate():
+    """Tests count, sum, min and max per operation, with and without filters."""
+    history = query_history()
+    assert history.aggregate() == {
+        "multiply": {"count": 5, "sum": 20.0, "min": 0.0, "max": 8.0},
+        "add": {"count": 5, "sum": 25.0, "min": 1.0, "max": 9.0},
+    }
+    assert history.aggregate(operation="add", max_result=5.0) == {
+        "add": {"count": 3, "sum": 9.0, "min": 1.0, "max": 5.0}}
+    assert History().aggregate() == {}
+
+def test_query_index_follows_undo(tmp_path):
+    """Tests that the per-operation index stays correct across undo, appends, spills and loads."""
+    history = History(capacity=3)
+    history.record("add", (1.0, 1.0), 2.0)
+    assert history.query(operation="add") == ["add 1.0 1.0 = 2.0"]
+    for value in range(6):
+        history.record("subtract", (float(value), 1.0), value - 1.0)
+    history.record("add", (2.0, 2.0), 4.0)
+    history.undo_last()
+    history.undo_last()
+    history.record("add", (3.0, 3.0), 6.0)
+    assert history.query(operation="add") == ["add 1.0 1.0 = 2.0", "add 3.0 3.0 = 6.0"]
+    assert history.aggregate(operation="subtract")["subtract"]["count"] == 5
+
+    file_path = tmp_path / "history.csv"
+    history.save(file_path)
+    loaded = History()
+    loaded.load(file_path)
+    assert loaded.query(operation="add") == ["add 1.0 1.0 = 2.0", "add 3.0 3.0 = 6.0"]
+    history.close()
+
+
+# Chunked and partial CSV load test cases
+
+def large_history(tmp_path, count=25):
+    """Saves `count` calculations and a text entry to a CSV file and returns its path."""
+    history = History()
+    for value in range(count):
+        history.record("add" if value % 3 else "divide", (float(value), 2.0),
+                       value + 2.0 if value % 3 else value / 2.0, timestamp=float(value))
+    history.add("note", timestamp=float(count))
+    file_path = tmp_path / "large.csv"
+    history.save(file_path)
+    return file_path, history.get_history()
+
+@pytest.mark.parametrize("chunk_size", [1, 4, 26, 1000])
+def test_chunked_load_matches_full_load(chunk_size, tmp_path):
+    """Tests that loading in chunks of any size gives the same history and columns."""
+    file_path, expected = large_history(tmp_path)
+    history = History()
+    history.load(file_path, chunk_size=chunk_size)
+    assert history.get_history() == expected
+    assert history.records.time_ordered
+    assert history.aggregate(operation="divide")["divide"]["count"] == 9
+
+@pytest.mark.parametrize("tail, expected_count", [(0, 0), (1, 1), (5, 5), (26, 26), (100, 26)])
+@pytest.mark.parametrize("extension", ["csv", "npy"])
+def test_load_tail(tail, expected_count, extension, tmp_path):
+    """Tests loading only the last N entries of a CSV or binary history."""
+    file_path, expected = large_history(tmp_path)
+    if extension == "npy":
+        binary = History()
+        binary.load(file_path)
+        file_path = tmp_path / "large.npy"
+        binary.save(file_path)
+    history = History()
+    history.load(file_path, tail=tail, chunk_size=3)
+    assert history.get_history() == expected[len(expected) - expected_count:]
+
+def test_load_byte_ranges(tmp_path):
+    """Tests that adjacent byte ranges split the rows between them without gaps or overlaps."""
+    file_path, expected = large_history(tmp_path)
+    size = file_path.stat().st_size
+    bounds = [0, 1, size // 3, size // 2, size // 2 + 1, size]
+    entries = []
+    for start, end in zip(bounds, bounds[1:]):
+        history = History()
+        history.load(file_path, byte_range=(start, end))
+        entries.extend(history.get_history())
+    assert entries == expected
+
+def test_load_progress(tmp_path):
+    """Tests that progress is reported after every chunk and ends at the full size."""
+    file_path, _ = large_history(tmp_path)
+    calls = []
+    History().load(file_path, chunk_size=10, progress=lambda *args: calls.append(args))
+    assert [entries for entries, _, _ in calls] == [10, 20, 26]
+    assert all(read <= total for _, read, total in calls)
+    assert calls[-1][1] == calls[-1][2]
+
+def test_load_legacy_csv_in_chunks(tmp_path):
+    """Tests that a CSV with only an Operation column is parsed entry by entry in chunks."""
+    file_path = tmp_path / "legacy.csv"
+    entries = ["add 2.0 3.0 = 5.0", "note, with a comma", "multiply 4.0 5.0 = 20.0"]
+    pd.DataFrame({"Operation": entries}).to_csv(file_path, index=False)
+    history = History()
+    history.load(file_path, chunk_size=2)
+    assert history.get_history() == entries
+    assert history.query(operation="multiply") == ["multiply 4.0 5.0 = 20.0"]
+    history = History()
+    history.load(file_path, tail=2)
+    assert history.get_history() == entries[1:]
+
+def test_load_negative(tmp_path):
+    """Tests that byte ranges are rejected for binary history files."""
+    with pytest.raises(ValueError, match="Byte ranges only apply to CSV"):
+        History().load(tmp_path / "history.npy", byte_range=(0, 10))
+
+
+# Undo, redo and checkpoint test cases
+
+def numbered_history(count, **kwargs):
+    """Returns a history of `count` additions, the i-th adding i and 1."""
+    history = History(**kwargs)
+    for value in range(count):
+        history.record("add", (float(value), 1.0), value + 1.0, timestamp=float(value))
+    return history
+
+def test_undo_redo():
+    """Tests that undone entries are redone in reverse order of undoing."""
+    history = numbered_history(3)
+    history.add("note")
+    history.undo_last()
+    history.undo_last()
+    assert len(history) == 2
+    assert history.redo() == 1
+    assert history.get_history()[-1] == "add 2.0 1.0 = 3.0"
+    assert history.redo() == 1
+    assert history.get_history()[-1] == "note"
+    assert history.redo() == 0
+    assert history.query(operation="add", limit=1, newest=True) == ["add 2.0 1.0 = 3.0"]
+
+@pytest.mark.parametrize("capacity", [None, 4])
+def test_undo_to_checkpoint(capacity, tmp_path):
+    """Tests undoing back to checkpoints in one step, including across spilled entries."""
+    history = numbered_history(3, capacity=capacity, spill_path=str(tmp_path / "spill"))
+    first = history.checkpoint()
+    for value in range(3, 10):
+        history.record("multiply", (float(value), 2.0), value * 2.0, timestamp=float(value))
+    history.add("note", timestamp=10.0)
+    second = history.checkpoint()
+    history.record("add", (11.0, 1.0), 12.0, timestamp=11.0)
+    expected = history.get_history()
+    assert history.query(operation="multiply", limit=1) == ["multiply 3.0 2.0 = 6.0"]
+
+    assert history.undo_to(second) == 1
+    assert history.undo_to(first) == 8
+    assert history.get_history() == expected[:3]
+    assert not history.query(operation="multiply")
+    assert history.undo_to(first) == 0
+    assert history.redo() == 8
+    assert history.get_history() == expected[:11]
+    assert history.query(operation="multiply", limit=1) == ["multiply 3.0 2.0 = 6.0"]
+    assert history.redo() == 1
+    assert history.get_history() == expected
+    history.close()
+
+def test_redo_limit():
+    """Tests that the redo buffer keeps at most redo_limit entries, dropping the oldest steps."""
+    history = numbered_history(10, redo_limit=3)
+    for _ in range(5):
+        history.undo_last()
+    assert history.redo() == 1
+    assert history.redo() == 1
+    assert history.redo() == 1
+    assert history.redo() == 0
+    assert len(history) == 8
+
+    start = history.checkpoint()
+    history.record_many([("add", (1.0, 1.0), 2.0)] * 5)
+    history.undo_last()
+    assert history.undo_to(start) == 4
+    # The step was larger than the limit, so nothing can be redone
+    assert history.redo() == 0
+
+def test_new_entry_discards_redo():
+    """Tests that a new entry after undoing discards redo steps and checkpoints ahead of it."""
+    history = numbered_history(2)
+    kept = history.checkpoint()
+    history.record("add", (5.0, 5.0), 10.0)
+    history.checkpoint()
+    history.undo_to(kept)
+    history.add("new entry")
+    assert history.redo() == 0
+    assert set(history.checkpoints) == {kept}
+    history.clear()
+    assert not history.checkpoints
+
+@pytest.mark.parametrize("checkpoint, message", [
+    (99, "Unknown checkpoint 99."),
+    (2, "Checkpoint 2 is ahead of the history; redo first."),
+])
+def test_undo_to_negative(checkpoint, message):
+    """Tests undoing to unknown checkpoints or to checkpoints past the current entries."""
+    history = numbered_history(2)
+    first = history.checkpoint()
+    history.record("add", (5.0, 5.0), 10.0)
+    history.checkpoint()
+    history.undo_to(first)
+    with pytest.raises(ValueError, match=message):
+        history.undo_to(checkpoint)
+
+def test_undo_redo_journal(tmp_path):
+    """Tests that the journal replays to the same entries after undo, undo_to and redo."""
+    journal = str(tmp_path / "history.journal")
+    history = numbered_history(5, journal_path=journal)
+    start = history.checkpoint()
+    history.add("note")
+    history.record("add", (6.0, 1.0), 7.0)
+    history.undo_to(start)
+    history.undo_last()
+    history.redo()
+    history.redo()
+    history.undo_last()
+    expected = history.get_history()
+    history.close()
+    assert History(journal_path=journal).get_history() == expected
+
+
+# Compressed history test cases
+
+COMPRESSED_EXTENSIONS = [
+    pytest.param(extension, marks=pytest.mark.skipif(
+        not compression_available(COMPRESSIONS[extension]), reason="no zstd module"))
+    for extension in COMPRESSIONS]
+
+@pytest.mark.parametrize("extension", COMPRESSED_EXTENSIONS)
+def test_compressed_round_trip(extension, tmp_path):
+    """Tests that a compressed CSV history is smaller and loads back unchanged."""
+    file_path, expected = large_history(tmp_path, count=2000)
+    compressed_path = tmp_path / f"large.csv{extension}"
+    history = History()
+    history.load(file_path)
+    history.save(compressed_path)
+    assert compressed_path.stat().st_size < file_path.stat().st_size / 3
+    with open_compressed(compressed_path, "rb", COMPRESSIONS[extension]) as source:
+        assert source.read() == file_path.read_bytes()
+
+    loaded = History()
+    loaded.load(compressed_path, chunk_size=300)
+    assert loaded.get_history() == expected
+    assert loaded.aggregate(operation="divide")["divide"]["count"] == 667
+    tail = History()
+    tail.load(compressed_path, tail=250, chunk_size=300)
+    assert tail.get_history() == expected[-250:]
+
+@pytest.mark.parametrize("tail, expected_count", [(0, 0), (1, 1), (4, 4), (26, 26), (100, 26)])
+def test_compressed_tail(tail, expected_count, tmp_path):
+    """Tests that the tail of a compressed history is kept while streaming it in chunks."""
+    file_path, expected = large_history(tmp_path)
+    history = History()
+    history.load(file_path)
+    history.save(tmp_path / "large.csv.gz")
+    history = History()
+    history.load(tmp_path / "large.csv.gz", tail=tail, chunk_size=3)
+    assert history.get_history() == expected[len(expected) - expected_count:]
+
+def test_compressed_progress(tmp_path):
+    """Tests that progress on a compressed file counts compressed bytes up to the file size."""
+    file_path, _ = large_history(tmp_path)
+    compressed_path = tmp_path / "large.csv.xz"
+    history = History()
+    history.load(file_path)
+    history.save(compressed_path)
+    calls = []
+    History().load(compressed_path, chunk_size=10, progress=lambda *args: calls.append(args))
+    assert [entries for entries, _, _ in calls] == [10, 20, 26]
+    assert all(total == compressed_path.stat().st_size for _, _, total in calls)
+
+def test_compressed_negative(tmp_path, monkeypatch):
+    """Tests compression on binary files, byte ranges of compressed files and missing zstd."""
+    history = History()
+    history.add("add 1.0 1.0 = 2.0")
+    with pytest.raises(ValueError, match="Compression only applies to CSV history files."):
+        history.save(tmp_path / "history.npy.gz")
+    history.save(tmp_path / "history.csv.gz")
+    with pytest.raises(ValueError, match="Byte ranges only apply to uncompressed CSV"):
+        History().load(tmp_path / "history.csv.gz", byte_range=(0, 10))
+    monkeypatch.setattr(formats, "_zstd", lambda: None)
+    assert not compression_available("zstd")
+    with pytest.raises(ValueError, match="zstd compression needs Python 3.14"):
+        history.save(tmp_path / "history.csv.zst")
+    assert not list(tmp_path.glob("*.tmp"))
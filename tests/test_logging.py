@@ -0,0 +1,86 @@
+"""
+This module contains test cases for the logging configuration in `app.logging`.
+It checks that the synchronous and queue-backed (asynchronous) modes both deliver
+every record to the log file, that the asynchronous mode does not write from the
+logging thread, and that the log level is configurable.
+"""
+
+import logging
+import os
+import threading
+import pytest
+from app import logging as app_logging
+from app.logging import configure_logging, logger, shutdown_logging
+
+def point_file_handler(path):
+    """Makes the calculator's file handler write to `path` from its next record."""
+    handler = app_logging.file_handler
+    handler.acquire()
+    try:
+        handler.flush_batch()
+        if handler.stream is not None:
+            handler.stream.close()
+            handler.stream = None
+        handler.baseFilename = os.path.abspath(path)
+    finally:
+        handler.release()
+
+@pytest.fixture(autouse=True)
+def restore_logging(tmp_path):
+    """
+    Sends records to a log file of the test's own, then restores the default
+    synchronous configuration and the shared log file after each test.
+    """
+    original = app_logging.file_handler.baseFilename
+    point_file_handler(tmp_path / "test.log")
+    yield
+    configure_logging(asynchronous=False, level="INFO")
+    point_file_handler(original)
+
+def read_log():
+    """Returns the contents of the log file the calculator is writing to."""
+    with open(app_logging.file_handler.baseFilename, encoding="utf-8") as log:
+        return log.read()
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_records_reach_log_file(asynchronous):
+    """Tests that every record is written to the log file in both modes."""
+    configure_logging(asynchronous=asynchronous, batch_size=3)
+    marker = f"logging-test-{asynchronous}"
+    for index in range(10):
+        logger.info("%s %d", marker, index)
+    shutdown_logging()
+
+    contents = read_log()
+    for index in range(10):
+        assert f"{marker} {index}" in contents
+
+def test_async_mode_writes_from_listener_thread():
+    """Tests that in async mode records are emitted by the background thread."""
+    configure_logging(asynchronous=True, batch_size=2)
+    threads = []
+
+    class RecordingHandler(logging.Handler):
+        """Remembers which thread emitted each record."""
+        def emit(self, record):
+            threads.append(threading.current_thread())
+
+    app_logging._listener.handlers += (RecordingHandler(),)
+    logger.warning("from the caller thread")
+    shutdown_logging()
+    assert threads and threading.current_thread() not in threads
+
+def test_log_level_is_configurable(monkeypatch):
+    """Tests that LOG_LEVEL controls which records are logged."""
+    monkeypatch.setenv("LOG_LEVEL", "warning")
+    configure_logging()
+    assert not logger.isEnabledFor(logging.INFO)
+    assert logger.isEnabledFor(logging.WARNING)
+
+@pytest.mark.parametrize("asynchronous", [False, True])
+def test_long_exact_numbers_are_logged(asynchronous):
+    """Tests that integers too long for decimal text are logged in hexadecimal."""
+    configure_logging(asynchronous=asynchronous)
+    logger.info("long-number %s", 2 ** 20000)
+    shutdown_logging()
+    assert f"long-number 0x1{'0' * 5000}\n" in read_log()
@@ -0,0 +1,100 @@
+"""
+Unit tests for the command-line entry point in `main.py`, covering the interactive
+default, the non-interactive batch mode reading from a file or stdin, that
+parallel batches only collect a history for --history, that batches keep the
+console free of anything but results, and that start-up does not import heavy
+dependencies.
+"""
+
+import io
+import os
+import subprocess
+import sys
+from unittest.mock import patch
+import pytest
+from app.history import History
+from app.parallel import run_parallel
+from main import main
+
+def test_main_starts_repl():
+    """Tests that running without arguments starts the calculator REPL."""
+    with patch("main.calculator") as calculator:
+        main([])
+    calculator.assert_called_once_with()
+
+def test_main_batch_file(tmp_path):
+    """Tests that --batch evaluates a job file and writes results to --output."""
+    job_file = tmp_path / "jobs.txt"
+    job_file.write_text("add 1 2\ndivide 1 0\n", encoding="utf-8")
+    result_file = tmp_path / "results.txt"
+    main(["--batch", str(job_file), "--output", str(result_file)])
+    assert result_file.read_text(encoding="utf-8").splitlines() == [
+        "add 1.0 2.0 = 3.0", "divide 1.0 0.0 = error: division by zero is not allowed."]
+
+def test_main_batch_stdin(capsys):
+    """Tests that --batch without a file reads from stdin and writes to stdout."""
+    with patch("sys.stdin", io.StringIO("subtract 5 3\n")):
+        main(["--batch"])
+    assert capsys.readouterr().out == "subtract 5.0 3.0 = 2.0\n"
+
+@pytest.mark.parametrize("extra_args", [[], ["--workers", "2", "--chunk-size", "2"]])
+def test_main_batch_history(extra_args, tmp_path):
+    """Tests that --history saves the batch's calculations, serially or in parallel."""
+    job_file = tmp_path / "jobs.txt"
+    job_file.write_text("add 1 2\ndivide 1 0\nmultiply 2 3\nsubtract 9 4\n", encoding="utf-8")
+    result_file = tmp_path / "results.txt"
+    history_file = tmp_path / "history.csv"
+    main(["--batch", str(job_file), "--output", str(result_file),
+          "--history", str(history_file)] + extra_args)
+
+    assert len(result_file.read_text(encoding="utf-8").splitlines()) == 4
+    history = History()
+    history.load(history_file)
+    assert history.get_history() == [
+        "add 1.0 2.0 = 3.0", "multiply 2.0 3.0 = 6.0", "subtract 9.0 4.0 = 5.0"]
+
+@pytest.mark.parametrize("history_flag", [False, True])
+def test_main_parallel_records_only_for_history(history_flag, tmp_path, monkeypatch):
+    """Tests that --workers only collects calculations when --history is given."""
+    monkeypatch.setenv("HISTORY_CAPACITY", "2")
+    job_file = tmp_path / "jobs.txt"
+    job_file.write_text("add 1 2\nmultiply 2 3\nsubtract 9 4\n", encoding="utf-8")
+    calls = []
+
+    def spy(*args, **kwargs):
+        calls.append(kwargs["record"])
+        return run_parallel(*args, **kwargs)
+
+    history_args = ["--history", str(tmp_path / "history.csv")] if history_flag else []
+    with patch("app.parallel.run_parallel", spy):
+        main(["--batch", str(job_file), "--output", str(tmp_path / "results.txt"),
+              "--workers", "1"] + history_args)
+    assert calls == [history_flag]
+    if history_flag:
+        history = History()
+        history.load(tmp_path / "history.csv")
+        assert len(history.get_history()) == 3
+
+@pytest.mark.parametrize("extra_args", [[], ["--workers", "2", "--chunk-size", "1"]])
+def test_main_batch_is_quiet(extra_args, tmp_path):
+    """Tests that a batch with --history writes only its results to the console."""
+    history_file = tmp_path / "history.csv"
+    completed = subprocess.run(
+        [sys.executable, "main.py", "--batch", "--history", str(history_file)] + extra_args,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        input="add 1 2\nmultiply 2 3\n", capture_output=True, text=True, check=True,
+        env={**os.environ, "LOG_FILE": str(tmp_path / "batch.log")},
+    )
+    assert completed.stdout == "add 1.0 2.0 = 3.0\nmultiply 2.0 3.0 = 6.0\n"
+    assert completed.stderr == ""
+    assert history_file.exists()
+
+def test_startup_defers_heavy_imports():
+    """Tests that importing the entry point does not import pandas or NumPy."""
+    completed = subprocess.run(
+        [sys.executable, "-c",
+         "import sys, main; print(sorted({'pandas', 'numpy'} & set(sys.modules)))"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        capture_output=True, text=True, check=True,
+    )
+    assert completed.stdout.strip() == "[]"
@@ -0,0 +1,139 @@
+"""
+This module contains test cases for the instrumentation in `app.metrics`.
+It checks counters and histogram buckets, the JSON and Prometheus exports,
+recording from several threads at once, the metrics recorded by the
+calculator's hot paths, the REPL's `stats` command, CALC_METRICS_FILE dumps and
+the CALC_PROFILE hook.
+"""
+
+import json
+import pstats
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+import pytest
+from app.calculator import calculator
+from app.history import History
+from app.metrics import Histogram, Metrics, dump_metrics, metrics
+from app.operations import evaluate_batch
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    """Starts every test with an empty process-wide registry."""
+    metrics.reset()
+    yield
+    metrics.reset()
+
+def counter(name, **labels):
+    """Returns a counter's value in the process-wide registry."""
+    return metrics.counters.get((name, tuple(sorted(labels.items()))), 0)
+
+def histogram(name, **labels):
+    """Returns a histogram from the process-wide registry, or None."""
+    return metrics.histograms.get((name, tuple(sorted(labels.items()))))
+
+@pytest.mark.parametrize("values, expected", [
+    ([], [(1.0, 0), (2.0, 0), (float("inf"), 0)]),
+    ([0.5, 1.0, 1.5, 3.0], [(1.0, 2), (2.0, 3), (float("inf"), 4)]),
+])
+def test_histogram_buckets(values, expected):
+    """Tests that histogram buckets are cumulative and inclusive of their bound."""
+    histogram_ = Histogram((1.0, 2.0))
+    for value in values:
+        histogram_.observe(value)
+    assert histogram_.cumulative() == expected
+    assert histogram_.count == len(values)
+    assert histogram_.sum == sum(values)
+
+def test_exports():
+    """Tests the JSON and Prometheus renderings of counters and histograms."""
+    registry = Metrics()
+    registry.increment("calls_total", operation="add")
+    registry.increment("calls_total", 2, operation="add")
+    registry.observe("latency_seconds", 0.002, operation="add")
+
+    data = json.loads(registry.export("json"))
+    assert data["counters"] == [{"name": "calls_total", "labels": {"operation": "add"}, "value": 3}]
+    assert data["histograms"][0]["count"] == 1
+    assert data["histograms"][0]["buckets"]["+Inf"] == 1
+
+    text = registry.export("prometheus")
+    assert "# TYPE calls_total counter\ncalls_total{operation=\"add\"} 3\n" in text
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{operation="add",le="0.005"} 1' in text
+    assert 'latency_seconds_bucket{operation="add",le="0.001"} 0' in text
+    assert 'latency_seconds_count{operation="add"} 1' in text
+
+    with pytest.raises(ValueError, match="Unsupported metrics format 'xml'"):
+        registry.export("xml")
+
+def test_concurrent_recording():
+    """Tests that no update is lost when several threads record at once."""
+    registry = Metrics()
+
+    def record(_worker):
+        for _ in range(2000):
+            registry.increment("calls_total", operation="add")
+            registry.observe("latency_seconds", 0.002, operation="add")
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(record, range(8)))
+    data = registry.to_dict()
+    assert data["counters"][0]["value"] == 16000
+    assert data["histograms"][0]["count"] == 16000
+
+def test_repl_records_operations(capsys):
+    """Tests that REPL calculations, failures and parsing are counted and timed."""
+    with patch("builtins.input", side_effect=["add 1 2", "add 3 4", "divide 1 0", "stats",
+                                              "stats prometheus", "exit"]):
+        calculator()
+    assert counter("calculator_operations_total", operation="add") == 2
+    assert counter("calculator_operations_total", operation="divide") == 1
+    assert counter("calculator_operation_errors_total", operation="divide") == 1
+    assert histogram("calculator_operation_seconds", operation="add").count == 2
+    assert histogram("calculator_parse_seconds").count == 3
+
+    out = capsys.readouterr().out
+    assert '"name": "calculator_operations_total"' in out
+    assert 'calculator_operations_total{operation="add"} 2' in out
+
+def test_history_and_batch_timings(tmp_path):
+    """Tests that history save/load and batch evaluation record timings."""
+    history = History()
+    history.record("add", (1.0, 2.0), 3.0)
+    for name in ("history.csv", "history.npy"):
+        history.save(str(tmp_path / name))
+        History().load(str(tmp_path / name))
+    for file_format in ("csv", "npy"):
+        assert histogram("calculator_history_save_seconds", format=file_format).count == 1
+        assert histogram("calculator_history_load_seconds", format=file_format).count == 1
+
+    evaluate_batch("divide", [1.0, 2.0, 3.0], [1.0, 0.0, 3.0])
+    assert counter("calculator_batch_elements_total", operation="divide") == 3
+    assert histogram("calculator_batch_seconds", operation="divide").count == 1
+
+@pytest.mark.parametrize("file_name, env_format, marker", [
+    ("metrics.json", "", '"counters"'),
+    ("metrics.prom", "", "# TYPE"),
+    ("metrics.txt", "prometheus", "# TYPE"),
+])
+def test_dump_metrics(tmp_path, monkeypatch, file_name, env_format, marker):
+    """Tests that CALC_METRICS_FILE picks its format from the env var or the extension."""
+    path = tmp_path / file_name
+    monkeypatch.setenv("CALC_METRICS_FILE", str(path))
+    monkeypatch.setenv("CALC_METRICS_FORMAT", env_format)
+    metrics.increment("calls_total")
+    dump_metrics()
+    assert marker in path.read_text(encoding="utf-8")
+
+def test_session_metrics_and_profile(tmp_path, monkeypatch):
+    """Tests that a REPL session writes its metrics and cProfile stats on exit."""
+    metrics_path, profile_path = tmp_path / "metrics.json", tmp_path / "session.prof"
+    monkeypatch.setenv("CALC_METRICS_FILE", str(metrics_path))
+    monkeypatch.setenv("CALC_PROFILE", str(profile_path))
+    with patch("builtins.input", side_effect=["multiply 2 3", "exit"]):
+        calculator()
+    data = json.loads(metrics_path.read_text(encoding="utf-8"))
+    assert {"name": "calculator_operations_total", "labels": {"operation": "multiply"},
+            "value": 1} in data["counters"]
+    functions = {name for _, _, name in pstats.Stats(str(profile_path)).stats}
+    assert "multiplication" in functions
@@ -0,0 +1,99 @@
+"""
+This module contains test cases for the numeric backends in `app.numeric`.
+It checks operand parsing per mode, exact integer and fraction arithmetic,
+decimal precision, the text form of very long exact results, and that overflow
+and undefined results surface as ValueError.
+"""
+
+from decimal import Decimal
+from fractions import Fraction
+import pytest
+# Registers the built-in operations that get_operation looks up
+import app.operations  # pylint: disable=unused-import
+from app.numeric import DecimalBackend, create_backend, format_number
+from app.registry import get_operation
+
+@pytest.mark.parametrize("mode, text, expected", [
+    ("float", "2.5", 2.5),
+    ("int", "12", 12),
+    ("decimal", "0.1", Decimal("0.1")),
+    ("fraction", "1/3", Fraction(1, 3)),
+])
+def test_parse(mode, text, expected):
+    """Tests that each backend parses operands into its own number type."""
+    value = create_backend(mode).parse(text)
+    assert value == expected
+    assert type(value) is type(expected) or mode == "int"
+
+@pytest.mark.parametrize("mode, text", [
+    ("float", "abc"),
+    ("int", "1.5"),
+    ("decimal", "1/3"),
+    ("fraction", "x"),
+])
+def test_parse_invalid(mode, text):
+    """Tests that operands a backend cannot represent raise ValueError."""
+    with pytest.raises(ValueError):
+        create_backend(mode).parse(text)
+
+@pytest.mark.parametrize("mode, name, operands, expected", [
+    ("int", "exponent", ("2", "200"), 2 ** 200),
+    ("int", "divide", ("10", "4"), Fraction(5, 2)),
+    ("int", "divide", ("10", "5"), 2),
+    ("fraction", "add", ("1/3", "1/6"), Fraction(1, 2)),
+    ("decimal", "add", ("0.1", "0.2"), Decimal("0.3")),
+    ("int", "powmod", ("3", "1000000000000", "1000000007"), pow(3, 10 ** 12, 10 ** 9 + 7)),
+])
+def test_evaluate(mode, name, operands, expected):
+    """Tests exact results for the arbitrary-precision backends."""
+    backend = create_backend(mode)
+    result = backend.evaluate(get_operation(name), tuple(map(backend.parse, operands)))
+    assert result == expected
+
+def test_int_results_are_integers():
+    """Tests that whole-number results in int mode are displayed without a denominator."""
+    backend = create_backend("int")
+    operands = (backend.parse("6"), backend.parse("7"))
+    assert str(backend.evaluate(get_operation("multiply"), operands)) == "42"
+
+@pytest.mark.parametrize("value, expected", [
+    (2 ** 70, str(2 ** 70)),
+    (Fraction(1, 3), "1/3"),
+    (2 ** 20000, "0x1" + "0" * 5000),
+    (-(2 ** 20000), "-0x1" + "0" * 5000),
+    (Fraction(2 ** 20000, 3), "0x1" + "0" * 5000 + "/0x3"),
+    (Fraction(3 ** 10000), format(3 ** 10000, "#x")),
+], ids=["int", "fraction", "long-int", "negative-long-int", "long-fraction",
+        "long-whole-fraction"])
+def test_format_number(value, expected):
+    """Tests that exact results too long for decimal text are shown in hexadecimal."""
+    assert format_number(value) == expected
+
+def test_decimal_precision():
+    """Tests that the decimal backend rounds to the configured significant digits."""
+    backend = DecimalBackend(precision=5)
+    one, seven = backend.parse("1"), backend.parse("7")
+    assert backend.evaluate(get_operation("divide"), (one, seven)) == Decimal("0.14286")
+    assert str(backend) == "decimal (precision 5)"
+
+@pytest.mark.parametrize("mode, name, operands, message", [
+    ("float", "exponent", ("10", "400"), "result is too large to represent."),
+    ("decimal", "exponent", ("10", "1e999999999"), "result is too large to represent."),
+    ("float", "exponent", ("0", "-1"), "exponent is undefined for these operands."),
+    ("int", "divide", ("1", "0"), "division by zero is not allowed."),
+])
+def test_evaluate_errors(mode, name, operands, message):
+    """Tests that arithmetic failures are reported as ValueError with a readable message."""
+    backend = create_backend(mode)
+    with pytest.raises(ValueError, match=message):
+        backend.evaluate(get_operation(name), tuple(map(backend.parse, operands)))
+
+@pytest.mark.parametrize("name, precision, message", [
+    ("complex", None, "Unknown numeric mode 'complex'"),
+    ("int", 10, "Precision only applies to the decimal mode, not 'int'."),
+    ("decimal", 0, "Precision must be at least 1."),
+])
+def test_create_backend_invalid(name, precision, message):
+    """Tests that unknown modes and misplaced precisions are rejected."""
+    with pytest.raises(ValueError, match=message):
+        create_backend(name, precision)
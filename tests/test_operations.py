@@ -9,12 +9,20 @@ valid inputs, including positive numbers, negative numbers, and mixed-sign numbe
 The negative tests ensure that each function handles invalid inputs gracefully, such as
 incorrect data types for addition and division by zero for the division function.
 
+The quiet-mode tests check that `configure_operations` swaps in logging-free
+implementations that give the same results and still log errors.
+
 Each test case uses `pytest.mark.parametrize` for parameterized testing, and `pytest.raises`
 to check for expected exceptions in the negative tests.
 """
 
+import logging
+import numpy as np
 import pytest
-from app.operations import addition, subtraction, multiplication, division, modulus, exponent
+from app.logging import logger
+from app.operations import (addition, subtraction, multiplication, division, modulus, exponent,
+                            modular_exponent, evaluate_batch, configure_operations)
+from app.registry import get_operation, register_operation, unregister_operation
 
 # Positive test cases for arithmetic functions
 
@@ -50,6 +58,28 @@ def test_modulus_by_zero(a, b):
     with pytest.raises(ValueError, match="modulus by zero is not allowed."):
         modulus(a, b)
 
+# Test cases for modular exponentiation
+@pytest.mark.parametrize("a, b, m, expected", [
+    (4, 13, 497, 445),                    # Small integers
+    (2.0, 10.0, 1000.0, 24),              # Whole-number floats
+    (7, 10 ** 18, 13, pow(7, 10 ** 18, 13)),  # Exponent far beyond the float range
+    (3, -1, 7, 5),                        # Negative exponent: modular inverse
+])
+def test_modular_exponent(a, b, m, expected):
+    """Tests that modular_exponent matches Python's three-argument pow."""
+    assert modular_exponent(a, b, m) == expected
+
+@pytest.mark.parametrize("a, b, m, message", [
+    (2, 3, 0, "modulus by zero is not allowed."),
+    (2.5, 3, 7, "powmod requires a whole-number base."),
+    (2, 3, float("inf"), "powmod requires a whole-number modulus."),
+    (3, 1e23, 7, "powmod exponent 1e\\+23 is too large to be exact as a float."),
+])
+def test_modular_exponent_invalid(a, b, m, message):
+    """Tests that modular_exponent rejects a zero modulus and non-integer operands."""
+    with pytest.raises(ValueError, match=message):
+        modular_exponent(a, b, m)
+
 # Positive test cases for the addition function
 @pytest.mark.parametrize("a, b, expected", [
     (1, 2, 3),         # Testing addition with positive integers
@@ -120,3 +150,105 @@ def test_division_by_zero(a, b):
     """
     with pytest.raises(ValueError, match="division by zero is not allowed."):
         division(a, b)
+
+# Batch evaluation tests
+@pytest.mark.parametrize("op, func", [
+    ("add", addition),
+    ("subtract", subtraction),
+    ("multiply", multiplication),
+    ("divide", division),
+    ("modulus", modulus),
+    ("exponent", exponent),
+])
+def test_evaluate_batch_matches_scalar(op, func):
+    """Tests that batch evaluation agrees with the scalar function element-wise."""
+    a = [10.0, -7.5, 2.0, 3.0]
+    b = [3.0, 2.0, -1.0, 0.5]
+    results, errors = evaluate_batch(op, a, b)
+    assert not errors.any()
+    assert results.tolist() == pytest.approx([func(x, y) for x, y in zip(a, b)])
+
+@pytest.mark.parametrize("op", ["divide", "modulus"])
+def test_evaluate_batch_zero_divisor(op):
+    """Tests that zero divisors are flagged per element instead of raising."""
+    results, errors = evaluate_batch(op, np.array([1.0, 4.0, 0.0]), np.array([0.0, 2.0, 0]))
+    assert errors.tolist() == [True, False, True]
+    assert np.isnan(results[errors]).all()
+    assert results[1] == (2.0 if op == "divide" else 0.0)
+
+def test_evaluate_batch_overflow():
+    """Tests that results made non-finite by the operation itself are flagged."""
+    results, errors = evaluate_batch("exponent", [10.0, 2.0, np.inf, -8.0],
+                                     [400.0, 3.0, 2.0, 0.5])
+    assert errors.tolist() == [True, False, False, True]
+    assert results[0] == np.inf and np.isnan(results[3])
+    assert results[1:3].tolist() == [8.0, np.inf]
+
+def test_evaluate_batch_broadcast_and_unknown():
+    """Tests scalar broadcasting and rejection of unknown operations."""
+    results, _ = evaluate_batch("add", [1, 2, 3], 1)
+    assert results.tolist() == [2.0, 3.0, 4.0]
+    with pytest.raises(ValueError, match="Unknown operation 'root'."):
+        evaluate_batch("root", [1], [1])
+
+def test_evaluate_batch_with_non_ufunc_vector():
+    """Tests that a vector form that is not a NumPy ufunc can be batch evaluated."""
+    register_operation("ratio", lambda a, b: a / b, zero_guard="ratio",
+                       vector=lambda a, b: np.hypot(a, b) / b)
+    try:
+        results, errors = evaluate_batch("ratio", [3.0, 1.0], [4.0, 0.0])
+    finally:
+        unregister_operation("ratio")
+    assert errors.tolist() == [False, True]
+    assert results[0] == 1.25 and np.isnan(results[1])
+
+# Quiet (logging-free) mode tests
+@pytest.fixture
+def quiet_operations():
+    """Installs the logging-free operations, restoring the default afterwards."""
+    assert configure_operations(quiet=True)
+    yield
+    configure_operations()
+
+@pytest.mark.parametrize("name, operands, func", [
+    ("add", (2.5, 4.0), addition),
+    ("subtract", (2.5, 4.0), subtraction),
+    ("multiply", (2.5, 4.0), multiplication),
+    ("divide", (7.0, 2.0), division),
+    ("modulus", (-7.0, 3.0), modulus),
+    ("exponent", (2.0, 10.0), exponent),
+    ("powmod", (4.0, 13.0, 497.0), modular_exponent),
+])
+def test_quiet_operations_match_logged(name, operands, func, quiet_operations, caplog):
+    """Tests that the logging-free variants give the same results without logging."""
+    operation = get_operation(name)
+    assert operation.func is not func
+    with caplog.at_level(logging.INFO, logger=logger.name):
+        assert operation(*operands) == func(*operands)
+    assert len(caplog.records) == 1  # Only the logged call
+
+@pytest.mark.parametrize("name, operands, message", [
+    ("divide", (1.0, 0.0), "Attempted division by zero"),
+    ("modulus", (1.0, 0.0), "Attempted modulus by zero"),
+    ("powmod", (2.0, 3.0, 0.0), "Attempted modular exponentiation with modulus zero"),
+])
+def test_quiet_operations_log_errors(name, operands, message, quiet_operations, caplog):
+    """Tests that errors are still logged in quiet mode."""
+    with pytest.raises(ValueError, match="by zero is not allowed."):
+        get_operation(name)(*operands)
+    assert message in caplog.text
+
+def test_configure_operations_follows_log_level():
+    """Tests that the logged or quiet variant is picked from the logger's level."""
+    root = logging.getLogger()
+    level = root.level
+    try:
+        root.setLevel(logging.WARNING)
+        assert configure_operations()
+        assert get_operation("add").func is not addition
+        root.setLevel(logging.INFO)
+        assert not configure_operations()
+        assert get_operation("add").func is addition
+    finally:
+        root.setLevel(level)
+        configure_operations()
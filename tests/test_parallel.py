@@ -0,0 +1,46 @@
+"""
+This module contains test cases for the process-pool evaluator in `app.parallel`.
+It checks that results come back in input order across shards and workers, that
+errors are reported per line, that successful calculations are collected
+into a single History, and that nothing is collected when no History is wanted.
+"""
+
+import io
+import pytest
+from app.history import History
+from app.parallel import evaluate_shard, run_parallel
+
+def test_evaluate_shard():
+    """Tests that a shard returns output lines and records for successful lines."""
+    outputs, records = evaluate_shard(["add 1 2\n", "# comment\n", "divide 1 0\n", "add x\n"])
+    assert outputs == ["add 1.0 2.0 = 3.0",
+                       "divide 1.0 0.0 = error: division by zero is not allowed.",
+                       "error: invalid input format: add x"]
+    assert records == [("add", (1.0, 2.0), 3.0)]
+
+@pytest.mark.parametrize("workers, chunk_size", [(1, 1000), (2, 3), (3, 1)])
+def test_run_parallel_preserves_order(workers, chunk_size):
+    """Tests that output and history keep input order for any sharding."""
+    lines = [f"add {index} 1\n" for index in range(50)] + ["modulus 5 0\n"]
+    output = io.StringIO()
+    history = run_parallel(lines, output, workers=workers, chunk_size=chunk_size)
+
+    expected = [f"add {float(index)} 1.0 = {index + 1.0}" for index in range(50)]
+    assert output.getvalue().splitlines() == expected + [
+        "modulus 5.0 0.0 = error: modulus by zero is not allowed."]
+    assert history.get_history() == expected
+
+def test_run_parallel_into_existing_history():
+    """Tests that results are appended to a given History without an output file."""
+    history = History()
+    history.add("existing")
+    assert run_parallel(["\n", "multiply 2 3\n"], workers=1, history=history) is history
+    assert history.get_history() == ["existing", "multiply 2.0 3.0 = 6.0"]
+
+def test_run_parallel_without_history():
+    """Tests that workers send back no records and nothing is kept when recording is off."""
+    assert evaluate_shard(["add 1 2\n"], record=False) == (["add 1.0 2.0 = 3.0"], [])
+    output = io.StringIO()
+    assert run_parallel(["add 1 2\n", "add 3 4\n"], output, workers=2, chunk_size=1,
+                        record=False) is None
+    assert output.getvalue().splitlines() == ["add 1.0 2.0 = 3.0", "add 3.0 4.0 = 7.0"]
@@ -0,0 +1,75 @@
+"""
+This module contains test cases for the operation registry in `app.registry`.
+It checks that the built-in operations are registered with their metadata, that
+aliases resolve to canonical operations, and that third-party operations become
+available to the calculator REPL and batch mode without changes to `calculator()`.
+"""
+
+import io
+from unittest.mock import patch
+import pytest
+from app.calculator import calculator, run_batch
+from app.operations import division
+from app.registry import get_operation, operation_names, register_operation, unregister_operation
+
+@pytest.fixture
+def negate():
+    """Registers a one-operand operation for the duration of a test."""
+    operation = register_operation("negate", lambda a: -a, arity=1, symbol="neg",
+                                   aliases=("neg",))
+    yield operation
+    unregister_operation("negate")
+
+@pytest.mark.parametrize("name, canonical, symbol, zero_guard", [
+    ("add", "add", "+", None),
+    ("/", "divide", "/", "division"),
+    ("mod", "modulus", "%", "modulus"),
+    ("**", "exponent", "^", None),
+])
+def test_builtin_operations(name, canonical, symbol, zero_guard):
+    """Tests that built-in operations and their aliases resolve with metadata."""
+    operation = get_operation(name)
+    assert operation.name == canonical
+    assert operation.symbol == symbol
+    assert operation.zero_guard == zero_guard
+    assert operation.arity == 2
+    assert operation.vector is not None
+
+def test_builtin_registry_contents():
+    """Tests that the calculator's six operations are registered in order."""
+    assert operation_names()[:6] == ["add", "subtract", "multiply", "divide", "modulus",
+                                     "exponent"]
+    assert get_operation("divide").func is division
+    assert get_operation("unknown") is None
+
+def test_format_and_zero_error():
+    """Tests history formatting and the zero-divisor error message."""
+    operation = get_operation("divide")
+    assert operation.format((6.0, 3.0), 2.0) == "divide 6.0 3.0 = 2.0"
+    assert operation.zero_error == "division by zero is not allowed."
+    assert repr(operation) == "Operation('divide', arity=2)"
+
+def test_register_third_party_operation(negate, capsys):
+    """Tests that a registered operation works in the REPL with its arity."""
+    assert get_operation("neg") is negate
+    with patch("builtins.input", side_effect=["neg 4", "negate 1 2", "history", "exit"]):
+        calculator()
+    captured = capsys.readouterr()
+    assert "Result: -4.0" in captured.out
+    assert "negate 4.0 = -4.0" in captured.out
+    assert "Invalid input. Please follow the format" in captured.out
+
+def test_third_party_operation_in_batch(negate):
+    """Tests that batch mode evaluates operations without a vectorized form."""
+    output = io.StringIO()
+    run_batch(io.StringIO("negate 2\nadd 1 1\n"), output)
+    assert output.getvalue().splitlines() == ["negate 2.0 = -2.0", "add 1.0 1.0 = 2.0"]
+
+def test_register_replaces_and_rejects_alias_clash(negate):
+    """Tests re-registration and alias conflicts."""
+    replaced = register_operation("negate", lambda a: 0 - a, arity=1)
+    assert get_operation("negate") is replaced
+    assert get_operation("neg") is None
+    with pytest.raises(ValueError, match="Alias '\\+' is already registered for 'add'."):
+        register_operation("plus", lambda a, b: a + b, aliases=("+",))
+    unregister_operation("does-not-exist")
@@ -0,0 +1,147 @@
+"""
+This module contains test cases for the asyncio calculator server in `app.server`.
+It checks request handling per session, JSON responses, pipelined requests over
+real connections, isolation between concurrent sessions, that a slow request
+does not hold up other clients, that failing requests get an error without
+closing the connection, and rejection of overlong request lines.
+"""
+
+import asyncio
+import json
+import threading
+from unittest.mock import patch
+import pytest
+from app import server as server_module
+from app.calculator import Session
+from app.server import MAX_LINE_BYTES, CalculatorServer, handle_request
+
+@pytest.mark.parametrize("lines, expected", [
+    (["add 1 2"], {"ok": True, "result": 3.0}),
+    (["divide 1 0"], {"ok": False, "error": "division by zero is not allowed."}),
+    (["add x y"], {"ok": False,
+                   "error": "Invalid input. Please follow the format: <operation> <num1> <num2>"}),
+    (["add 1 2", "multiply 2 3", "undo", "history"],
+     {"ok": True, "history": ["add 1.0 2.0 = 3.0"]}),
+    (["add 1 2", "multiply 2 3", "undo", "redo", "history"],
+     {"ok": True, "history": ["add 1.0 2.0 = 3.0", "multiply 2.0 3.0 = 6.0"]}),
+    (["redo"], {"ok": True, "redone": 0}),
+    (["add 1 2", "clear", "history"], {"ok": True, "history": []}),
+    (["eval (1 + 2) * 3"], {"ok": True, "result": 9.0}),
+    (["eval 1 + 2 * 3", "history"],
+     {"ok": True, "history": ["multiply 2.0 3.0 = 6.0", "add 1.0 6.0 = 7.0"]}),
+    (["eval 10 ^ 400"], {"ok": False, "error": "result is too large to represent."}),
+    (["eval 0 ^ -1"], {"ok": False, "error": "exponent is undefined for these operands."}),
+    (["multiply 1e308 10"], {"ok": True, "result": "inf"}),
+    (["subtract inf inf"], {"ok": True, "result": "nan"}),
+    (["mode int", "exponent 2 70"], {"ok": True, "result": 2 ** 70}),
+    (["mode fraction", "divide 1 3"], {"ok": True, "result": "1/3"}),
+    (["mode fraction", "eval 1 / 3 + 1 / 6"], {"ok": True, "result": "1/2"}),
+    (["mode int", "exponent 2 20000"], {"ok": True, "result": "0x1" + "0" * 5000}),
+    (["mode fraction", "exponent 2 20000", "history"],
+     {"ok": True, "history": ["exponent 2 20000 = 0x1" + "0" * 5000]}),
+    (["mode decimal 5"], {"ok": True, "mode": "decimal (precision 5)"}),
+    (["mode complex"], {"ok": False, "error": "Unknown numeric mode 'complex'. "
+                                              "Supported modes: float, int, decimal, fraction."}),
+])
+def test_handle_request(lines, expected):
+    """Tests the response to the last of a sequence of requests in one session."""
+    session = Session()
+    for line in lines:
+        response = handle_request(session, line)
+    assert response == expected
+
+async def exchange(port, lines):
+    """Sends all lines at once (pipelined) and reads one response per line."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write("".join(f"{line}\n" for line in lines).encode())
+    await writer.drain()
+    responses = [json.loads(await reader.readline()) for _ in lines]
+    writer.close()
+    await writer.wait_closed()
+    return responses
+
+def test_pipelined_concurrent_sessions():
+    """Tests that many clients pipeline requests and each keeps its own history."""
+    async def scenario():
+        server = CalculatorServer(port=0)
+        await server.start()
+        try:
+            return await asyncio.gather(*(
+                exchange(server.port, [f"add {client} {index}" for index in range(20)]
+                         + ["history"])
+                for client in range(50)))
+        finally:
+            await server.close()
+
+    for client, responses in enumerate(asyncio.run(scenario())):
+        assert [response["result"] for response in responses[:-1]] == [
+            float(client + index) for index in range(20)]
+        assert responses[-1]["history"] == [
+            f"add {float(client)} {float(index)} = {float(client + index)}" for index in range(20)]
+
+def test_slow_request_does_not_block_other_clients():
+    """Tests that a request blocked in its handler leaves the event loop serving others."""
+    released = threading.Event()
+
+    def slow_history(_session):
+        return {"ok": True, "released": released.wait(timeout=5)}
+
+    def release(_session):
+        released.set()
+        return {"ok": True}
+
+    async def scenario():
+        server = CalculatorServer(port=0)
+        await server.start()
+        try:
+            slow = asyncio.create_task(exchange(server.port, ["history"]))
+            await asyncio.sleep(0.05)
+            await exchange(server.port, ["clear"])
+            return await slow
+        finally:
+            await server.close()
+
+    with patch.dict(server_module.COMMANDS, {"history": slow_history, "clear": release}):
+        assert asyncio.run(scenario()) == [{"ok": True, "released": True}]
+
+def test_failed_request_keeps_connection():
+    """Tests that an unexpected failure gets an error response and later requests are served."""
+    async def scenario():
+        server = CalculatorServer(port=0)
+        await server.start()
+        try:
+            return await exchange(server.port, ["history", "add 1 2", "eval 10 ^ 400"])
+        finally:
+            await server.close()
+
+    def failing_history(_session):
+        raise RuntimeError("history unavailable")
+
+    with patch.dict(server_module.COMMANDS, {"history": failing_history}):
+        responses = asyncio.run(scenario())
+    for response in responses:
+        json.dumps(response, allow_nan=False)
+    assert responses == [
+        {"ok": False, "error": "Request failed: history unavailable"},
+        {"ok": True, "result": 3.0},
+        {"ok": False, "error": "result is too large to represent."}]
+
+def test_overlong_line_is_rejected():
+    """Tests that a request line over MAX_LINE_BYTES gets an error and the connection closes."""
+    async def scenario():
+        server = CalculatorServer(port=0)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(b"add " + b"1" * MAX_LINE_BYTES + b" 2\n")
+            await writer.drain()
+            response = json.loads(await reader.readline())
+            closed = await reader.read() == b""
+            writer.close()
+            return response, closed
+        finally:
+            await server.close()
+
+    response, closed = asyncio.run(scenario())
+    assert response == {"ok": False, "error": "Request line too long."}
+    assert closed
@@ -0,0 +1,210 @@
+"""
+This module contains test cases for session snapshots in `app.history.snapshot`
+and `app.calculator.Session`. It checks that a snapshot restores every entry,
+the time-order flag and working queries, that records are memory-mapped
+rather than read, that the numeric mode and cache counters come back, that
+CALC_SNAPSHOT restores on start and saves on exit, and that files which are not
+snapshots are rejected.
+"""
+
+from unittest.mock import patch
+import numpy as np
+import pytest
+from app.cache import OperationCache
+from app.calculator import Session, calculator
+from app.history import History
+from app.history.snapshot import SNAPSHOT_ALIGNMENT, SNAPSHOT_MAGIC, read_snapshot
+from app.history.threadsafe import ThreadSafeHistory
+from app.numeric import create_backend
+from app.registry import get_operation
+
+def sample_history(capacity=None, ordered=True):
+    """Returns a history with calculations and text entries, optionally spilled."""
+    history = History(capacity=capacity)
+    for value in range(20):
+        history.record("add" if value % 2 else "divide", (float(value), 4.0),
+                       value + 4.0 if value % 2 else value / 4.0, timestamp=float(value))
+    history.add("note", timestamp=20.0)
+    if not ordered:
+        history.add("late", timestamp=-1.0)
+    return history
+
+@pytest.mark.parametrize("capacity", [None, 8])
+@pytest.mark.parametrize("ordered", [True, False])
+def test_snapshot_round_trip(capacity, ordered, tmp_path):
+    """Tests that every entry, the time order and queries survive a snapshot."""
+    file_path = tmp_path / "session.snapshot"
+    history = sample_history(capacity, ordered)
+    history.write_snapshot(file_path, {"key": "value"})
+    history.close()
+
+    restored = History()
+    assert restored.load_snapshot(file_path) == {"key": "value"}
+    assert restored.get_history() == sample_history(ordered=ordered).get_history()
+    assert restored.records.time_ordered is ordered
+    assert restored.query(operation="add", since=10.0, limit=2) == [
+        "add 11.0 4.0 = 15.0", "add 13.0 4.0 = 17.0"]
+    restored.record("add", (1.0, 1.0), 2.0, timestamp=30.0)
+    restored.undo_last()
+    restored.undo_last()
+    assert len(restored) == 20 + (0 if ordered else 1)
+
+def test_snapshot_is_memory_mapped(tmp_path):
+    """Tests that restoring maps the records in place instead of reading them."""
+    file_path = tmp_path / "session.snapshot"
+    sample_history().write_snapshot(file_path)
+    with open(file_path, "rb") as snapshot:
+        assert snapshot.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+
+    records, names, text, text_file, time_ordered, state, journal = read_snapshot(file_path)
+    assert isinstance(records, np.memmap) and not records.flags.writeable
+    assert records.offset % SNAPSHOT_ALIGNMENT == 0
+    assert len(records) == 21 and names == ["divide", "add"]
+    assert text == {} and time_ordered and state == {} and journal is None
+    # Text entries are not in the header: the text row points into the file
+    with text_file:
+        text_file.seek(int(records["num1"][20]))
+        assert text_file.readline() == b'"note"\n'
+
+def test_restored_text_survives_spilling(tmp_path):
+    """Tests that text read lazily from a snapshot is kept when the history spills."""
+    file_path = tmp_path / "session.snapshot"
+    sample_history().write_snapshot(file_path)
+    history = History(capacity=8)
+    history.load_snapshot(file_path)
+    assert history.records.text == {}
+    history.add("after", timestamp=21.0)
+    for value in range(10):
+        history.record("add", (float(value), 2.0), value + 2.0, timestamp=22.0 + value)
+    assert history.records._spilled  # pylint: disable=protected-access
+    entries = history.history
+    assert len(entries) == 32 and entries[20] == "note" and entries[21] == "after"
+    history.records.close()
+
+def test_empty_snapshot(tmp_path):
+    """Tests that an empty history round-trips."""
+    file_path = tmp_path / "empty.snapshot"
+    History().write_snapshot(file_path)
+    restored = sample_history()
+    restored.load_snapshot(file_path)
+    assert not restored.get_history()
+
+def test_threadsafe_snapshot(tmp_path):
+    """Tests that a ThreadSafeHistory writes and restores snapshots."""
+    file_path = tmp_path / "session.snapshot"
+    history = ThreadSafeHistory()
+    history.record("add", (1.0, 2.0), 3.0)
+    history.write_snapshot(file_path)
+    restored = ThreadSafeHistory()
+    restored.load_snapshot(file_path)
+    assert restored.get_history() == ["add 1.0 2.0 = 3.0"]
+
+def test_session_state_round_trip(tmp_path):
+    """Tests that the numeric mode and cache counters are restored."""
+    file_path = str(tmp_path / "session.snapshot")
+    session = Session(cache=OperationCache(8), numeric=create_backend("decimal", 50))
+    add = get_operation("add")
+    session.history.record("add", (2.0, 3.0), session.evaluate(add, (2.0, 3.0)))
+    session.evaluate(add, (2.0, 3.0))
+    assert session.save_snapshot(file_path) == file_path
+
+    restored = Session(cache=OperationCache(8))
+    restored.restore_snapshot(file_path)
+    assert str(restored.numeric) == "decimal (precision 50)"
+    # The history holds float results, so an exact-mode cache is not warmed from it
+    assert restored.cache.stats() == {"size": 0, "maxsize": 8, "hits": 1, "misses": 1,
+                                      "evictions": 0}
+    assert restored.history.get_history() == ["add 2.0 3.0 = 5.0"]
+
+def test_snapshot_environment(tmp_path, monkeypatch):
+    """Tests that CALC_SNAPSHOT restores a session on start and saves it on close."""
+    file_path = tmp_path / "worker.snapshot"
+    monkeypatch.setenv("CALC_SNAPSHOT", str(file_path))
+    session = Session.from_env()
+    assert not session.history.get_history()
+    session.set_numeric(create_backend("fraction"))
+    session.history.record("add", (1.0, 2.0), 3.0)
+    session.close()
+
+    resumed = Session.from_env()
+    assert resumed.history.get_history() == ["add 1.0 2.0 = 3.0"]
+    assert str(resumed.numeric) == "fraction"
+    resumed.close()
+
+def test_snapshot_keeps_later_journal_records(tmp_path, monkeypatch):
+    """Tests that entries journaled after the last snapshot survive a crash."""
+    journal_path = tmp_path / "worker.journal"
+    monkeypatch.setenv("CALC_SNAPSHOT", str(tmp_path / "worker.snapshot"))
+    monkeypatch.setenv("HISTORY_JOURNAL", str(journal_path))
+    session = Session.from_env()
+    session.history.record("add", (1.0, 2.0), 3.0)
+    session.close()
+
+    crashed = Session.from_env()
+    crashed.history.record("multiply", (2.0, 3.0), 6.0)
+    crashed.history.flush()
+
+    resumed = Session.from_env()
+    expected = ["add 1.0 2.0 = 3.0", "multiply 2.0 3.0 = 6.0"]
+    assert resumed.history.get_history() == expected
+    resumed.history.undo_last()
+    resumed.close()
+    assert History(journal_path=str(journal_path)).get_history() == expected[:1]
+    crashed.history.close()
+
+def test_resume_replays_rewritten_journal(tmp_path):
+    """Tests that a journal rewritten after the snapshot is replayed in full."""
+    file_path = tmp_path / "session.snapshot"
+    journal_path = str(tmp_path / "history.journal")
+    history = History(journal_path=journal_path)
+    history.record("add", (1.0, 2.0), 3.0)
+    history.write_snapshot(file_path, {"key": "value"})
+    history.record("add", (2.0, 2.0), 4.0)
+    history.compact_journal()
+    history.close()
+
+    restored = History()
+    assert restored.resume(file_path, journal_path) == {"key": "value"}
+    assert restored.get_history() == ["add 1.0 2.0 = 3.0", "add 2.0 2.0 = 4.0"]
+    restored.close()
+
+def test_resume_creates_missing_journal(tmp_path):
+    """Tests that resuming without a journal writes one with the snapshot's entries."""
+    file_path = tmp_path / "session.snapshot"
+    journal_path = str(tmp_path / "history.journal")
+    sample_history().write_snapshot(file_path)
+    restored = History()
+    restored.resume(file_path, journal_path)
+    restored.record("add", (1.0, 1.0), 2.0)
+    restored.close()
+    assert History(journal_path=journal_path).get_history() == restored.get_history()
+    assert len(restored) == 22
+
+@pytest.mark.parametrize("contents, expected_exception, message", [
+    (None, FileNotFoundError, None),
+    (b"Operation\nadd 1.0 2.0 = 3.0\n", ValueError, "is not a calculator snapshot"),
+    (b"CALC", ValueError, "is not a calculator snapshot"),
+    (SNAPSHOT_MAGIC + (15).to_bytes(8, "little") + b'{"version": 99}',
+     ValueError, "Unsupported snapshot version 99"),
+])
+def test_snapshot_negative(contents, expected_exception, message, tmp_path):
+    """Tests that missing files and files that are not snapshots are rejected."""
+    file_path = tmp_path / "bad.snapshot"
+    if contents is not None:
+        file_path.write_bytes(contents)
+    with pytest.raises(expected_exception, match=message):
+        History().load_snapshot(file_path)
+
+def test_repl_snapshot_and_restore(tmp_path, monkeypatch, capsys):
+    """Tests the REPL's snapshot and restore commands."""
+    file_path = tmp_path / "repl.snapshot"
+    monkeypatch.setenv("CALC_SNAPSHOT", str(file_path))
+    with patch("builtins.input", side_effect=["restore", "mode int", "add 2 3", "snapshot",
+                                              "clear", "mode float", "restore", "history",
+                                              "exit"]):
+        calculator()
+    output = capsys.readouterr().out
+    assert f"No snapshot found at {file_path}" in output
+    assert f"Session snapshot saved to {file_path}." in output
+    assert f"Session restored from {file_path}: 1 entries, numeric mode int." in output
+    assert "Calculation History:\nadd 2 3 = 5" in output
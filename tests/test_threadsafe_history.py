@@ -0,0 +1,214 @@
+"""
+This module contains stress tests for `app.history.threadsafe.ThreadSafeHistory`.
+Several writer threads add, record and undo entries while other threads save
+and query, and the tests check that no entry is lost or torn and that every
+saved file is a consistent snapshot. Under the GIL appends do not run in
+parallel, so instead of throughput scaling the tests check what the lock does
+guarantee: a writer blocked in its log call or change callback, or a slow
+background save, does not block other writers.
+"""
+
+import logging
+import threading
+import pytest
+from app.history import History
+from app.history.records import RecordStore
+from app.history.threadsafe import ThreadSafeHistory
+from app.logging import logger
+
+WRITES_PER_THREAD = 500
+
+def run_threads(targets):
+    """Starts one thread per target, all released at once, and waits for them."""
+    barrier = threading.Barrier(len(targets))
+
+    def start(target):
+        barrier.wait()
+        target()
+
+    threads = [threading.Thread(target=start, args=(target,)) for target in targets]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def writer(history, thread_id):
+    """Returns a target that records WRITES_PER_THREAD calculations tagged with thread_id."""
+    def write():
+        for value in range(WRITES_PER_THREAD):
+            history.record("add", (float(thread_id), float(value)), float(thread_id + value))
+    return write
+
+@pytest.mark.parametrize("writers", [1, 4, 8])
+def test_concurrent_writers(writers):
+    """Tests that concurrent writers lose no entries and keep each thread's order."""
+    history = ThreadSafeHistory()
+    run_threads([writer(history, thread_id) for thread_id in range(writers)])
+    assert len(history) == writers * WRITES_PER_THREAD
+    by_thread = {}
+    for entry in history:
+        num1, num2 = entry.split(" ")[1:3]
+        by_thread.setdefault(num1, []).append(float(num2))
+    assert all(values == [float(value) for value in range(WRITES_PER_THREAD)]
+               for values in by_thread.values())
+
+def test_background_saves_are_consistent_snapshots(tmp_path):
+    """
+    Tests that saves taken while writers run produce files whose entries are
+    an in-order prefix of each writer's entries.
+    """
+    history = ThreadSafeHistory()
+    futures = []
+
+    def saver():
+        for index in range(10):
+            futures.append(history.save_async(str(tmp_path / f"snapshot-{index}.npy")))
+
+    run_threads([writer(history, thread_id) for thread_id in range(4)] + [saver])
+    history.close()
+    for future in futures:
+        future.result()
+
+    for index in range(10):
+        loaded = History()
+        loaded.load(str(tmp_path / f"snapshot-{index}.npy"))
+        by_thread = {}
+        for entry in loaded:
+            num1, num2 = entry.split(" ")[1:3]
+            by_thread.setdefault(num1, []).append(float(num2))
+        for values in by_thread.values():
+            assert values == [float(value) for value in range(len(values))]
+
+def test_undo_and_save_while_writing(tmp_path):
+    """Tests that undo, queries and synchronous saves interleave safely with writers."""
+    history = ThreadSafeHistory(capacity=64)
+
+    def undoer():
+        for _ in range(WRITES_PER_THREAD // 2):
+            history.undo_last()
+
+    def reader():
+        for _ in range(50):
+            history.aggregate()
+            history.tail(5)
+        history.save(str(tmp_path / "history.csv"))
+
+    run_threads([writer(history, 0), writer(history, 1), undoer, reader])
+    assert len(history) >= WRITES_PER_THREAD * 2 - WRITES_PER_THREAD // 2
+    assert len(history.get_history()) == len(history)
+    history.close()
+
+@pytest.mark.parametrize("extension", ["csv", "npy", "snapshot"])
+def test_saves_stream_without_copying(extension, tmp_path, monkeypatch):
+    """
+    Tests that saving a spilled history streams its rows in chunks instead of
+    copying the whole store, and that the file holds every entry.
+    """
+    monkeypatch.setattr("app.history.SAVE_CHUNK_ROWS", 8)
+    monkeypatch.setattr(RecordStore, "copy", None)
+    monkeypatch.setattr(RecordStore, "to_structured", None)
+    history = ThreadSafeHistory(capacity=16)
+    for value in range(50):
+        history.record("add", (float(value), 1.0), value + 1.0)
+    history.add("note")
+    file_path = str(tmp_path / f"history.{extension}")
+    loaded = History()
+    if extension == "snapshot":
+        history.write_snapshot(file_path)
+        loaded.load_snapshot(file_path)
+    else:
+        history.save(file_path)
+        loaded.load(file_path)
+    assert loaded.get_history() == history.get_history()
+    history.close()
+
+def test_save_restarts_when_entries_are_removed(tmp_path, monkeypatch, caplog):
+    """Tests that a save whose captured rows are undone mid-stream saves the new entries."""
+    monkeypatch.setattr("app.history.SAVE_CHUNK_ROWS", 2)
+    history = ThreadSafeHistory()
+    for value in range(6):
+        history.record("add", (float(value), 0.0), float(value))
+    read_rows = history._read_rows
+    undone = []
+
+    def undo_between_chunks(start, stop, generation):
+        if start and not undone:
+            undone.append(start)
+            history.undo_last()
+        return read_rows(start, stop, generation)
+
+    monkeypatch.setattr(history, "_read_rows", undo_between_chunks)
+    file_path = str(tmp_path / "history.csv")
+    with caplog.at_level(logging.INFO, logger="Calculator"):
+        history.save(file_path)
+    assert "saving it again" in caplog.text
+    loaded = History()
+    loaded.load(file_path)
+    assert loaded.get_history() == history.get_history()
+    assert len(loaded) == 5
+
+def test_iteration_detects_removed_entries(monkeypatch):
+    """Tests that iteration streams in chunks and fails if entries are removed meanwhile."""
+    monkeypatch.setattr("app.history.threadsafe.ITERATION_CHUNK_ROWS", 2)
+    history = ThreadSafeHistory()
+    for value in range(5):
+        history.add(f"entry {value}")
+    entries = iter(history)
+    assert [next(entries), next(entries)] == ["entry 0", "entry 1"]
+    history.undo_last()
+    with pytest.raises(RuntimeError, match="History changed during iteration."):
+        list(entries)
+
+def other_writer_proceeds(history) -> bool:
+    """Records from another thread and returns whether that finished within 5 seconds."""
+    thread = threading.Thread(target=history.record, args=("add", (2.0, 2.0), 4.0))
+    thread.start()
+    thread.join(5)
+    return not thread.is_alive()
+
+def test_change_callback_runs_outside_the_lock():
+    """Tests that a writer inside its on_change callback does not block other writers."""
+    history = ThreadSafeHistory()
+    proceeded = []
+
+    def on_change():
+        history.on_change = None
+        proceeded.append(other_writer_proceeds(history))
+
+    history.on_change = on_change
+    history.record("add", (1.0, 1.0), 2.0)
+    assert proceeded == [True]
+    assert len(history) == 2
+
+def test_logging_runs_outside_the_lock():
+    """Tests that a writer inside its log call does not block other writers."""
+    history = ThreadSafeHistory()
+    proceeded = []
+
+    class BlockingFilter(logging.Filter):
+        """Records from another thread while the first entry is being logged."""
+        def filter(self, record):
+            if record.getMessage().startswith("Added operation") and not proceeded:
+                proceeded.append(None)
+                proceeded[0] = other_writer_proceeds(history)
+            return True
+
+    blocking = BlockingFilter()
+    logger.addFilter(blocking)
+    try:
+        history.add("first entry")
+    finally:
+        logger.removeFilter(blocking)
+    assert proceeded == [True]
+    assert history.get_history() == ["first entry", "add 2.0 2.0 = 4.0"]
+
+def test_background_save_logs_instead_of_printing(tmp_path, capsys, caplog):
+    """Tests that save_async reports completion in the log, not on stdout."""
+    history = ThreadSafeHistory()
+    history.record("add", (1.0, 2.0), 3.0)
+    file_path = str(tmp_path / "history.csv")
+    with caplog.at_level(logging.INFO, logger="Calculator"):
+        assert history.save_async(file_path).result() == file_path
+        history.close()
+    assert capsys.readouterr().out == ""
+    assert f"History saved to {file_path} in the background" in caplog.text